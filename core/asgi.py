@@ -9,8 +9,17 @@ https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+# Primeiro import: com PERFIL_INICIALIZACAO=1 passa a medir todos os seguintes
+from core.perfil import perfil
+
+with perfil.fase('import django.core.asgi'):
+    from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+# Servido por ASGI: a API usa as views async (ver core/urls.py)
+os.environ.setdefault('API_ASYNC', '1')
+
+with perfil.fase('apps e middlewares (get_asgi_application)'):
+    application = get_asgi_application()
 
-application = get_asgi_application()
+perfil.relatorio()
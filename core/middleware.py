@@ -1,5 +1,16 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 from django.shortcuts import render, redirect
 from django.conf import settings
+from django.db import connection
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger('core.desempenho')
 
 class SitePasswordMiddleware:
     def __init__(self, get_response):
@@ -24,4 +35,179 @@ class SitePasswordMiddleware:
                 return render(request, 'site_login.html', {'error': 'Senha incorreta'})
 
         # Se não está logado, manda para o login
-        return redirect('/site-login/')
\ No newline at end of file
+        return redirect('/site-login/')
+
+
+class _ContadorConsultas:
+    """Consultas e tempo no banco de um request (somados por _contar_consulta)."""
+
+    def __init__(self):
+        self.consultas = 0
+        self.tempo_db = 0.0
+
+
+# Contador do request atual. Um único execute_wrapper por conexão lê daqui:
+# no ASGI, requests simultâneos dividem a mesma thread (e conexão) do
+# sync_to_async, mas cada um roda no seu próprio contexto
+_contador_do_request = ContextVar('contador_do_request', default=None)
+
+def _contar_consulta(execute, sql, params, many, context):
+    contador = _contador_do_request.get()
+    if contador is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        contador.consultas += 1
+        contador.tempo_db += time.perf_counter() - inicio
+
+
+# Conexões abertas no request atual. ContextVar em vez de threading.local:
+# numa view async o ORM roda em outra thread, mas no mesmo contexto
+_conexoes_do_request = ContextVar('conexoes_do_request', default=None)
+
+def _contar_conexao(sender, connection, **kwargs):
+    contador = _conexoes_do_request.get()
+    if contador is not None:
+        contador[0] += 1
+
+connection_created.connect(_contar_conexao)
+
+
+# A conexão do Django é por thread: numa view async o ORM usa a conexão da
+# thread do sync_to_async, então o wrapper tem de ser instalado lá. Fica
+# instalado (uma vez por conexão): fora de um request ele só repassa a consulta
+def _instalar_contador():
+    if _contar_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_contar_consulta)
+
+
+class MetricasRequests:
+    """
+    Amostras recentes por view (total_ms, db_ms, consultas, bytes), em memória.
+    Cada instância/processo tem as suas: na Vercel os números são por instância.
+    """
+
+    CAMPOS = ('total_ms', 'db_ms', 'consultas', 'bytes')
+
+    def __init__(self, amostras_por_view=500):
+        self._trava = threading.Lock()
+        self._amostras = {}
+        self.amostras_por_view = amostras_por_view
+        self.desde = time.time()
+        # Requests que usaram o banco: com conexão nova x reaproveitada
+        self.conexoes = {'novas': 0, 'reutilizadas': 0}
+
+    def registrar(self, view, *valores):
+        with self._trava:
+            fila = self._amostras.setdefault(view, deque(maxlen=self.amostras_por_view))
+            fila.append(valores)
+
+    def registrar_conexao(self, nova):
+        with self._trava:
+            self.conexoes['novas' if nova else 'reutilizadas'] += 1
+
+    def reuso_conexoes(self):
+        """{'novas', 'reutilizadas', 'taxa_reuso'} desde o início da instância."""
+        with self._trava:
+            resultado = dict(self.conexoes)
+        usaram_banco = resultado['novas'] + resultado['reutilizadas']
+        resultado['taxa_reuso'] = round(resultado['reutilizadas'] / usaram_banco, 3) if usaram_banco else None
+        return resultado
+
+    def percentis(self):
+        """{view: {'requests': n, campo: {'p50', 'p95', 'p99', 'max'}}}"""
+        with self._trava:
+            copia = {view: list(fila) for view, fila in self._amostras.items()}
+
+        resultado = {}
+        for view, amostras in sorted(copia.items()):
+            resultado[view] = {'requests': len(amostras)}
+            for indice, campo in enumerate(self.CAMPOS):
+                valores = sorted(amostra[indice] for amostra in amostras if amostra[indice] is not None)
+                if not valores:
+                    continue
+                resultado[view][campo] = {
+                    f'p{p}': valores[min(len(valores) - 1, len(valores) * p // 100)]
+                    for p in (50, 95, 99)
+                }
+                resultado[view][campo]['max'] = valores[-1]
+        return resultado
+
+metricas = MetricasRequests()
+
+
+class MedicaoDesempenhoMiddleware:
+    """
+    Mede cada request: número de consultas, tempo no banco, tempo total,
+    tamanho da resposta e se precisou abrir conexão nova. Devolve tudo no
+    cabeçalho Server-Timing (aparece no DevTools), loga requests acima de
+    REQUEST_LENTO_MS e guarda as amostras para o endpoint de percentis
+    (core.views.metricas_desempenho).
+    Funciona no WSGI e no ASGI (não força as views async para uma thread).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.limite_lento = getattr(settings, 'REQUEST_LENTO_MS', 500)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        contador, conexoes = _ContadorConsultas(), [0]
+        tokens = _contador_do_request.set(contador), _conexoes_do_request.set(conexoes)
+        inicio = time.perf_counter()
+        _instalar_contador()
+        try:
+            response = self.get_response(request)
+        finally:
+            _contador_do_request.reset(tokens[0])
+            _conexoes_do_request.reset(tokens[1])
+        return self._medir(request, response, inicio, contador, conexoes[0])
+
+    async def __acall__(self, request):
+        contador, conexoes = _ContadorConsultas(), [0]
+        tokens = _contador_do_request.set(contador), _conexoes_do_request.set(conexoes)
+        inicio = time.perf_counter()
+        await sync_to_async(_instalar_contador)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _contador_do_request.reset(tokens[0])
+            _conexoes_do_request.reset(tokens[1])
+        return self._medir(request, response, inicio, contador, conexoes[0])
+
+    def _medir(self, request, response, inicio, contador, conexoes_novas):
+        total_ms = (time.perf_counter() - inicio) * 1000
+        db_ms = contador.tempo_db * 1000
+
+        # Streaming: o corpo ainda nem foi gerado, então o tamanho é desconhecido
+        tamanho = None if response.streaming else len(response.content)
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else '<sem rota>'
+        metricas.registrar(view, round(total_ms, 1), round(db_ms, 1), contador.consultas, tamanho)
+
+        response['Server-Timing'] = (
+            f'db;dur={db_ms:.1f};desc="{contador.consultas} consultas", total;dur={total_ms:.1f}'
+        )
+
+        # Só conta reuso quando o request usou o banco
+        conexao = 'nova' if conexoes_novas else 'reutilizada'
+        if contador.consultas or conexoes_novas:
+            metricas.registrar_conexao(nova=bool(conexoes_novas))
+            response['Server-Timing'] += f', conn;desc="{conexao}"'
+
+        if total_ms >= self.limite_lento:
+            logger.warning(
+                'Request lento: %s %s (%s) %.0f ms, %d consultas, %.0f ms no banco, conexão %s',
+                request.method, request.path, view, total_ms, contador.consultas, db_ms, conexao,
+            )
+        return response
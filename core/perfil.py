@@ -0,0 +1,160 @@
+"""
+Perfil de inicialização (cold start) dos entry points WSGI/ASGI.
+
+Ligado com PERFIL_INICIALIZACAO=1: mede cada fase da subida, o tempo de
+import de cada módulo e a primeira resposta, e imprime o relatório no
+stderr (que aparece no log da função na Vercel). Desligado, não faz nada
+e só importa biblioteca padrão.
+"""
+
+import os
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+
+ATIVO = os.environ.get('PERFIL_INICIALIZACAO', '') not in ('', '0')
+
+# Quantas linhas de cada ranking entram no relatório
+LINHAS_RELATORIO = int(os.environ.get('PERFIL_INICIALIZACAO_LINHAS', '15'))
+
+class _LoaderMedido:
+    """Embrulha o loader real para cronometrar o exec_module de cada módulo."""
+
+    def __init__(self, loader, medidor):
+        self._loader = loader
+        self._medidor = medidor
+
+    def __getattr__(self, nome):
+        return getattr(self._loader, nome)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, modulo):
+        self._medidor.executar(self._loader, modulo)
+
+class MedidorImports:
+    """
+    Finder instalado no início do sys.meta_path: delega a busca aos
+    finders normais e mede quanto cada módulo levou para executar.
+    Guarda o tempo total (com os imports filhos) e o próprio (sem eles).
+    """
+
+    def __init__(self):
+        self.tempos = {}  # modulo -> (total, proprio), em segundos
+        self._pilha = []
+
+    def find_spec(self, nome, caminho, alvo=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(nome, caminho, alvo)
+            if spec is not None:
+                break
+        else:
+            return None
+
+        if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+            spec.loader = _LoaderMedido(spec.loader, self)
+        return spec
+
+    def executar(self, loader, modulo):
+        self._pilha.append(0.0)
+        inicio = time.perf_counter()
+        try:
+            loader.exec_module(modulo)
+        finally:
+            total = time.perf_counter() - inicio
+            filhos = self._pilha.pop()
+            if self._pilha:
+                self._pilha[-1] += total
+            self.tempos[modulo.__name__] = (total, total - filhos)
+
+    def por_pacote(self):
+        """Tempo próprio somado por pacote (django.contrib.* por app)."""
+        pacotes = {}
+        for nome, (_, proprio) in self.tempos.items():
+            niveis = 3 if nome.startswith('django.contrib.') else 2
+            pacote = '.'.join(nome.split('.')[:niveis])
+            pacotes[pacote] = pacotes.get(pacote, 0.0) + proprio
+        return pacotes
+
+class PerfilInicializacao:
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.fases = []  # [(nome, segundos)]
+        self.imports = MedidorImports()
+        sys.meta_path.insert(0, self.imports)
+
+    @contextmanager
+    def fase(self, nome):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.fases.append((nome, time.perf_counter() - inicio))
+
+    def primeira_resposta(self, application):
+        """
+        Devolve a aplicação WSGI que mede a primeira requisição, imprime o
+        relatório e a partir daí chama a aplicação original direto.
+        """
+        estado = {'medido': False}
+
+        def aplicacao(environ, start_response):
+            if estado['medido']:
+                return application(environ, start_response)
+            estado['medido'] = True
+
+            status = []
+
+            def start_response_medido(linha_status, *args):
+                status.append(linha_status)
+                return start_response(linha_status, *args)
+
+            with self.fase(f"primeira resposta ({environ.get('REQUEST_METHOD')} {environ.get('PATH_INFO')})"):
+                resposta = application(environ, start_response_medido)
+            self.relatorio(status[0] if status else '')
+            return resposta
+
+        return aplicacao
+
+    def relatorio(self, status=''):
+        """Encerra a medição dos imports e imprime o relatório no stderr."""
+        if self.imports in sys.meta_path:
+            sys.meta_path.remove(self.imports)
+        total = time.perf_counter() - self.inicio
+
+        linhas = ['', '=== PERFIL DE INICIALIZAÇÃO ===']
+        for nome, segundos in self.fases:
+            linhas.append(f'  {segundos * 1000:8.1f} ms  {nome}')
+        linhas.append(f'  {total * 1000:8.1f} ms  TOTAL até a primeira resposta {status}'.rstrip())
+
+        tempos = self.imports.tempos
+        soma = sum(proprio for _, proprio in tempos.values())
+        linhas.append(f'--- imports: {len(tempos)} módulos, {soma * 1000:.1f} ms (tempo próprio por pacote) ---')
+        pacotes = sorted(self.imports.por_pacote().items(), key=lambda item: -item[1])
+        for pacote, segundos in pacotes[:LINHAS_RELATORIO]:
+            linhas.append(f'  {segundos * 1000:8.1f} ms  {pacote}')
+
+        linhas.append('--- imports mais caros (tempo total, com os filhos) ---')
+        modulos = sorted(tempos.items(), key=lambda item: -item[1][0])
+        for nome, (total_modulo, _) in modulos[:LINHAS_RELATORIO]:
+            linhas.append(f'  {total_modulo * 1000:8.1f} ms  {nome}')
+
+        print('\n'.join(linhas), file=sys.stderr, flush=True)
+
+class _PerfilDesligado:
+    """Mesma interface, sem custo: usado quando o perfil está desligado."""
+
+    def fase(self, nome):
+        return nullcontext()
+
+    def primeira_resposta(self, application):
+        return application
+
+    def relatorio(self, status=''):
+        pass
+
+perfil = PerfilInicializacao() if ATIVO else _PerfilDesligado()
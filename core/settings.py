@@ -5,16 +5,19 @@ Generated by 'django-admin startproject' using Django 6.0.1.
 """
 
 import os
+import tempfile
 from pathlib import Path
 import dj_database_url
-from dotenv import load_dotenv
 
 # 1. Definimos o BASE_DIR primeiro para localizar o .env corretamente
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 # 2. Carregamento robusto do arquivo .env
+# Na Vercel as variáveis já vêm do ambiente e não há .env: nem importa o dotenv
 env_path = BASE_DIR / '.env'
-load_dotenv(env_path)
+if env_path.exists():
+    from dotenv import load_dotenv
+    load_dotenv(env_path)
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/6.0/howto/deployment/checklist/
@@ -44,6 +47,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.middleware.MedicaoDesempenhoMiddleware',  # Depois do WhiteNoise: não mede arquivos estáticos
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -53,6 +57,12 @@ MIDDLEWARE = [
     # Removido: 'core.middleware.SitePasswordMiddleware' (Agora usamos o nativo)
 ]
 
+# Views async da API (core/asgi.py liga por padrão; no WSGI ficam as síncronas)
+API_ASYNC = os.environ.get('API_ASYNC', '0') == '1'
+
+# Requests acima deste tempo são logados (core.middleware.MedicaoDesempenhoMiddleware)
+REQUEST_LENTO_MS = int(os.environ.get('REQUEST_LENTO_MS', '500'))
+
 ROOT_URLCONF = 'core.urls'
 
 TEMPLATES = [
@@ -70,6 +80,17 @@ TEMPLATES = [
     },
 ]
 
+# Em produção cada template é lido e compilado uma vez por instância e fica em
+# memória (cached loader explícito); em DEBUG fica o padrão, que recarrega ao editar
+if not DEBUG:
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
 WSGI_APPLICATION = 'core.wsgi.application'
 
 
@@ -79,12 +100,88 @@ WSGI_APPLICATION = 'core.wsgi.application'
 DATABASES = {
     'default': dj_database_url.config(
         default='sqlite:///db.sqlite3', # Usa SQLite se não tiver DATABASE_URL (local)
-        conn_max_age=600,
-        ssl_require=True # Vercel exige SSL
+        ssl_require=bool(os.environ.get('DATABASE_URL')) # Vercel exige SSL (o SQLite não aceita sslmode)
     )
 }
 
-DATABASES['default']['CONN_MAX_AGE'] = 60
+# Conexões com o banco
+# Na Vercel cada instância abre a sua conexão SSL; o handshake custa mais
+# que as consultas do request, então a conexão tem de ser reaproveitada.
+# DB_POOL:
+#   'persistente' (padrão): a instância mantém a conexão por DB_CONN_MAX_AGE
+#       segundos e testa se ela ainda responde antes de reusar
+#   'pooler': atrás de um pooler em modo transação (PgBouncer, Supavisor, URL
+#       "pooled" do Neon); sem cursores do lado do servidor, que não
+#       sobrevivem à troca de conexão entre transações
+#   'psycopg': pool nativo do Django (precisa de psycopg[pool] no lugar do psycopg2)
+DB_POOL = os.environ.get('DB_POOL', 'persistente')
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', '60'))
+
+MODOS_CONEXAO = {
+    'persistente': {
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+    },
+    'pooler': {
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'DISABLE_SERVER_SIDE_CURSORS': True,
+    },
+    'psycopg': {
+        'CONN_MAX_AGE': 0,  # Quem reaproveita é o pool (o Django exige 0 com pool)
+        'OPTIONS': {
+            **DATABASES['default'].get('OPTIONS', {}),
+            'pool': {
+                'min_size': int(os.environ.get('DB_POOL_MIN', '1')),
+                'max_size': int(os.environ.get('DB_POOL_MAX', '4')),
+                'timeout': int(os.environ.get('DB_POOL_TIMEOUT', '10')),
+            },
+        },
+    },
+}
+
+if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    DATABASES['default'].update(MODOS_CONEXAO[DB_POOL])
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = DB_CONN_MAX_AGE
+
+# Índices cobrindo (INCLUDE) só existem no PostgreSQL; no SQLite local o
+# Django cria o mesmo índice só com as colunas-chave, o que já basta
+SILENCED_SYSTEM_CHECKS = ['models.W040']
+
+
+# Cache compartilhado entre instâncias
+# Na Vercel cada instância nasce com a memória vazia; a tabela de cache no
+# próprio Postgres faz os dados "quentes" sobreviverem entre instâncias.
+# CACHE_BACKEND: 'banco' (padrão com DATABASE_URL), 'arquivo' ou 'memoria'
+# Com 'banco', o deploy roda, depois do migrate: python manage.py createcachetable
+
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'banco' if os.environ.get('DATABASE_URL') else 'memoria')
+
+BACKENDS_CACHE = {
+    'banco': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'cache_compartilhado',  # Criada no deploy (createcachetable)
+    },
+    'arquivo': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_DIR', os.path.join(tempfile.gettempdir(), 'fechamento-caixa-cache')),
+    },
+    'memoria': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+CACHES = {
+    'default': {
+        **BACKENDS_CACHE[CACHE_BACKEND],
+        'TIMEOUT': 60 * 60 * 24,
+        'KEY_PREFIX': 'caixa',
+        # O cache compartilhado sobrevive ao deploy: JSON e fragmentos de HTML
+        # guardados pela versão anterior do código não são reaproveitados
+        'VERSION': os.environ.get('VERCEL_GIT_COMMIT_SHA', '1')[:12],
+    }
+}
 
 
 # Password validation
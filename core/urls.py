@@ -1,13 +1,33 @@
+from django.conf import settings
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
+from django.utils.module_loading import import_string
 from django.contrib.auth import views as auth_views
-from financeiro.views import *
+from financeiro.views import (
+    diario_caixa, api_dados_caixa, api_dados_intervalo, api_dados_caixa_async, api_dados_intervalo_async,
+    api_sincronizar, api_salvar_movimentacao, api_editar_movimentacao, api_deletar_movimentacao,
+    salvar_movimentacao, editar_movimentacao, deletar_movimentacao, importar_movimentacoes,
+    resumo_financeiro, exportar_dados,
+    gerenciar_categorias, salvar_categoria, deletar_categoria, editar_categoria,
+    fazer_logout,
+)
+from core.views import metricas_desempenho
+
+def sob_demanda(caminho):
+    """
+    View que só importa o módulo de `caminho` na primeira requisição.
+    Não usar com views csrf_exempt: o atributo fica na view real.
+    """
+    def view(request, *args, **kwargs):
+        return import_string(caminho)(request, *args, **kwargs)
+    return view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     
     # === RELATÓRIOS E CATEGORIAS ===
     path('resumo/', resumo_financeiro, name='resumo_financeiro'),
+    path('exportar/', exportar_dados, name='exportar_dados'),
     
     path('categorias/', gerenciar_categorias, name='gerenciar_categorias'),
     path('categorias/nova/', salvar_categoria, name='nova_categoria'), # Adicionei essa que faltava na lista anterior
@@ -15,12 +35,20 @@ urlpatterns = [
     path('categorias/editar/<int:id>/', editar_categoria, name='editar_categoria'),
 
     # === API ===
-    path('api/dados/<str:data_iso>/', api_dados_caixa, name='api_dados_caixa'),
+    # No ASGI (API_ASYNC) a API usa as views async; no WSGI, as síncronas
+    path('api/dados/', api_dados_intervalo_async if settings.API_ASYNC else api_dados_intervalo, name='api_dados_intervalo'),
+    path('api/dados/<str:data_iso>/', api_dados_caixa_async if settings.API_ASYNC else api_dados_caixa, name='api_dados_caixa'),
+    path('api/movimentacao/salvar/<str:data_iso>/', api_salvar_movimentacao, name='api_salvar_movimentacao'),
+    path('api/movimentacao/editar/<int:id>/', api_editar_movimentacao, name='api_editar_movimentacao'),
+    path('api/movimentacao/deletar/<int:id>/', api_deletar_movimentacao, name='api_deletar_movimentacao'),
+    path('api/sync/', api_sincronizar, name='api_sincronizar'),
+    path('api/metricas/', metricas_desempenho, name='metricas_desempenho'),
 
     # === MOVIMENTAÇÕES ===
     path('movimentacao/salvar/<str:data_iso>/', salvar_movimentacao, name='salvar_movimentacao'),
     path('movimentacao/editar/<int:id>/', editar_movimentacao, name='editar_movimentacao'),
     path('movimentacao/deletar/<int:id>/', deletar_movimentacao, name='deletar_movimentacao'),
+    path('movimentacao/importar/', importar_movimentacoes, name='importar_movimentacoes'),
 
     # === SISTEMA DE LOGIN ===
     path('accounts/login/', auth_views.LoginView.as_view(), name='login'),
@@ -31,7 +59,10 @@ urlpatterns = [
     path('accounts/', include('django.contrib.auth.urls')), 
 
     # === PWA ===
-    path('', include('pwa.urls')),
+    # Mesmas rotas de pwa.urls, com as views importadas só quando pedidas
+    re_path(r'^serviceworker\.js$', sob_demanda('pwa.views.service_worker'), name='serviceworker'),
+    re_path(r'^manifest\.json$', sob_demanda('pwa.views.manifest'), name='manifest'),
+    path('offline/', sob_demanda('pwa.views.offline'), name='offline'),
 
     # === CAIXA DIÁRIO ===
     path('', diario_caixa, name='home'),
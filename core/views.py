@@ -0,0 +1,28 @@
+import time
+
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db import connection
+from django.http import JsonResponse
+
+from financeiro.cache import categorias as cache_categorias
+
+from .middleware import metricas
+
+
+@staff_member_required
+def metricas_desempenho(request):
+    """
+    Percentis de tempo, consultas e tamanho por view, reuso de conexões e
+    acertos/falhas do cache de categorias deste processo (só staff).
+    """
+    # Com DB_POOL=psycopg, as estatísticas do próprio pool (conexões físicas abertas etc.)
+    pool = getattr(connection, 'pool', None)
+
+    return JsonResponse({
+        'amostras_desde': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(metricas.desde)),
+        'amostras_por_view': metricas.amostras_por_view,
+        'conexoes': metricas.reuso_conexoes(),
+        'pool': pool.get_stats() if pool is not None else None,
+        'cache_categorias': cache_categorias.estatisticas(),
+        'views': metricas.percentis(),
+    })
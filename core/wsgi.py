@@ -9,9 +9,21 @@ https://docs.djangoproject.com/en/6.0/howto/deployment/wsgi/
 
 import os
 
-from django.core.wsgi import get_wsgi_application
+# Primeiro import: com PERFIL_INICIALIZACAO=1 passa a medir todos os seguintes
+from core.perfil import perfil
+
+with perfil.fase('import django.core.wsgi'):
+    from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
-application = get_wsgi_application()
+with perfil.fase('settings'):
+    from django.conf import settings
+    settings.INSTALLED_APPS
+
+with perfil.fase('apps e middlewares (get_wsgi_application)'):
+    application = get_wsgi_application()
+
+# URLconf, views e templates só carregam na primeira requisição
+application = perfil.primeira_resposta(application)
 app = application 
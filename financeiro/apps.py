@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class FinanceiroConfig(AppConfig):
     name = 'financeiro'
+
+    def ready(self):
+        # Conecta os receivers que mantêm os caches do FechamentoCaixa
+        from . import signals  # noqa: F401
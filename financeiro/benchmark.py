@@ -0,0 +1,197 @@
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Categoria, FechamentoCaixa, Movimentacao
+from .services import CAMPOS_CACHE, MOVIMENTACOES_POR_PAGINA, GestorCaixa, reconstruir_resumo_mensal
+from .cache import categorias as cache_categorias
+
+# ==============================================================================
+# BENCHMARK: DADOS SINTÉTICOS E ORÇAMENTO DE CONSULTAS
+# ==============================================================================
+
+# Máximo de consultas por cenário (sessão e usuário inclusos, caches frios em
+# memória, dentro de uma transação externa, por isso os SAVEPOINTs contam).
+# Não pode depender do volume: mais dias ou movimentações não mudam o número.
+ORCAMENTO_CONSULTAS = {
+    'diario_caixa': 5,
+    'api_dados_caixa': 4,
+    'api_dados_intervalo': 6,
+    'resumo_financeiro': 5,
+    'criar_movimentacao': 12,
+    'editar_movimentacao': 14,
+    'deletar_movimentacao': 9,
+    'api_criar_movimentacao': 12,
+    'api_editar_movimentacao': 13,
+    'api_deletar_movimentacao': 10,
+}
+
+# Bem antes de qualquer dado real, para não colidir com dias existentes
+INICIO_PADRAO = date(2000, 1, 3)
+
+# Tipos de Categoria e os tipos de movimentação que usam cada um
+TIPOS_POR_CATEGORIA = {
+    'CARTAO': ['CARTAO'],
+    'SAIDA': ['SAIDA', 'REGISTRO'],
+    'ENTRADA': ['DINHEIRO'],
+}
+
+def gerar_dados_sinteticos(dias=300, movs_por_dia=100, categorias=30, inicio=None, semente=42):
+    """
+    Popula o banco com `dias` dias úteis seguidos (a partir de `inicio`), cada
+    um com `movs_por_dia` movimentações, tudo via bulk_create e com os caches
+    do dia, a corrente de saldos e o ResumoMensal já consistentes.
+    Retorna (primeiro_dia, ultimo_dia).
+    """
+    sorteio = random.Random(semente)
+    inicio = inicio or INICIO_PADRAO
+
+    tipos_categoria = list(TIPOS_POR_CATEGORIA)
+    lista_categorias = Categoria.objects.bulk_create([
+        Categoria(nome=f'Categoria {i:03d}', tipo=tipos_categoria[i % len(tipos_categoria)])
+        for i in range(categorias)
+    ])
+    por_tipo = {}
+    for categoria in lista_categorias:
+        for tipo in TIPOS_POR_CATEGORIA[categoria.tipo]:
+            por_tipo.setdefault(tipo, []).append(categoria.pk)
+
+    # 1. Dias úteis com a corrente de saldos
+    datas = []
+    data = inicio
+    while len(datas) < dias:
+        if data.weekday() != 6:
+            datas.append(data)
+        data += timedelta(days=1)
+
+    fechamentos = []
+    saldo = Decimal('0.00')
+    for data in datas:
+        saldo_final = Decimal(sorteio.randint(0, 50000)) / 100
+        fechamentos.append(FechamentoCaixa(data=data, saldo_inicial=saldo, saldo_final=saldo_final, versao=1))
+        saldo = saldo_final
+    FechamentoCaixa.objects.bulk_create(fechamentos, batch_size=500)
+
+    # 2. Movimentações em blocos de dias (memória limitada), já somando os caches
+    tipos = ['CARTAO'] * 5 + ['SAIDA'] * 3 + ['DINHEIRO'] + ['REGISTRO']
+    for bloco in range(0, len(fechamentos), 50):
+        movimentacoes = []
+        for fechamento in fechamentos[bloco:bloco + 50]:
+            for _ in range(movs_por_dia):
+                tipo = sorteio.choice(tipos)
+                valor = Decimal(sorteio.randint(100, 50000)) / 100
+                movimentacoes.append(Movimentacao(
+                    fechamento_id=fechamento.pk, data=fechamento.data, tipo=tipo, valor=valor,
+                    categoria_id=sorteio.choice(por_tipo[tipo]) if por_tipo.get(tipo) else None,
+                ))
+                campo = CAMPOS_CACHE.get(tipo)
+                if campo:
+                    setattr(fechamento, campo, getattr(fechamento, campo) + valor)
+        Movimentacao.objects.bulk_create(movimentacoes, batch_size=1000)
+
+    FechamentoCaixa.objects.bulk_update(fechamentos, list(CAMPOS_CACHE.values()), batch_size=500)
+    reconstruir_resumo_mensal()
+    return datas[0], datas[-1]
+
+def cenarios(primeiro_dia, ultimo_dia):
+    """
+    [(nome, método, url, dados)] dos caminhos medidos. As escritas usam um dia
+    do meio do período, que tem movimentações para editar e excluir.
+    """
+    meio = primeiro_dia + (ultimo_dia - primeiro_dia) / 2
+    if meio.weekday() == 6:
+        meio += timedelta(days=1)
+    iso = meio.isoformat()
+    mov_editar, mov_deletar, mov_deletar_api = Movimentacao.objects.filter(data=meio).values_list('id', flat=True)[:3]
+    inicio_relatorio = (ultimo_dia.replace(day=1) - timedelta(days=95)).replace(day=10)
+    categoria = Categoria.objects.filter(tipo='CARTAO').values_list('id', flat=True).first()
+    nova = {'tipo': 'CARTAO', 'valor': '12.50', 'categoria': categoria, 'descricao': 'benchmark'}
+
+    return [
+        ('diario_caixa', 'get', reverse('caixa_dia', args=[iso]), None),
+        ('api_dados_caixa', 'get', reverse('api_dados_caixa', args=[iso]), None),
+        ('api_dados_intervalo', 'get',
+         f"{reverse('api_dados_intervalo')}?de={(meio - timedelta(days=7)).isoformat()}&ate={(meio + timedelta(days=7)).isoformat()}", None),
+        ('resumo_financeiro', 'get',
+         f"{reverse('resumo_financeiro')}?data_inicio={inicio_relatorio.isoformat()}&data_fim={ultimo_dia.isoformat()}", None),
+        ('criar_movimentacao', 'post', reverse('salvar_movimentacao', args=[iso]), nova),
+        ('editar_movimentacao', 'post', reverse('editar_movimentacao', args=[mov_editar]), {**nova, 'valor': '99.90'}),
+        ('deletar_movimentacao', 'get', reverse('deletar_movimentacao', args=[mov_deletar]), None),
+        ('api_criar_movimentacao', 'post', reverse('api_salvar_movimentacao', args=[iso]), nova),
+        ('api_editar_movimentacao', 'post', reverse('api_editar_movimentacao', args=[mov_editar]), {**nova, 'valor': '88.80'}),
+        ('api_deletar_movimentacao', 'post', reverse('api_deletar_movimentacao', args=[mov_deletar_api]), {}),
+    ]
+
+def medir(client, metodo, url, dados=None):
+    """
+    Executa um cenário com os caches frios (compartilhado e de categorias)
+    e retorna (consultas, milissegundos, status).
+    """
+    cache.clear()
+    cache_categorias.invalidar()
+    with CaptureQueriesContext(connection) as consultas:
+        inicio = time.perf_counter()
+        resposta = getattr(client, metodo)(url, dados) if dados is not None else getattr(client, metodo)(url)
+        duracao = (time.perf_counter() - inicio) * 1000
+    return len(consultas), duracao, resposta.status_code
+
+# ==============================================================================
+# BENCHMARK: SERIALIZAÇÃO DAS MOVIMENTAÇÕES DO DIA
+# ==============================================================================
+
+def _serializar_por_modelos(fechamento):
+    """
+    Caminho antigo da API, mantido só como referência: modelos + float por
+    linha, cortado na mesma página que linhas_do_dia() traz (mesma carga).
+    """
+    return [
+        {
+            'id': mov.id,
+            'categoria': mov.categoria.nome if mov.categoria else 'Sem Categoria',
+            'descricao': mov.descricao or '',
+            'valor': float(mov.valor),
+            'tipo': mov.tipo,
+            'url_editar': f"/movimentacao/editar/{mov.id}/",
+            'url_deletar': f"/movimentacao/deletar/{mov.id}/",
+        }
+        for mov in fechamento.movimentacoes.all().select_related('categoria').order_by('id')[:MOVIMENTACOES_POR_PAGINA + 1]
+    ]
+
+def _serializar_por_linhas(fechamento):
+    from .views import serializar_linhas
+    return serializar_linhas(GestorCaixa.linhas_do_dia(fechamento))
+
+CAMINHOS_SERIALIZACAO = {
+    'modelos (antes)': _serializar_por_modelos,
+    'values_list': _serializar_por_linhas,
+}
+
+def comparar_serializacao(fechamento, repeticoes=20):
+    """
+    Lê e serializa a primeira página de movimentações do dia pelos dois
+    caminhos (consulta inclusa). Retorna {caminho: (ms p50, KiB alocados no pico)}; a memória
+    é medida numa execução à parte, pois o tracemalloc deixa tudo mais lento.
+    """
+    resultados = {}
+    for nome, serializar in CAMINHOS_SERIALIZACAO.items():
+        serializar(fechamento)  # aquece o cache de consultas compiladas
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            serializar(fechamento)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+
+        tracemalloc.start()
+        serializar(fechamento)
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        resultados[nome] = (statistics.median(tempos), pico / 1024)
+    return resultados
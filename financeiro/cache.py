@@ -0,0 +1,127 @@
+import threading
+import time
+import uuid
+
+from django.core.cache import cache
+
+from .models import Categoria
+
+# Esquema de chaves do cache compartilhado (settings.CACHES['default']):
+#   dia:<etag>                          JSON do dia (a versão do dia já está no ETag)
+#   categorias                          lista de categorias (apagada a cada escrita)
+#   relatorio:geracao                   token trocado a cada escrita
+#   relatorio:<inicio>:<fim>:g<geracao> resultado do relatório do período
+CHAVE_CATEGORIAS = 'categorias'
+CHAVE_GERACAO_RELATORIO = 'relatorio:geracao'
+
+# Segurança extra para quando outro processo/instância alterou as categorias
+# (a invalidação por signal só alcança o processo que fez a escrita)
+TTL_CATEGORIAS = 60
+
+class CacheCategorias:
+    """
+    Cache em memória do processo para a lista de categorias, que é pequena,
+    muda pouco e era lida 2-3 vezes por request. É versionado: toda escrita
+    em Categoria (via signals) incrementa a versão e descarta a lista.
+    Numa falha local, tenta o cache compartilhado antes de ir ao banco.
+    """
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self._lista = None
+        self._carregado_em = 0
+        self.versao = 0
+        self.acertos = 0
+        self.falhas = 0
+
+    def listar(self):
+        """
+        Lista de dicts {'id', 'nome', 'tipo'} ordenada por nome.
+        A mesma lista é compartilhada entre requests: não altere o retorno.
+        """
+        lista = self._lista
+        if lista is not None and time.monotonic() - self._carregado_em < TTL_CATEGORIAS:
+            self.acertos += 1
+            return lista
+
+        with self._trava:
+            self.falhas += 1
+            versao = self.versao
+            lista = cache.get(CHAVE_CATEGORIAS)
+            if lista is None:
+                lista = list(Categoria.objects.values('id', 'nome', 'tipo').order_by('nome'))
+                cache.set(CHAVE_CATEGORIAS, lista, timeout=TTL_CATEGORIAS)
+            # Se alguém invalidou durante a consulta, não guarda a lista velha
+            if versao == self.versao:
+                self._lista = lista
+                self._carregado_em = time.monotonic()
+        return lista
+
+    def invalidar(self):
+        with self._trava:
+            self.versao += 1
+            self._lista = None
+        cache.delete(CHAVE_CATEGORIAS)
+
+    def estatisticas(self):
+        return {'versao': self.versao, 'acertos': self.acertos, 'falhas': self.falhas}
+
+categorias = CacheCategorias()
+
+# ==============================================================================
+# DADOS DO DIA
+# ==============================================================================
+
+def _chave_dia(etag):
+    return 'dia:' + etag.strip('"')
+
+def obter_dados_dia(etag):
+    """JSON do dia já montado para esta versão, ou None."""
+    return cache.get(_chave_dia(etag))
+
+def guardar_dados_dia(etag, dados):
+    cache.set(_chave_dia(etag), dados)
+
+async def aobter_dados_dia(etag):
+    return await cache.aget(_chave_dia(etag))
+
+async def aguardar_dados_dia(etag, dados):
+    await cache.aset(_chave_dia(etag), dados)
+
+# ==============================================================================
+# RELATÓRIO
+# ==============================================================================
+
+def _nova_geracao():
+    return uuid.uuid4().hex
+
+def _geracao_relatorio():
+    geracao = cache.get(CHAVE_GERACAO_RELATORIO)
+    if geracao is None:
+        # Começa de um valor novo para nunca reaproveitar resultados antigos
+        geracao = _nova_geracao()
+        cache.add(CHAVE_GERACAO_RELATORIO, geracao, timeout=None)
+    return geracao
+
+def chave_relatorio(data_inicio, data_fim):
+    """
+    Chave do relatório na geração atual. Calcule uma vez por request e use a
+    mesma chave para ler e gravar, para não guardar dados velhos numa geração nova.
+    """
+    return f'relatorio:{data_inicio:%Y-%m-%d}:{data_fim:%Y-%m-%d}:g{_geracao_relatorio()}'
+
+def obter_relatorio(chave):
+    """Resultado guardado do relatório, ou None."""
+    return cache.get(chave)
+
+def guardar_relatorio(chave, resultado):
+    cache.set(chave, resultado)
+
+def invalidar_relatorios():
+    """
+    Chamado depois de cada escrita confirmada: todos os relatórios guardados
+    passam a ser ignorados. Troca a geração por um token novo em vez de usar
+    cache.incr(), que não é atômico no DatabaseCache nem no FileBasedCache;
+    com set(), duas escritas simultâneas só disputam qual token novo fica.
+    """
+    cache.set(CHAVE_GERACAO_RELATORIO, _nova_geracao(), timeout=None)
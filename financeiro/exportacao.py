@@ -0,0 +1,85 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import FechamentoCaixa, Movimentacao
+from .services import GestorCaixa
+
+# ==============================================================================
+# EXPORTAÇÃO EM STREAMING (CSV E JSON LINES)
+# ==============================================================================
+
+# Linhas buscadas do banco por vez (o cursor nunca traz a tabela inteira)
+TAMANHO_BLOCO = 2000
+
+# Mesmas colunas que o importador lê, para o arquivo poder voltar depois
+COLUNAS = {
+    'movimentacoes': ['id', 'data', 'tipo', 'valor', 'categoria', 'descricao'],
+    'fechamentos': [
+        'data', 'saldo_inicial', 'saldo_final',
+        'total_cartao', 'total_saida', 'total_suprimento',
+    ],
+}
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+class _Eco:
+    """Arquivo falso para o csv.writer: devolve a linha em vez de gravá-la."""
+
+    def write(self, valor):
+        return valor
+
+def _movimentacoes(data_inicio, data_fim):
+    movimentacoes = Movimentacao.objects.select_related('categoria').only(
+        'id', 'data', 'tipo', 'valor', 'descricao', 'fechamento_id', 'categoria_id', 'categoria__nome',
+    )
+    if data_inicio:
+        movimentacoes = movimentacoes.filter(data__gte=data_inicio)
+    if data_fim:
+        movimentacoes = movimentacoes.filter(data__lte=data_fim)
+
+    for mov in movimentacoes.order_by('data', 'id').iterator(chunk_size=TAMANHO_BLOCO):
+        yield {
+            'id': mov.id,
+            'data': mov.data,
+            'tipo': mov.tipo,
+            'valor': mov.valor,
+            'categoria': mov.categoria.nome if mov.categoria else '',
+            'descricao': mov.descricao or '',
+        }
+
+def _fechamentos(data_inicio, data_fim):
+    fechamentos = FechamentoCaixa.objects.all()
+    if data_inicio:
+        fechamentos = fechamentos.filter(data__gte=data_inicio)
+    if data_fim:
+        fechamentos = fechamentos.filter(data__lte=data_fim)
+
+    # Os totais exportados vêm dos caches do dia: acerta os sujos antes
+    GestorCaixa.recalcular_sujos(fechamentos)
+
+    campos = ('data', 'saldo_inicial', 'saldo_final', 'cache_total_cartao', 'cache_total_saida', 'cache_total_suprimento')
+    for linha in fechamentos.order_by('data').values_list(*campos).iterator(chunk_size=TAMANHO_BLOCO):
+        yield dict(zip(COLUNAS['fechamentos'], linha))
+
+def exportar(conteudo, formato, data_inicio=None, data_fim=None):
+    """
+    Gera o arquivo aos poucos, uma linha (str) por vez, para ser enviado
+    num StreamingHttpResponse ou gravado em disco em memória constante.
+    `conteudo` é 'movimentacoes' ou 'fechamentos'; `formato`, 'csv' ou 'jsonl'.
+    """
+    linhas = _fechamentos(data_inicio, data_fim) if conteudo == 'fechamentos' else _movimentacoes(data_inicio, data_fim)
+
+    if formato == 'jsonl':
+        for linha in linhas:
+            yield json.dumps(linha, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+        return
+
+    escritor = csv.writer(_Eco(), delimiter=';', lineterminator='\n')
+    yield escritor.writerow(COLUNAS[conteudo])
+    for linha in linhas:
+        yield escritor.writerow(linha.values())
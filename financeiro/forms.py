@@ -1,7 +1,13 @@
 from django import forms
 from .models import FechamentoCaixa, Movimentacao, Categoria
+from .cache import categorias as cache_categorias
 
 class FechamentoSaldoForm(forms.ModelForm):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Só exibido: o saldo inicial vem do dia anterior (propagação), nunca do POST
+        self.fields['saldo_inicial'].disabled = True
+
     class Meta:
         model = FechamentoCaixa
         fields = ['saldo_inicial', 'saldo_final']
@@ -45,8 +51,12 @@ class MovimentacaoForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         
-        # 1. Ordena categorias alfabeticamente
-        self.fields['categoria'].queryset = Categoria.objects.all().order_by('nome')
+        # 1. Opções do select vêm do cache de categorias (já em ordem alfabética);
+        #    o queryset do campo só é consultado para validar o que foi enviado
+        campo_categoria = self.fields['categoria']
+        campo_categoria.choices = [('', campo_categoria.empty_label)] + [
+            (cat['id'], cat['nome']) for cat in cache_categorias.listar()
+        ]
         
         # 2. Adiciona a opção "--- Tipo ---" na lista
         escolhas_originais = [x for x in self.fields['tipo'].choices if x[0] != '']
@@ -64,4 +74,21 @@ class FiltroResumoForm(forms.Form):
     data_fim = forms.DateField(
         widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}), 
         label="Até"
-    )
\ No newline at end of file
+    )
+
+class ImportacaoForm(forms.Form):
+    FORMATO_CHOICES = [
+        ('', 'Pela extensão do arquivo'),
+        ('csv', 'CSV (data;tipo;valor;categoria;descricao)'),
+        ('ofx', 'OFX (extrato da maquininha/banco)'),
+    ]
+    arquivo = forms.FileField(label="Arquivo")
+    formato = forms.ChoiceField(choices=FORMATO_CHOICES, required=False, label="Formato")
+    criar_categorias = forms.BooleanField(required=False, label="Criar categorias que não existem")
+
+    def clean(self):
+        dados = super().clean()
+        arquivo = dados.get('arquivo')
+        if arquivo and not dados.get('formato'):
+            dados['formato'] = 'ofx' if arquivo.name.lower().endswith('.ofx') else 'csv'
+        return dados
@@ -0,0 +1,248 @@
+import csv
+import re
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Now
+
+from .models import Categoria, FechamentoCaixa, Movimentacao
+from .services import GestorCaixa, reconstruir_resumo_mensal
+from .cache import categorias as cache_categorias, invalidar_relatorios
+
+# ==============================================================================
+# IMPORTAÇÃO EM LOTE (CSV E OFX)
+# ==============================================================================
+
+# Linhas gravadas por transação
+TAMANHO_LOTE = 1000
+
+# Tipo de Categoria criado para cada tipo de movimentação (--criar-categorias)
+TIPO_CATEGORIA = {
+    'DINHEIRO': 'ENTRADA',
+    'CARTAO': 'CARTAO',
+    'SAIDA': 'SAIDA',
+    'REGISTRO': 'SAIDA',
+}
+
+# Aceita o código ('CARTAO') ou o nome exibido ('Cartão/Pix') na coluna tipo
+TIPOS_POR_NOME = {}
+for codigo, nome in Movimentacao.TIPO_CHOICES:
+    TIPOS_POR_NOME[codigo.casefold()] = codigo
+    TIPOS_POR_NOME[nome.casefold()] = codigo
+
+TAG_OFX = re.compile(r'<(/?[A-Z0-9.]+)>([^<]*)')
+
+class ErroLinha(ValueError):
+    """Linha do arquivo que não pôde ser importada."""
+
+def _linhas_texto(arquivo):
+    """Lê o arquivo linha a linha (sem carregar tudo), aceitando UTF-8 ou Windows-1252."""
+    for linha in arquivo:
+        if isinstance(linha, bytes):
+            try:
+                linha = linha.decode('utf-8-sig')
+            except UnicodeDecodeError:
+                linha = linha.decode('cp1252', errors='replace')
+        yield linha
+
+def _ler_data(valor):
+    valor = valor.strip()
+    for formato in ('%d/%m/%Y', '%Y-%m-%d', '%Y%m%d'):
+        try:
+            data = datetime.strptime(valor, formato).date()
+            break
+        except ValueError:
+            continue
+    else:
+        raise ErroLinha(f'data inválida: {valor!r}')
+
+    # Domingo não tem caixa: lança no dia seguinte (mesma regra do caderno)
+    if data.weekday() == 6:
+        data += timedelta(days=1)
+    return data
+
+def _ler_valor(valor):
+    """Aceita '1.234,56', 'R$ 10,00' ou '10.50'."""
+    texto = valor.replace('R$', '').replace(' ', '').strip()
+    if ',' in texto:
+        texto = texto.replace('.', '').replace(',', '.')
+    try:
+        numero = Decimal(texto)
+        # 'NaN' passa pelo quantize e quebraria depois, na comparação
+        if numero.is_finite():
+            return numero.quantize(Decimal('0.01'))
+    except InvalidOperation:
+        pass
+    raise ErroLinha(f'valor inválido: {valor!r}')
+
+def ler_csv(arquivo):
+    """
+    Gera (numero_da_linha, dados) de um CSV com cabeçalho
+    data;tipo;valor;categoria;descricao (separador ';' ou ',').
+    Linhas com erro geram (numero_da_linha, ErroLinha).
+    """
+    linhas = _linhas_texto(arquivo)
+    primeira = next(linhas, '')
+    separador = ';' if primeira.count(';') >= primeira.count(',') else ','
+
+    def todas():
+        yield primeira
+        yield from linhas
+
+    leitor = csv.DictReader(todas(), delimiter=separador)
+    leitor.fieldnames = [campo.strip().casefold() for campo in leitor.fieldnames or []]
+    faltando = {'data', 'tipo', 'valor'} - set(leitor.fieldnames)
+    if faltando:
+        yield 1, ErroLinha(f"cabeçalho sem a(s) coluna(s): {', '.join(sorted(faltando))}")
+        return
+
+    for linha in leitor:
+        numero = leitor.line_num
+        try:
+            tipo = TIPOS_POR_NOME.get((linha['tipo'] or '').strip().casefold())
+            if tipo is None:
+                raise ErroLinha(f"tipo inválido: {linha['tipo']!r}")
+            valor = _ler_valor(linha['valor'] or '')
+            if valor <= 0:
+                raise ErroLinha('o valor deve ser positivo')
+            yield numero, {
+                'data': _ler_data(linha['data'] or ''),
+                'tipo': tipo,
+                'valor': valor,
+                'categoria': (linha.get('categoria') or '').strip(),
+                'descricao': (linha.get('descricao') or '').strip()[:200],
+            }
+        except ErroLinha as erro:
+            yield numero, erro
+
+def ler_ofx(arquivo):
+    """
+    Gera (numero_da_transacao, dados) de um extrato OFX (SGML ou XML).
+    Créditos entram como CARTAO (repasse da maquininha) e débitos como
+    SAIDA (tarifas, estornos), sempre com valor positivo.
+    """
+    transacao = None
+    numero = 0
+    for linha in _linhas_texto(arquivo):
+        for tag, valor in TAG_OFX.findall(linha):
+            valor = valor.strip()
+            if tag == 'STMTTRN':
+                transacao = {}
+                numero += 1
+            elif tag == '/STMTTRN' and transacao is not None:
+                try:
+                    valor_transacao = _ler_valor(transacao.get('TRNAMT', ''))
+                    if not valor_transacao:
+                        raise ErroLinha('transação sem valor')
+                    yield numero, {
+                        'data': _ler_data(transacao.get('DTPOSTED', '')[:8]),
+                        'tipo': 'CARTAO' if valor_transacao > 0 else 'SAIDA',
+                        'valor': abs(valor_transacao),
+                        'categoria': '',
+                        'descricao': (transacao.get('MEMO') or transacao.get('NAME') or '')[:200],
+                    }
+                except ErroLinha as erro:
+                    yield numero, erro
+                transacao = None
+            elif transacao is not None and not tag.startswith('/'):
+                transacao[tag] = valor
+
+class ImportadorMovimentacoes:
+    """
+    Carga em lote de movimentações. Em vez de um save() por linha (que
+    dispara o signal do delta e atualiza o dia a cada movimentação), cada
+    lote é gravado numa única transação: abre os dias que faltam e faz um
+    bulk_create (que não dispara signals). No fim da carga, cada dia tocado
+    é recalculado uma vez só e o ResumoMensal do período é refeito.
+    """
+
+    def __init__(self, tamanho_lote=TAMANHO_LOTE, criar_categorias=False):
+        self.tamanho_lote = tamanho_lote
+        self.criar_categorias = criar_categorias
+        self.importadas = 0
+        self.dias = set()
+        self.datas = set()
+        self.erros = []
+
+        # Categorias resolvidas em memória pelo nome (sem diferenciar maiúsculas)
+        self._categorias = {}
+        for categoria in cache_categorias.listar():
+            self._categorias.setdefault(categoria['nome'].casefold(), categoria['id'])
+
+    def importar(self, arquivo, formato='csv'):
+        """Importa o arquivo ('csv' ou 'ofx') e retorna o resumo da carga."""
+        leitor = ler_ofx if formato == 'ofx' else ler_csv
+        linhas = self._validas(leitor(arquivo))
+
+        while True:
+            lote = list(islice(linhas, self.tamanho_lote))
+            if not lote:
+                break
+            self._gravar_lote(lote)
+
+        if self.importadas:
+            self._recalcular()
+            invalidar_relatorios()
+        return self.resumo()
+
+    def resumo(self):
+        return {'importadas': self.importadas, 'dias': len(self.dias), 'erros': self.erros}
+
+    def _validas(self, linhas):
+        """Separa as linhas com erro e resolve a categoria das demais."""
+        for numero, dados in linhas:
+            if isinstance(dados, ErroLinha):
+                self.erros.append((numero, str(dados)))
+                continue
+            try:
+                dados['categoria_id'] = self._resolver_categoria(dados.pop('categoria'), dados['tipo'])
+            except ErroLinha as erro:
+                self.erros.append((numero, str(erro)))
+                continue
+            yield dados
+
+    def _resolver_categoria(self, nome, tipo):
+        if not nome:
+            return None
+        chave = nome.casefold()
+        if chave not in self._categorias:
+            if not self.criar_categorias:
+                raise ErroLinha(f'categoria não cadastrada: {nome!r}')
+            categoria = Categoria.objects.create(nome=nome[:50], tipo=TIPO_CATEGORIA[tipo])
+            self._categorias[chave] = categoria.id
+        return self._categorias[chave]
+
+    def _gravar_lote(self, lote):
+        datas = {dados['data'] for dados in lote}
+
+        with transaction.atomic():
+            dias = GestorCaixa.abrir_dias(datas)
+            Movimentacao.objects.bulk_create([
+                Movimentacao(
+                    fechamento_id=dias[dados['data']],
+                    data=dados['data'],
+                    tipo=dados['tipo'],
+                    valor=dados['valor'],
+                    categoria_id=dados['categoria_id'],
+                    descricao=dados['descricao'] or None,
+                )
+                for dados in lote
+            ], batch_size=500)
+
+            # Até o recálculo do fim, os dias tocados reagregam ao serem lidos
+            FechamentoCaixa.objects.filter(pk__in=dias.values()).update(
+                cache_sujo=True, versao=F('versao') + 1, atualizado_em=Now(),
+            )
+
+        self.importadas += len(lote)
+        self.dias.update(dias.values())
+        self.datas.update(datas)
+
+    def _recalcular(self):
+        """Uma recalculada por dia tocado e uma reconstrução do período, em vez de uma por lote."""
+        with transaction.atomic():
+            GestorCaixa.recalcular_dias(sorted(self.dias))
+            reconstruir_resumo_mensal(min(self.datas), max(self.datas))
@@ -0,0 +1,104 @@
+import statistics
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.test.utils import override_settings
+
+from financeiro.benchmark import ORCAMENTO_CONSULTAS, cenarios, comparar_serializacao, gerar_dados_sinteticos, medir
+from financeiro.models import FechamentoCaixa
+
+# Mesmo cache das medições que definiram o orçamento (o banco não entra na conta)
+CACHE_BENCHMARK = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark'}}
+
+class _Desfazer(Exception):
+    """Usada para desfazer os dados sintéticos no fim."""
+
+class Command(BaseCommand):
+    help = (
+        "Gera dados sintéticos (dias x movimentações x categorias) via bulk_create, "
+        "mede consultas e tempo das views do caderno, da API, do relatório e das "
+        "escritas de movimentação, e falha se algum cenário passar do orçamento "
+        "de consultas. Tudo é desfeito no fim, a menos que use --manter."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=600, help='Dias úteis gerados (600 ~ 2 anos)')
+        parser.add_argument('--movs-por-dia', type=int, default=100)
+        parser.add_argument('--categorias', type=int, default=30)
+        parser.add_argument('--repeticoes', type=int, default=3, help='Execuções de cada cenário')
+        parser.add_argument('--manter', action='store_true', help='Grava os dados sintéticos (só em banco vazio)')
+        parser.add_argument(
+            '--movs-dia-cheio', type=int, default=500,
+            help='Movimentações do dia usado na comparação de serialização da API',
+        )
+
+    def handle(self, *args, **options):
+        if options['manter'] and FechamentoCaixa.objects.exists():
+            raise CommandError('--manter só pode ser usado num banco sem dias cadastrados.')
+
+        try:
+            with transaction.atomic(), override_settings(CACHES=CACHE_BENCHMARK):
+                estouros = self._executar(options)
+                if not options['manter']:
+                    raise _Desfazer
+        except _Desfazer:
+            pass
+
+        if estouros:
+            raise CommandError(f"Acima do orçamento de consultas: {', '.join(estouros)}")
+        self.stdout.write(self.style.SUCCESS('Todos os cenários dentro do orçamento.'))
+
+    def _executar(self, options):
+        self.stdout.write(
+            f"Gerando {options['dias']} dias x {options['movs_por_dia']} movimentações, "
+            f"{options['categorias']} categorias..."
+        )
+        primeiro_dia, ultimo_dia = gerar_dados_sinteticos(
+            dias=options['dias'], movs_por_dia=options['movs_por_dia'], categorias=options['categorias'],
+        )
+
+        usuario = get_user_model().objects.create_user('benchmark-caixa')
+        client = Client()
+        client.force_login(usuario)
+
+        resultados = {}
+        for _ in range(options['repeticoes']):
+            # Cenários refeitos a cada rodada (a exclusão precisa de outra movimentação)
+            for nome, metodo, url, dados in cenarios(primeiro_dia, ultimo_dia):
+                consultas, duracao, status = medir(client, metodo, url, dados)
+                if status >= 400:
+                    raise CommandError(f'{nome}: HTTP {status} em {url}')
+                resultados.setdefault(nome, []).append((consultas, duracao))
+
+        self.stdout.write(f"\n{'cenário':<24}{'consultas':>10}{'orçamento':>11}{'p50 ms':>10}{'máx ms':>10}")
+        estouros = []
+        for nome, medicoes in resultados.items():
+            consultas = max(c for c, _ in medicoes)
+            tempos = [d for _, d in medicoes]
+            orcamento = ORCAMENTO_CONSULTAS[nome]
+            linha = f'{nome:<24}{consultas:>10}{orcamento:>11}{statistics.median(tempos):>10.1f}{max(tempos):>10.1f}'
+            if consultas > orcamento:
+                estouros.append(nome)
+                linha = self.style.ERROR(linha)
+            self.stdout.write(linha)
+
+        self._comparar_serializacao(ultimo_dia, options)
+        return estouros
+
+    def _comparar_serializacao(self, ultimo_dia, options):
+        # Um dia "de evento", depois do período gerado, com muitas movimentações
+        inicio = ultimo_dia + timedelta(days=7)
+        dia_cheio, _ = gerar_dados_sinteticos(
+            dias=1, movs_por_dia=options['movs_dia_cheio'], categorias=options['categorias'], inicio=inicio,
+        )
+        fechamento = FechamentoCaixa.objects.get(data=dia_cheio)
+
+        self.stdout.write(
+            f"\nSerialização da primeira página de um dia com {options['movs_dia_cheio']} movimentações:"
+        )
+        self.stdout.write(f"{'caminho':<24}{'p50 ms':>10}{'pico KiB':>11}")
+        for nome, (duracao, pico) in comparar_serializacao(fechamento).items():
+            self.stdout.write(f'{nome:<24}{duracao:>10.1f}{pico:>11.0f}')
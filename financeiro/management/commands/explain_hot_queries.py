@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from financeiro.models import FechamentoCaixa, Movimentacao
+from financeiro.services import GestorCaixa, resumo_por_categoria
+
+# Trechos de plano que indicam leitura da tabela inteira (SQLite / PostgreSQL)
+SINAIS_DE_VARREDURA = ('SCAN ', 'Seq Scan')
+
+COMANDOS_COM_PLANO = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+class _Desfazer(Exception):
+    """Usada para desfazer as escritas feitas só para capturar o SQL."""
+
+class Command(BaseCommand):
+    help = (
+        "Executa as consultas mais frequentes do app (caderno, API, deltas e "
+        "relatório) sobre um dia de exemplo e imprime o plano do banco para cada "
+        "SQL gerado. Planos com varredura completa da tabela aparecem em destaque."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--data', help='Dia de exemplo (AAAA-MM-DD). Padrão: último dia com movimentações')
+        parser.add_argument('--analyze', action='store_true', help='Usa EXPLAIN ANALYZE (só PostgreSQL)')
+
+    def handle(self, *args, **options):
+        data = self._ler_data(options['data']) if options['data'] else self._dia_exemplo()
+        fechamento = GestorCaixa.obter_dia(data)
+
+        # Período do relatório com pontas avulsas e um mês completo no meio
+        dois_meses_antes = (data.replace(day=1) - timedelta(days=32)).replace(day=1)
+        periodo = (dois_meses_antes.replace(day=15), data)
+
+        consultas = [
+            ('Totais do dia (resumo_rapido)',
+             lambda: Movimentacao.objects.filter(fechamento=fechamento).resumo_rapido()),
+            ('Movimentações do dia',
+             lambda: list(GestorCaixa.movimentacoes_do_dia(fechamento))),
+            ('Saldo anterior',
+             lambda: GestorCaixa.saldo_anterior(data)),
+            ('Dias vizinhos (API de intervalo)',
+             lambda: GestorCaixa.obter_dias([data + timedelta(days=i) for i in range(-7, 8)])),
+            ('Cabeçalho do relatório (resumo_periodo)',
+             lambda: FechamentoCaixa.objects.filter(data__range=periodo).resumo_periodo()),
+            ('Relatório por categoria',
+             lambda: resumo_por_categoria(*periodo)),
+        ]
+        if fechamento.pk:
+            consultas.append((
+                'Delta de uma movimentação nova (signal)',
+                lambda: GestorCaixa.aplicar_delta(None, (fechamento.pk, 'CARTAO', Decimal('1.00'), None)),
+            ))
+
+        self.stdout.write(f'Banco: {connection.vendor}  Dia de exemplo: {data}  Relatório: {periodo[0]} a {periodo[1]}')
+        for nome, executar in consultas:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n=== {nome}'))
+            for sql in self._capturar(executar):
+                self.stdout.write(sql)
+                for linha in self._plano(sql, options['analyze']):
+                    estilo = self.style.WARNING if any(s in linha for s in SINAIS_DE_VARREDURA) else str
+                    self.stdout.write(estilo(f'    {linha}'))
+
+    def _capturar(self, executar):
+        """SQL gerado pela função (as escritas são desfeitas em seguida)."""
+        with CaptureQueriesContext(connection) as capturadas:
+            try:
+                with transaction.atomic():
+                    executar()
+                    raise _Desfazer
+            except _Desfazer:
+                pass
+        # Só os comandos de dados (BEGIN, SAVEPOINT e ROLLBACK não têm plano)
+        return [
+            consulta['sql'] for consulta in capturadas.captured_queries
+            if consulta['sql'].lstrip().split(' ', 1)[0].upper() in COMANDOS_COM_PLANO
+        ]
+
+    def _plano(self, sql, analyze):
+        try:
+            prefixo = connection.ops.explain_query_prefix(analyze=True) if analyze else connection.ops.explain_query_prefix()
+        except ValueError as erro:
+            raise CommandError(f'--analyze não é suportado em {connection.vendor}: {erro}')
+
+        # EXPLAIN ANALYZE executa de verdade: roda dentro de uma transação desfeita
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(f'{prefixo} {sql}')
+                linhas = [str(linha[-1]) for linha in cursor.fetchall()]
+                raise _Desfazer
+        except _Desfazer:
+            pass
+        return linhas
+
+    def _dia_exemplo(self):
+        data = (
+            Movimentacao.objects.order_by('-data')
+            .values_list('data', flat=True).first()
+        )
+        if data is None:
+            raise CommandError('Nenhuma movimentação cadastrada; informe --data.')
+        return data
+
+    def _ler_data(self, valor):
+        try:
+            return datetime.strptime(valor, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Data inválida: {valor}')
@@ -0,0 +1,39 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from financeiro.exportacao import exportar, COLUNAS, FORMATOS
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporta movimentações ou fechamentos de um período em CSV ou JSON Lines, "
+        "linha a linha (memória constante mesmo para vários anos)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--conteudo', choices=list(COLUNAS), default='movimentacoes')
+        parser.add_argument('--formato', choices=list(FORMATOS), default='csv')
+        parser.add_argument('--de', help='Data inicial (AAAA-MM-DD)')
+        parser.add_argument('--ate', help='Data final (AAAA-MM-DD)')
+        parser.add_argument('--saida', help='Arquivo de destino (padrão: saída padrão)')
+
+    def handle(self, *args, **options):
+        data_inicio = self._ler_data(options['de']) if options['de'] else None
+        data_fim = self._ler_data(options['ate']) if options['ate'] else None
+        linhas = exportar(options['conteudo'], options['formato'], data_inicio, data_fim)
+
+        if not options['saida']:
+            for linha in linhas:
+                self.stdout.write(linha, ending='')
+            return
+
+        with open(options['saida'], 'w', encoding='utf-8', newline='') as arquivo:
+            arquivo.writelines(linhas)
+        self.stderr.write(self.style.SUCCESS(f"Exportado para {options['saida']}."))
+
+    def _ler_data(self, valor):
+        try:
+            return datetime.strptime(valor, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Data inválida: {valor}')
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from financeiro.importacao import ImportadorMovimentacoes, TAMANHO_LOTE
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa movimentações em lote de um CSV (data;tipo;valor;categoria;descricao) "
+        "ou de um extrato OFX da maquininha. O arquivo é lido aos poucos e gravado "
+        "em transações de --lote linhas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help='Caminho do arquivo .csv ou .ofx')
+        parser.add_argument('--formato', choices=['csv', 'ofx'], help='Padrão: pela extensão do arquivo')
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE, help='Linhas por transação')
+        parser.add_argument('--criar-categorias', action='store_true', help='Cria as categorias que não existem')
+
+    def handle(self, *args, **options):
+        caminho = options['arquivo']
+        formato = options['formato'] or ('ofx' if caminho.lower().endswith('.ofx') else 'csv')
+        if options['lote'] < 1:
+            raise CommandError('--lote deve ser maior que zero')
+
+        importador = ImportadorMovimentacoes(
+            tamanho_lote=options['lote'],
+            criar_categorias=options['criar_categorias'],
+        )
+        try:
+            with open(caminho, 'rb') as arquivo:
+                resultado = importador.importar(arquivo, formato)
+        except OSError as erro:
+            raise CommandError(f'Não foi possível ler {caminho}: {erro}')
+
+        for numero, mensagem in resultado['erros']:
+            self.stdout.write(self.style.WARNING(f'Linha {numero}: {mensagem}'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['importadas']} movimentação(ões) importada(s) em {resultado['dias']} dia(s)."
+        ))
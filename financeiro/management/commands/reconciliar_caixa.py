@@ -0,0 +1,141 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F, Sum, Q
+from django.db.models.functions import Now, TruncMonth
+
+from financeiro.models import FechamentoCaixa, Movimentacao, ResumoMensal
+from financeiro.services import CAMPOS_CACHE, centavos, reconstruir_resumo_mensal
+from financeiro.cache import invalidar_relatorios
+
+
+class Command(BaseCommand):
+    help = (
+        "Confere os caches de totais de cada FechamentoCaixa e o ResumoMensal "
+        "(mantidos por delta) contra um recálculo completo das movimentações. "
+        "Pensado para rodar periodicamente (cron); use --corrigir para gravar "
+        "os valores recalculados."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--de', help='Data inicial (AAAA-MM-DD)')
+        parser.add_argument('--ate', help='Data final (AAAA-MM-DD)')
+        parser.add_argument('--corrigir', action='store_true', help='Grava os totais recalculados nos dias/meses divergentes')
+
+    def handle(self, *args, **options):
+        data_inicio = self._ler_data(options['de']) if options['de'] else None
+        data_fim = self._ler_data(options['ate']) if options['ate'] else None
+
+        dias_ok = self._reconciliar_dias(data_inicio, data_fim, options['corrigir'])
+        meses_ok = self._reconciliar_meses(data_inicio, data_fim, options['corrigir'])
+
+        if dias_ok and meses_ok:
+            self.stdout.write(self.style.SUCCESS('Todos os caches conferem.'))
+        elif options['corrigir']:
+            # Relatórios guardados com os totais errados deixam de valer
+            invalidar_relatorios()
+
+    def _reconciliar_dias(self, data_inicio, data_fim, corrigir):
+        fechamentos = FechamentoCaixa.objects.order_by('data')
+        movimentacoes = Movimentacao.objects.all()
+
+        if data_inicio:
+            fechamentos = fechamentos.filter(data__gte=data_inicio)
+            movimentacoes = movimentacoes.filter(data__gte=data_inicio)
+        if data_fim:
+            fechamentos = fechamentos.filter(data__lte=data_fim)
+            movimentacoes = movimentacoes.filter(data__lte=data_fim)
+
+        # 1. Recálculo completo em uma única consulta agrupada por dia
+        agregados = {
+            CAMPOS_CACHE[tipo]: Sum('valor', filter=Q(tipo=tipo))
+            for tipo in CAMPOS_CACHE
+        }
+        recalculado = {
+            linha['fechamento_id']: linha
+            for linha in movimentacoes.values('fechamento_id').annotate(**agregados)
+        }
+
+        # 2. Compara com o que os deltas deixaram gravado
+        divergentes = []
+        for fechamento in fechamentos.only('id', 'data', 'cache_sujo', *CAMPOS_CACHE.values()):
+            linha = recalculado.get(fechamento.id, {})
+            diferente = fechamento.cache_sujo
+            if diferente:
+                self.stdout.write(f"{fechamento.data}: cache marcado como sujo")
+            for campo in CAMPOS_CACHE.values():
+                esperado = centavos(linha.get(campo))
+                atual = centavos(getattr(fechamento, campo))
+                if atual != esperado:
+                    diferente = True
+                    self.stdout.write(f"{fechamento.data} {campo}: cache={atual} recalculado={esperado}")
+                    setattr(fechamento, campo, esperado)
+            if diferente:
+                fechamento.cache_sujo = False
+                divergentes.append(fechamento)
+
+        if not divergentes:
+            return True
+
+        if corrigir:
+            FechamentoCaixa.objects.bulk_update(divergentes, [*CAMPOS_CACHE.values(), 'cache_sujo'], batch_size=500)
+            # Nova versão (e ETag) para os dias corrigidos, como em toda escrita
+            FechamentoCaixa.objects.filter(pk__in=[dia.pk for dia in divergentes]).update(
+                versao=F('versao') + 1, atualizado_em=Now(),
+            )
+            self.stdout.write(self.style.SUCCESS(f'{len(divergentes)} dia(s) corrigido(s).'))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f'{len(divergentes)} dia(s) divergente(s). Rode com --corrigir para gravar.'
+            ))
+        return False
+
+    def _reconciliar_meses(self, data_inicio, data_fim, corrigir):
+        resumos = ResumoMensal.objects.all()
+        movimentacoes = Movimentacao.objects.annotate(mes=TruncMonth('data'))
+
+        # O rollup é por mês, então o período é arredondado para meses inteiros
+        if data_inicio:
+            resumos = resumos.filter(mes__gte=data_inicio.replace(day=1))
+            movimentacoes = movimentacoes.filter(mes__gte=data_inicio.replace(day=1))
+        if data_fim:
+            resumos = resumos.filter(mes__lte=data_fim.replace(day=1))
+            movimentacoes = movimentacoes.filter(mes__lte=data_fim.replace(day=1))
+
+        chave = ('mes', 'tipo', 'categoria_id')
+        gravado = {
+            tuple(linha[c] for c in chave): linha['soma']
+            for linha in resumos.values(*chave).annotate(soma=Sum('total')).order_by()
+        }
+        recalculado = {
+            tuple(linha[c] for c in chave): linha['soma']
+            for linha in movimentacoes.values(*chave).annotate(soma=Sum('valor')).order_by()
+        }
+
+        meses_divergentes = set()
+        for item in gravado.keys() | recalculado.keys():
+            atual = centavos(gravado.get(item))
+            esperado = centavos(recalculado.get(item))
+            if atual != esperado:
+                mes, tipo, categoria_id = item
+                self.stdout.write(f"{mes:%m/%Y} {tipo} categoria={categoria_id}: rollup={atual} recalculado={esperado}")
+                meses_divergentes.add(mes)
+
+        if not meses_divergentes:
+            return True
+
+        if corrigir:
+            for mes in sorted(meses_divergentes):
+                reconstruir_resumo_mensal(mes, mes)
+            self.stdout.write(self.style.SUCCESS(f'{len(meses_divergentes)} mês(es) reconstruído(s).'))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f'{len(meses_divergentes)} mês(es) divergente(s). Rode com --corrigir para gravar.'
+            ))
+        return False
+
+    def _ler_data(self, valor):
+        try:
+            return datetime.strptime(valor, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Data inválida: {valor}')
@@ -0,0 +1,26 @@
+# Generated by Django 6.0.1 on 2026-10-18 16:22
+
+from django.db import migrations, models
+
+
+def marcar_existentes_como_sujos(apps, schema_editor):
+    # Dias já existentes entram como "sujos": o primeiro acesso recalcula
+    # os totais uma vez, depois passam a ser lidos direto do cache.
+    FechamentoCaixa = apps.get_model('financeiro', 'FechamentoCaixa')
+    FechamentoCaixa.objects.update(cache_sujo=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financeiro', '0004_rename_saldo_final_fisico_fechamentocaixa_saldo_final_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fechamentocaixa',
+            name='cache_sujo',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(marcar_existentes_como_sujos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 6.0.1 on 2026-10-18 16:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+
+
+def popular_resumo_mensal(apps, schema_editor):
+    Movimentacao = apps.get_model('financeiro', 'Movimentacao')
+    ResumoMensal = apps.get_model('financeiro', 'ResumoMensal')
+
+    linhas = (
+        Movimentacao.objects
+        .annotate(mes=TruncMonth('fechamento__data'))
+        .values('mes', 'tipo', 'categoria_id')
+        .annotate(total=Sum('valor'))
+        .order_by()
+    )
+    ResumoMensal.objects.bulk_create(
+        [ResumoMensal(**linha) for linha in linhas],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financeiro', '0005_fechamentocaixa_cache_sujo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoMensal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField()),
+                ('tipo', models.CharField(choices=[('DINHEIRO', 'Entrada Dinheiro'), ('CARTAO', 'Cartão/Pix'), ('SAIDA', 'Saída'), ('REGISTRO', 'Registro')], max_length=20)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('categoria', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='financeiro.categoria')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['mes', 'tipo'], name='resumo_mensal_mes_tipo_idx')],
+            },
+        ),
+        migrations.RunPython(popular_resumo_mensal, migrations.RunPython.noop),
+    ]
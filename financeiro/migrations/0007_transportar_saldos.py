@@ -0,0 +1,35 @@
+# Generated by Django 6.0.1 on 2026-10-18 17:05
+
+from django.db import migrations
+from django.db.models import F, OuterRef, Subquery
+
+
+def refazer_corrente_de_saldos(apps, schema_editor):
+    # Até aqui o saldo inicial só era corrigido quando alguém abria o dia;
+    # acerta de uma vez todos os dias que ficaram para trás.
+    FechamentoCaixa = apps.get_model('financeiro', 'FechamentoCaixa')
+
+    saldo_do_anterior = Subquery(
+        FechamentoCaixa.objects
+        .filter(data__lt=OuterRef('data'))
+        .order_by('-data')
+        .values('saldo_final')[:1]
+    )
+    (
+        FechamentoCaixa.objects
+        .annotate(saldo_do_anterior=saldo_do_anterior)
+        .filter(saldo_do_anterior__isnull=False)
+        .exclude(saldo_inicial=F('saldo_do_anterior'))
+        .update(saldo_inicial=saldo_do_anterior)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financeiro', '0006_resumomensal'),
+    ]
+
+    operations = [
+        migrations.RunPython(refazer_corrente_de_saldos, migrations.RunPython.noop),
+    ]
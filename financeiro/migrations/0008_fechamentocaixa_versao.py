@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-18 17:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financeiro', '0007_transportar_saldos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fechamentocaixa',
+            name='atualizado_em',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='fechamentocaixa',
+            name='versao',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,15 @@
+# Generated by Django 6.0.1 on 2026-10-18 18:10
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Mantida só pelo histórico: a tabela do DatabaseCache não faz parte do
+    # schema do app e é criada no deploy (python manage.py createcachetable),
+    # conforme o CACHES ativo lá, e não o do momento do migrate.
+
+    dependencies = [
+        ('financeiro', '0008_fechamentocaixa_versao'),
+    ]
+
+    operations = []
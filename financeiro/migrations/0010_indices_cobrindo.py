@@ -0,0 +1,31 @@
+# Generated by Django 6.0.1 on 2026-10-18 18:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financeiro', '0009_tabela_cache'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='resumomensal',
+            name='resumo_mensal_mes_tipo_idx',
+        ),
+        migrations.AlterField(
+            model_name='movimentacao',
+            name='fechamento',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='movimentacoes', to='financeiro.fechamentocaixa'),
+        ),
+        migrations.AddIndex(
+            model_name='movimentacao',
+            index=models.Index(fields=['fechamento', 'tipo'], include=('valor', 'categoria'), name='mov_dia_tipo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resumomensal',
+            index=models.Index(fields=['mes', 'tipo'], include=('categoria', 'total'), name='resumo_mensal_mes_tipo_idx'),
+        ),
+    ]
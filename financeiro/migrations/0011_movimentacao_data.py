@@ -0,0 +1,38 @@
+# Generated by Django 6.0.1 on 2026-10-18 19:05
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copiar_data_do_dia(apps, schema_editor):
+    FechamentoCaixa = apps.get_model('financeiro', 'FechamentoCaixa')
+    Movimentacao = apps.get_model('financeiro', 'Movimentacao')
+
+    Movimentacao.objects.update(
+        data=Subquery(FechamentoCaixa.objects.filter(pk=OuterRef('fechamento_id')).values('data')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financeiro', '0010_indices_cobrindo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movimentacao',
+            name='data',
+            field=models.DateField(editable=False, null=True),
+        ),
+        migrations.RunPython(copiar_data_do_dia, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='movimentacao',
+            name='data',
+            field=models.DateField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='movimentacao',
+            index=models.Index(fields=['data', 'tipo'], include=('valor', 'categoria'), name='mov_data_tipo_idx'),
+        ),
+    ]
@@ -1,5 +1,7 @@
-from django.db import models
-from django.db.models import Sum, Q
+from django.db import models, transaction
+from django.db.models import Sum, Q, F, Count, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
 
 # 1. QUERYSET INTELIGENTE
 class MovimentacaoQuerySet(models.QuerySet):
@@ -8,10 +10,38 @@ class MovimentacaoQuerySet(models.QuerySet):
         Calcula os totais diretamente no banco de dados.
         Retorna um dicionário com os valores prontos.
         """
+        return self.aggregate(**self._somas_por_tipo())
+
+    async def aresumo_rapido(self):
+        """Versão async de resumo_rapido() (views da API em ASGI)."""
+        return await self.aaggregate(**self._somas_por_tipo())
+
+    def _somas_por_tipo(self):
+        return {
+            'total_cartao': Sum('valor', filter=Q(tipo='CARTAO')),
+            'total_suprimento': Sum('valor', filter=Q(tipo='DINHEIRO')),
+            'total_saida': Sum('valor', filter=Q(tipo='SAIDA')),
+        }
+
+class FechamentoCaixaQuerySet(models.QuerySet):
+    def resumo_periodo(self):
+        """
+        Cabeçalho do relatório em uma única agregação no banco: somas dos
+        caches, 'Dinheiro Calculado' de cada dia (nunca negativo) e a
+        quantidade de dias do período.
+        """
+        decimal = models.DecimalField(max_digits=12, decimal_places=2)
+        venda_dia = (
+            F('cache_total_saida') + F('saldo_final')
+            - F('saldo_inicial') - F('cache_total_suprimento')
+        )
+
         return self.aggregate(
-            total_cartao=Sum('valor', filter=Q(tipo='CARTAO')),
-            total_suprimento=Sum('valor', filter=Q(tipo='DINHEIRO')),
-            total_saida=Sum('valor', filter=Q(tipo='SAIDA'))
+            total_cartao=Sum('cache_total_cartao'),
+            total_saida=Sum('cache_total_saida'),
+            total_suprimento=Sum('cache_total_suprimento'),
+            total_dinheiro=Sum(Greatest(venda_dia, Value(0), output_field=decimal)),
+            dias_contados=Count('id'),
         )
 
 # 2. MODELO DE CATEGORIA
@@ -36,10 +66,32 @@ class FechamentoCaixa(models.Model):
     cache_total_cartao = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     cache_total_saida = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     cache_total_suprimento = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    # Marca quando os caches acima não são confiáveis (ex: alteração em lote)
+    cache_sujo = models.BooleanField(default=False)
+
+    # Muda a cada escrita no dia (movimentação ou saldo); usado no ETag da API
+    versao = models.PositiveIntegerField(default=0)
+    atualizado_em = models.DateTimeField(null=True, blank=True)
+
+    objects = FechamentoCaixaQuerySet.as_manager()
     
     def __str__(self):
         return f"Caixa {self.data}"
 
+    def save(self, *args, **kwargs):
+        # Toda gravação do dia gera uma nova versão (atômica, via F())
+        self.versao = 1 if self._state.adding else F('versao') + 1
+        self.atualizado_em = timezone.now()
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'versao', 'atualizado_em'}
+
+        super().save(*args, **kwargs)
+
+        if not isinstance(self.versao, int):
+            self.refresh_from_db(fields=['versao'])
+
 # 4. MODELO DE MOVIMENTACAO
 class Movimentacao(models.Model):
     TIPO_CHOICES = [
@@ -49,7 +101,8 @@ class Movimentacao(models.Model):
         ('REGISTRO', 'Registro'),
     ]
 
-    fechamento = models.ForeignKey(FechamentoCaixa, on_delete=models.CASCADE, related_name='movimentacoes')
+    # Sem índice próprio: mov_dia_tipo_idx (abaixo) começa por fechamento e já atende
+    fechamento = models.ForeignKey(FechamentoCaixa, on_delete=models.CASCADE, related_name='movimentacoes', db_index=False)
     categoria = models.ForeignKey(Categoria, on_delete=models.SET_NULL, null=True)
     
     tipo = models.CharField(max_length=20, choices=TIPO_CHOICES, default='SAIDA', db_index=True)
@@ -58,7 +111,62 @@ class Movimentacao(models.Model):
     descricao = models.CharField(max_length=200, blank=True, null=True)
     criado_em = models.DateTimeField(auto_now_add=True, null=True, blank=True)
 
+    # Cópia de fechamento.data (mantida pelos signals) para filtrar períodos sem JOIN
+    data = models.DateField(editable=False)
+
     objects = MovimentacaoQuerySet.as_manager()
 
+    class Meta:
+        indexes = [
+            # Totais do dia (resumo_rapido, recálculos) e bordas do relatório:
+            # filtro por dia + tipo, lendo valor e categoria direto do índice
+            models.Index(fields=['fechamento', 'tipo'], include=['valor', 'categoria'], name='mov_dia_tipo_idx'),
+            # Relatórios por período: varredura de um intervalo de datas só nesta tabela
+            models.Index(fields=['data', 'tipo'], include=['valor', 'categoria'], name='mov_data_tipo_idx'),
+            # Lista do dia paginada por id (?after_id=): cada página é uma faixa do índice
+            models.Index(fields=['fechamento', 'id'], name='mov_dia_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} - R$ {self.valor}"
+
+    def save(self, *args, **kwargs):
+        # pre_save trava a linha atual para calcular o delta (signals.py):
+        # leitura, gravação e delta precisam estar na mesma transação
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+
+# 5. RESUMO MENSAL (ROLLUP DO RELATÓRIO)
+class ResumoMensal(models.Model):
+    """
+    Total das movimentações por mês x tipo x categoria, mantido por delta
+    no mesmo caminho de escrita que atualiza os caches do dia.
+    """
+    mes = models.DateField()  # Sempre o dia 1 do mês
+    tipo = models.CharField(max_length=20, choices=Movimentacao.TIPO_CHOICES)
+    categoria = models.ForeignKey(Categoria, on_delete=models.SET_NULL, null=True)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [
+            # Relatório: meses do período agrupados por tipo x categoria, só com o índice
+            models.Index(fields=['mes', 'tipo'], include=['categoria', 'total'], name='resumo_mensal_mes_tipo_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.mes:%m/%Y} {self.tipo} - R$ {self.total}"
+
+# 6. OPERAÇÕES OFFLINE JÁ APLICADAS (IDEMPOTÊNCIA DO /api/sync/)
+class OperacaoSincronizada(models.Model):
+    """
+    Chave gerada no aparelho para cada escrita feita offline. Se o mesmo
+    lote chegar duas vezes (resposta perdida, reenvio), a operação não é
+    aplicada de novo e a resposta repete o resultado da primeira vez.
+    """
+    chave = models.CharField(max_length=64, unique=True)
+    # Movimentação criada/alterada (inteiro solto: ela pode ser excluída depois)
+    movimentacao_id = models.BigIntegerField(null=True)
+    criado_em = models.DateTimeField(auto_now_add=True)
+
     def __str__(self):
-        return f"{self.get_tipo_display()} - R$ {self.valor}"
\ No newline at end of file
+        return self.chave
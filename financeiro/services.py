@@ -1,5 +1,25 @@
+from datetime import timedelta
 from decimal import Decimal
-from .models import Movimentacao, FechamentoCaixa
+from django.db import transaction
+from django.db.models import F, Q, Sum, OuterRef, Subquery, Window
+from django.db.models.functions import TruncMonth, Now, RowNumber
+from django.utils import timezone
+from .models import Movimentacao, FechamentoCaixa, ResumoMensal
+
+# Qual coluna de cache do FechamentoCaixa acumula cada tipo de movimentação.
+# 'REGISTRO' não entra em nenhum total, por isso não aparece aqui.
+CAMPOS_CACHE = {
+    'CARTAO': 'cache_total_cartao',
+    'SAIDA': 'cache_total_saida',
+    'DINHEIRO': 'cache_total_suprimento',
+}
+
+# Colunas das movimentações que a API do dia serializa, lidas como tuplas
+# (values_list): sem instanciar Movimentacao nem Categoria por linha
+COLUNAS_LINHA = ('id', 'fechamento_id', 'tipo', 'valor', 'descricao', 'categoria__nome')
+
+# Movimentações por página na API e no caderno (paginação por id: ?after_id=)
+MOVIMENTACOES_POR_PAGINA = 100
 
 class GestorCaixa:
     def __init__(self, fechamento):
@@ -22,6 +42,25 @@ class GestorCaixa:
         suprimentos = totais['total_suprimento'] or Decimal('0.00')
         saidas = totais['total_saida'] or Decimal('0.00')
         
+        return self._montar_resumo(venda_cartao, suprimentos, saidas)
+
+    def resumo_cacheado(self):
+        """
+        Mesmo resultado de calcular_resumo(), mas lido das colunas cache_total_*
+        do fechamento já carregado (zero consultas). Só reagrega quando o
+        cache está marcado como sujo, e aproveita para limpá-lo.
+        """
+        if self.fechamento.cache_sujo:
+            self.atualizar_cache_do_banco()
+
+        return self._montar_resumo(
+            self.fechamento.cache_total_cartao,
+            self.fechamento.cache_total_suprimento,
+            self.fechamento.cache_total_saida,
+        )
+
+    def _montar_resumo(self, venda_cartao, suprimentos, saidas):
+        """Aplica a regra do 'Dinheiro Calculado' sobre os totais do dia."""
         # 2. A Fórmula Matemática (Regra de Negócio)
         venda_dinheiro = (self.fechamento.saldo_final + saidas) - (self.fechamento.saldo_inicial + suprimentos)
         
@@ -38,18 +77,515 @@ class GestorCaixa:
 
     def atualizar_cache_do_banco(self):
         """
-        Este método será chamado pelo Signals ou pela View para salvar
-        os totais no modelo FechamentoCaixa (para o relatório mensal ficar rápido).
+        Recalcula do zero os totais do dia e salva no FechamentoCaixa.
+        O caminho normal de escrita usa aplicar_delta(); este método fica
+        para reconciliação, cargas em lote e caches marcados como sujos.
         """
         totais = Movimentacao.objects.filter(fechamento=self.fechamento).resumo_rapido()
-        
+        self.fechamento.save(update_fields=self._aplicar_totais(totais))
+
+    async def aatualizar_cache_do_banco(self):
+        """Versão async de atualizar_cache_do_banco() (API em ASGI)."""
+        totais = await Movimentacao.objects.filter(fechamento=self.fechamento).aresumo_rapido()
+        await self.fechamento.asave(update_fields=self._aplicar_totais(totais))
+
+    def _aplicar_totais(self, totais):
+        """Copia os totais agregados para os caches do dia; retorna os campos alterados."""
         self.fechamento.cache_total_cartao = totais['total_cartao'] or 0
         self.fechamento.cache_total_saida = totais['total_saida'] or 0
         self.fechamento.cache_total_suprimento = totais['total_suprimento'] or 0
+        self.fechamento.cache_sujo = False
         
-        self.fechamento.save(update_fields=[
+        return [
             'cache_total_cartao', 
             'cache_total_saida', 
-            'cache_total_suprimento'
-        ])
-        
\ No newline at end of file
+            'cache_total_suprimento',
+            'cache_sujo'
+        ]
+
+    def validadores_http(self):
+        """
+        ETag e Last-Modified (timestamp) do dia, para o GET condicional da API.
+        Um dia virtual não tem versão: o conteúdo depende só do saldo transportado.
+        """
+        fechamento = self.fechamento
+        if fechamento.pk is None:
+            return f'"{fechamento.data:%Y-%m-%d}-v{fechamento.saldo_inicial}"', None
+
+        # O id entra junto: um dia excluído e recriado recomeça a versão do zero
+        etag = f'"{fechamento.data:%Y-%m-%d}-{fechamento.pk}-{fechamento.versao}"'
+        ultima_alteracao = fechamento.atualizado_em.timestamp() if fechamento.atualizado_em else None
+        return etag, ultima_alteracao
+
+    @staticmethod
+    def saldo_anterior(data):
+        """Saldo final do último dia registrado antes de `data` (0 se não houver)."""
+        saldo = GestorCaixa._consulta_saldo_anterior(data).first()
+        return saldo if saldo is not None else Decimal('0.00')
+
+    @staticmethod
+    async def asaldo_anterior(data):
+        saldo = await GestorCaixa._consulta_saldo_anterior(data).afirst()
+        return saldo if saldo is not None else Decimal('0.00')
+
+    @staticmethod
+    def _consulta_saldo_anterior(data):
+        return (
+            FechamentoCaixa.objects
+            .filter(data__lt=data)
+            .order_by('-data')
+            .values_list('saldo_final', flat=True)
+        )
+
+    @staticmethod
+    def obter_dia(data):
+        """
+        Versão só-leitura de abrir_dia(): se o dia ainda não existe, devolve um
+        FechamentoCaixa "virtual" (não salvo) com o saldo inicial transportado,
+        sem gravar nada no banco. Use abrir_dia() quando for escrever.
+        """
+        fechamento = FechamentoCaixa.objects.filter(data=data).first()
+        if fechamento is None:
+            fechamento = FechamentoCaixa(data=data, saldo_inicial=GestorCaixa.saldo_anterior(data))
+        return fechamento
+
+    @staticmethod
+    async def aobter_dia(data):
+        """Versão async de obter_dia()."""
+        fechamento = await FechamentoCaixa.objects.filter(data=data).afirst()
+        if fechamento is None:
+            fechamento = FechamentoCaixa(data=data, saldo_inicial=await GestorCaixa.asaldo_anterior(data))
+        return fechamento
+
+    @staticmethod
+    def movimentacoes_do_dia(fechamento):
+        """Movimentações do dia (vazio para um dia virtual, sem ir ao banco)."""
+        if fechamento.pk is None:
+            return Movimentacao.objects.none()
+        return fechamento.movimentacoes.all().select_related('categoria').order_by('id')
+
+    @staticmethod
+    def linhas_do_dia(fechamento, apos_id=None):
+        """
+        Uma página das movimentações do dia como tuplas de COLUNAS_LINHA: as
+        de id maior que `apos_id` (keyset, usa o índice mov_dia_id_idx), com
+        uma linha a mais só para saber se há outra página (ver paginar()).
+        """
+        if fechamento.pk is None:
+            return Movimentacao.objects.none().values_list(*COLUNAS_LINHA)
+        movimentacoes = fechamento.movimentacoes.order_by('id')
+        if apos_id is not None:
+            movimentacoes = movimentacoes.filter(id__gt=apos_id)
+        return movimentacoes.values_list(*COLUNAS_LINHA)[:MOVIMENTACOES_POR_PAGINA + 1]
+
+    @staticmethod
+    async def alinhas_do_dia(fechamento, apos_id=None):
+        """Versão async de linhas_do_dia(), já como lista."""
+        return [linha async for linha in GestorCaixa.linhas_do_dia(fechamento, apos_id)]
+
+    @staticmethod
+    def obter_dias(datas):
+        """
+        Versão em lote de obter_dia() + linhas_do_dia() para vários dias,
+        com número fixo de consultas (dias, movimentações e saldo anterior),
+        não importa o tamanho do intervalo. Retorna [(fechamento, linhas)]
+        na ordem das datas.
+        """
+        datas = sorted(datas)
+        if not datas:
+            return []
+        fechamentos, movimentacoes = GestorCaixa._consultas_dias(datas)
+
+        return GestorCaixa._juntar_dias(
+            datas, list(fechamentos), list(movimentacoes), GestorCaixa.saldo_anterior(datas[0]),
+        )
+
+    @staticmethod
+    async def aobter_dias(datas):
+        """Versão async de obter_dias(), com as mesmas consultas."""
+        datas = sorted(datas)
+        if not datas:
+            return []
+        fechamentos, movimentacoes = GestorCaixa._consultas_dias(datas)
+
+        return GestorCaixa._juntar_dias(
+            datas,
+            [fechamento async for fechamento in fechamentos],
+            [mov async for mov in movimentacoes],
+            await GestorCaixa.asaldo_anterior(datas[0]),
+        )
+
+    @staticmethod
+    def obter_dias_por_id(fechamento_ids):
+        """
+        Como obter_dias(), mas para dias já gravados e possivelmente espalhados
+        (ex: os dias tocados por um lote do /api/sync/). Duas consultas.
+        """
+        fechamentos = FechamentoCaixa.objects.filter(pk__in=fechamento_ids).order_by('data')
+        movs_por_dia = {}
+        linhas = (
+            Movimentacao.objects
+            .filter(fechamento_id__in=fechamento_ids)
+            .order_by('id')
+        )
+        linhas = GestorCaixa._primeira_pagina_por_dia(linhas)
+        for linha in linhas:
+            movs_por_dia.setdefault(linha[1], []).append(linha)
+        return [(fechamento, movs_por_dia.get(fechamento.pk, [])) for fechamento in fechamentos]
+
+    @staticmethod
+    def _consultas_dias(datas):
+        intervalo = [datas[0], datas[-1]]
+        fechamentos = FechamentoCaixa.objects.filter(data__range=intervalo)
+        movimentacoes = (
+            Movimentacao.objects
+            .filter(data__range=intervalo)
+            .order_by('id')
+        )
+        return fechamentos, GestorCaixa._primeira_pagina_por_dia(movimentacoes)
+
+    @staticmethod
+    def _primeira_pagina_por_dia(movimentacoes):
+        """
+        Só a primeira página (+1 linha) de cada dia, como em linhas_do_dia():
+        um dia de evento não faz o lote inteiro crescer.
+        """
+        return (
+            movimentacoes
+            .annotate(ordem_no_dia=Window(RowNumber(), partition_by=F('fechamento_id'), order_by=F('id').asc()))
+            .filter(ordem_no_dia__lte=MOVIMENTACOES_POR_PAGINA + 1)
+            .values_list(*COLUNAS_LINHA)
+        )
+
+    @staticmethod
+    def _juntar_dias(datas, fechamentos, movimentacoes, saldo):
+        """Monta [(fechamento, linhas)] a partir do que já foi lido do banco."""
+        fechamentos = {f.data: f for f in fechamentos}
+
+        movs_por_dia = {}
+        for linha in movimentacoes:
+            movs_por_dia.setdefault(linha[1], []).append(linha)
+
+        dias = []
+        for data in datas:
+            fechamento = fechamentos.get(data)
+            if fechamento is None:
+                # Dia virtual: herda o saldo do último dia registrado
+                dias.append((FechamentoCaixa(data=data, saldo_inicial=saldo), []))
+            else:
+                dias.append((fechamento, movs_por_dia.get(fechamento.pk, [])))
+                saldo = fechamento.saldo_final
+        return dias
+
+    @staticmethod
+    def abrir_dia(data):
+        """
+        Busca o fechamento do dia ou cria já com o saldo inicial transportado
+        (criado no meio da corrente, o signal acerta o saldo inicial dos seguintes).
+        """
+        fechamento = FechamentoCaixa.objects.filter(data=data).first()
+        if fechamento is None:
+            fechamento, _ = FechamentoCaixa.objects.get_or_create(
+                data=data,
+                defaults={'saldo_inicial': GestorCaixa.saldo_anterior(data)}
+            )
+        return fechamento
+
+    @staticmethod
+    def abrir_dias(datas):
+        """
+        Versão em lote do abrir_dia(): cria de uma vez os dias que faltam,
+        com o mesmo saldo inicial que teriam se fossem abertos um a um, e
+        retorna {data: fechamento_id}.
+        """
+        datas = sorted(set(datas))
+        if not datas:
+            return {}
+
+        existentes = {
+            data: (fechamento_id, saldo_final)
+            for data, fechamento_id, saldo_final in FechamentoCaixa.objects
+            .filter(data__range=(datas[0], datas[-1]))
+            .values_list('data', 'id', 'saldo_final')
+        }
+
+        # Percorre o período em ordem: cada dia novo herda o saldo final do último dia gravado
+        novos = []
+        saldo = GestorCaixa.saldo_anterior(datas[0])
+        agora = timezone.now()
+        for data in sorted(existentes.keys() | set(datas)):
+            if data in existentes:
+                saldo = existentes[data][1]
+                continue
+            novos.append(FechamentoCaixa(data=data, saldo_inicial=saldo, versao=1, atualizado_em=agora))
+            saldo = Decimal('0.00')
+
+        FechamentoCaixa.objects.bulk_create(novos, batch_size=500)
+        if novos:
+            # bulk_create não dispara o signal: os dias gravados depois dos novos
+            # passam a herdar o saldo deles, como no abrir_dia()
+            GestorCaixa.propagar_saldo_final(novos[0].data)
+
+        ids = {data: fechamento_id for data, (fechamento_id, _) in existentes.items()}
+        ids.update((fechamento.data, fechamento.pk) for fechamento in novos)
+        return {data: ids[data] for data in datas}
+
+    @staticmethod
+    def propagar_saldo_final(data):
+        """
+        Refaz a corrente de saldos a partir de `data`: cada dia seguinte passa
+        a iniciar com o saldo final do dia registrado imediatamente antes dele.
+        Tudo em um único UPDATE, tocando só as linhas que estão diferentes.
+        """
+        saldo_do_anterior = Subquery(
+            FechamentoCaixa.objects
+            .filter(data__lt=OuterRef('data'))
+            .order_by('-data')
+            .values('saldo_final')[:1]
+        )
+
+        return (
+            FechamentoCaixa.objects
+            .filter(data__gt=data)
+            .annotate(saldo_do_anterior=saldo_do_anterior)
+            .filter(saldo_do_anterior__isnull=False)
+            .exclude(saldo_inicial=F('saldo_do_anterior'))
+            .update(saldo_inicial=saldo_do_anterior, versao=F('versao') + 1, atualizado_em=Now())
+        )
+
+    @staticmethod
+    def mudar_data_do_dia(fechamento, data_anterior):
+        """Acompanha a troca de data de um dia: movimentações e meses do rollup."""
+        fechamento.movimentacoes.update(data=fechamento.data)
+        reconstruir_resumo_mensal(min(data_anterior, fechamento.data), max(data_anterior, fechamento.data))
+
+    @staticmethod
+    def nova_versao_dos_dias(categoria_id):
+        """Gera nova versão para todos os dias que têm movimentações da categoria."""
+        dias = Movimentacao.objects.filter(categoria_id=categoria_id).values('fechamento_id')
+        FechamentoCaixa.objects.filter(pk__in=dias).update(versao=F('versao') + 1, atualizado_em=Now())
+
+    @staticmethod
+    def recalcular_dias(fechamento_ids):
+        """
+        Recalcula do zero os caches de vários dias (cargas em lote): uma
+        agregação agrupada por dia e um UPDATE por dia, com nova versão.
+        """
+        agregados = {campo: Sum('valor', filter=Q(tipo=tipo)) for tipo, campo in CAMPOS_CACHE.items()}
+        totais = {
+            linha.pop('fechamento_id'): linha
+            for linha in Movimentacao.objects.filter(fechamento_id__in=fechamento_ids)
+            .values('fechamento_id').annotate(**agregados).order_by()
+        }
+
+        for fechamento_id in fechamento_ids:
+            linha = totais.get(fechamento_id, {})
+            FechamentoCaixa.objects.filter(pk=fechamento_id).update(
+                cache_sujo=False, versao=F('versao') + 1, atualizado_em=Now(),
+                **{campo: centavos(linha.get(campo)) for campo in CAMPOS_CACHE.values()}
+            )
+
+    @staticmethod
+    def recalcular_sujos(fechamentos):
+        """Recalcula os caches marcados como sujos dentro de um queryset de dias."""
+        for fechamento in fechamentos.filter(cache_sujo=True):
+            GestorCaixa(fechamento).atualizar_cache_do_banco()
+
+    @staticmethod
+    def aplicar_delta(antigo, novo, datas=None):
+        """
+        Aplica nos caches do(s) dia(s) e no ResumoMensal apenas a diferença
+        causada por uma movimentação, sem reagregar o dia nem o mês.
+
+        `antigo` e `novo` são tuplas (fechamento_id, tipo, valor, categoria_id);
+        use None para "não existia" (criação) ou "deixou de existir" (exclusão).
+        `datas` ({fechamento_id: data}) evita buscar a data do dia quando o
+        chamador já a tem em mãos. Cada dia afetado recebe um único UPDATE
+        com F(), então o custo não depende de quantas movimentações o dia tem.
+        """
+        deltas_dia = {}
+        deltas_mes = {}
+
+        for estado, sinal in ((antigo, -1), (novo, 1)):
+            if estado is None:
+                continue
+            fechamento_id, tipo, valor, categoria_id = estado
+            if not valor:
+                continue
+            valor = sinal * Decimal(str(valor))
+
+            campo = CAMPOS_CACHE.get(tipo)
+            if campo is not None:
+                campos_dia = deltas_dia.setdefault(fechamento_id, {})
+                campos_dia[campo] = campos_dia.get(campo, Decimal('0.00')) + valor
+
+            chave = (fechamento_id, tipo, categoria_id)
+            deltas_mes[chave] = deltas_mes.get(chave, Decimal('0.00')) + valor
+
+        # 1. Caches do dia (e nova versão, mesmo quando só a descrição mudou)
+        dias = {estado[0] for estado in (antigo, novo) if estado is not None}
+        for fechamento_id in dias:
+            alteracoes = {
+                campo: F(campo) + delta
+                for campo, delta in deltas_dia.get(fechamento_id, {}).items() if delta
+            }
+            FechamentoCaixa.objects.filter(pk=fechamento_id).update(
+                versao=F('versao') + 1, atualizado_em=Now(), **alteracoes
+            )
+
+        # 2. Rollup mensal (só busca a data do dia se o chamador não informou)
+        deltas_mes = {chave: delta for chave, delta in deltas_mes.items() if delta}
+        if not deltas_mes:
+            return
+
+        datas = dict(datas or {})
+        faltando = {fechamento_id for fechamento_id, _, _ in deltas_mes} - datas.keys()
+        if faltando:
+            datas.update(FechamentoCaixa.objects.filter(pk__in=faltando).values_list('id', 'data'))
+
+        for (fechamento_id, tipo, categoria_id), delta in deltas_mes.items():
+            if fechamento_id not in datas:
+                # Data não informada pelo chamador e o dia não está mais no banco
+                # (ex: excluído por outra transação, que já tirou as movimentações
+                # dele do rollup): não há mês a corrigir
+                continue
+            mes = datas[fechamento_id].replace(day=1)
+            atualizados = ResumoMensal.objects.filter(
+                mes=mes, tipo=tipo, categoria_id=categoria_id
+            ).update(total=F('total') + delta)
+            if not atualizados:
+                ResumoMensal.objects.create(mes=mes, tipo=tipo, categoria_id=categoria_id, total=delta)
+
+
+# ==============================================================================
+# RESUMO MENSAL (ROLLUP) E RELATÓRIO POR CATEGORIA
+# ==============================================================================
+
+# Tabelas do relatório e os tipos de movimentação que entram em cada uma
+GRUPOS_RELATORIO = {
+    'cartao': ['CARTAO'],
+    'saida': ['SAIDA', 'REGISTRO'],
+    'entrada': ['DINHEIRO'],
+}
+
+def paginar(linhas):
+    """
+    Separa a página das linhas lidas com uma a mais (linhas_do_dia()).
+    Retorna (página, há_mais).
+    """
+    linhas = list(linhas)
+    return linhas[:MOVIMENTACOES_POR_PAGINA], len(linhas) > MOVIMENTACOES_POR_PAGINA
+
+def centavos(valor):
+    """Arredonda somas vindas do banco para 2 casas (o SQLite soma em ponto flutuante)."""
+    return Decimal(valor or 0).quantize(Decimal('0.01'))
+
+def _primeiro_dia_proximo_mes(data):
+    return (data.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+def reconstruir_resumo_mensal(mes_inicio=None, mes_fim=None):
+    """
+    Refaz do zero as linhas do ResumoMensal entre dois meses (inclusive),
+    ou de todo o histórico se nenhum limite for informado.
+    """
+    resumos = ResumoMensal.objects.all()
+    movimentacoes = Movimentacao.objects.all()
+
+    if mes_inicio:
+        mes_inicio = mes_inicio.replace(day=1)
+        resumos = resumos.filter(mes__gte=mes_inicio)
+        movimentacoes = movimentacoes.filter(data__gte=mes_inicio)
+    if mes_fim:
+        resumos = resumos.filter(mes__lte=mes_fim.replace(day=1))
+        movimentacoes = movimentacoes.filter(data__lt=_primeiro_dia_proximo_mes(mes_fim))
+
+    linhas = (
+        movimentacoes
+        .annotate(mes=TruncMonth('data'))
+        .values('mes', 'tipo', 'categoria_id')
+        .annotate(total=Sum('valor'))
+        .order_by()
+    )
+
+    with transaction.atomic():
+        resumos.delete()
+        ResumoMensal.objects.bulk_create([ResumoMensal(**linha) for linha in linhas], batch_size=500)
+
+def planejar_periodo(data_inicio, data_fim):
+    """
+    Divide o período em meses completos (atendidos pelo ResumoMensal) e
+    nas pontas de dias avulsos (atendidas pelas tabelas ao vivo).
+    Retorna (meses, pontas): meses é (primeiro_mes, ultimo_mes) ou None,
+    pontas é uma lista de intervalos (inicio, fim) de dias.
+    """
+    primeiro_mes = data_inicio if data_inicio.day == 1 else _primeiro_dia_proximo_mes(data_inicio)
+
+    # fim_meses é exclusivo: o primeiro dia que já não pertence a um mês completo
+    fim_meses = _primeiro_dia_proximo_mes(data_fim)
+    if data_fim != fim_meses - timedelta(days=1):
+        fim_meses = data_fim.replace(day=1)
+
+    if primeiro_mes >= fim_meses:
+        return None, [(data_inicio, data_fim)]
+
+    pontas = []
+    if data_inicio < primeiro_mes:
+        pontas.append((data_inicio, primeiro_mes - timedelta(days=1)))
+    if fim_meses <= data_fim:
+        pontas.append((fim_meses, data_fim))
+
+    ultimo_mes = (fim_meses - timedelta(days=1)).replace(day=1)
+    return (primeiro_mes, ultimo_mes), pontas
+
+def resumo_por_categoria(data_inicio, data_fim):
+    """
+    Totais por categoria de cada tabela do relatório (cartão, saída e
+    entrada), juntando o ResumoMensal dos meses completos com as
+    movimentações dos dias avulsos das pontas. As duas fontes vão ao banco
+    numa única consulta (UNION ALL) agrupada por tipo x categoria; a
+    separação nas três tabelas é feita aqui. Agrupa pelo id da categoria,
+    para categorias de mesmo nome não se misturarem.
+    """
+    meses, pontas = planejar_periodo(data_inicio, data_fim)
+    campos = ('tipo', 'categoria_id', 'categoria__nome')
+    parciais = []
+
+    if meses:
+        parciais.append(
+            ResumoMensal.objects
+            .filter(mes__range=meses)
+            .values(*campos)
+            .annotate(soma=Sum('total'))
+            .order_by()
+        )
+    if pontas:
+        filtro_pontas = Q()
+        for inicio, fim in pontas:
+            filtro_pontas |= Q(data__range=[inicio, fim])
+        parciais.append(
+            Movimentacao.objects
+            .filter(filtro_pontas)
+            .values(*campos)
+            .annotate(soma=Sum('valor'))
+            .order_by()
+        )
+    linhas = parciais[0].union(*parciais[1:], all=True) if len(parciais) > 1 else parciais[0]
+
+    # Separa por tabela, somando a mesma categoria vinda das duas fontes
+    acumulado = {grupo: {} for grupo in GRUPOS_RELATORIO}
+    for linha in linhas:
+        for grupo, tipos in GRUPOS_RELATORIO.items():
+            if linha['tipo'] in tipos:
+                item = acumulado[grupo].setdefault(
+                    linha['categoria_id'], {'categoria__nome': linha['categoria__nome'], 'total': 0}
+                )
+                item['total'] += linha['soma']
+
+    return {
+        grupo: sorted(
+            ({**item, 'total': centavos(item['total'])} for item in itens.values() if centavos(item['total'])),
+            key=lambda item: item['total'],
+            reverse=True,
+        )
+        for grupo, itens in acumulado.items()
+    }
@@ -1,18 +1,115 @@
-from django.db.models.signals import post_save, post_delete
+from django.db import transaction
+from django.db.models.signals import post_init, pre_save, post_save, pre_delete, post_delete
 from django.dispatch import receiver
-from django.db.models import Sum, Q
-from .models import Movimentacao
-
-@receiver([post_save, post_delete], sender=Movimentacao)
-def atualizar_cache_fechamento(sender, instance, **kwargs):
-    fechamento = instance.fechamento
-
-    # Recalcula e salva no fechamento
-    resumo = fechamento.movimentacoes.aggregate(
-        cartao=Sum('valor', filter=Q(tipo='CARTAO')),
-        saida=Sum('valor', filter=Q(tipo='SAIDA'))
-    )
-
-    fechamento.cache_total_cartao = resumo['cartao'] or 0
-    fechamento.cache_total_saida = resumo['saida'] or 0
-    fechamento.save()
\ No newline at end of file
+from .models import Movimentacao, FechamentoCaixa, Categoria
+from .services import GestorCaixa
+from .cache import categorias, invalidar_relatorios
+
+# Campos que influenciam os caches do dia e o ResumoMensal
+CAMPOS_ESTADO = ('fechamento_id', 'tipo', 'valor', 'categoria_id')
+
+def _estado(instance):
+    """Tupla (fechamento_id, tipo, valor, categoria_id) usada no cálculo do delta."""
+    return tuple(getattr(instance, campo) for campo in CAMPOS_ESTADO)
+
+def _datas_conhecidas(instance):
+    """Data do dia já carregada na instância, para não consultá-la de novo."""
+    fechamento = instance._state.fields_cache.get('fechamento')
+    if fechamento is not None and fechamento.pk == instance.fechamento_id:
+        return {fechamento.pk: fechamento.data}
+    return {instance.fechamento_id: instance.data} if instance.data else {}
+
+@receiver(post_init, sender=Movimentacao)
+def guardar_estado_original(sender, instance, **kwargs):
+    if instance.get_deferred_fields() & set(CAMPOS_ESTADO):
+        # Carregada com .only()/.defer(): o estado é lido do banco se precisar
+        instance._estado_original = None
+    else:
+        instance._estado_original = _estado(instance)
+
+def _estado_no_banco(instance):
+    """Estado da linha como está gravada agora, travada até o fim da transação (None se não existe)."""
+    return Movimentacao.objects.select_for_update().filter(pk=instance.pk).values_list(*CAMPOS_ESTADO).first()
+
+@receiver(pre_save, sender=Movimentacao)
+def ler_estado_atual(sender, instance, **kwargs):
+    # O delta parte da linha no banco, não da cópia carregada: duas cópias
+    # velhas da mesma movimentação não podem descontar o mesmo valor antigo.
+    # Se a linha já foi excluída, o save() a insere de novo e conta como criação.
+    instance._estado_original = None if instance._state.adding else _estado_no_banco(instance)
+
+@receiver(pre_delete, sender=Movimentacao)
+def ler_estado_antes_de_excluir(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, FechamentoCaixa):
+        # Cascata da exclusão do dia: os caches do dia somem junto; basta a cópia carregada
+        if instance._estado_original is None:
+            instance._estado_original = _estado_no_banco(instance)
+        return
+    # Exclusão direta: desconta o que está gravado (nada, se outra cópia já excluiu)
+    instance._estado_original = _estado_no_banco(instance)
+
+@receiver(pre_save, sender=Movimentacao)
+def sincronizar_data(sender, instance, **kwargs):
+    # Movimentacao.data acompanha o dia; só consulta o banco quando o dia mudou
+    original = instance._estado_original
+    if instance.data is not None and original is not None and original[0] == instance.fechamento_id:
+        return
+    fechamento = instance._state.fields_cache.get('fechamento')
+    if fechamento is not None and fechamento.pk == instance.fechamento_id:
+        instance.data = fechamento.data
+    else:
+        instance.data = FechamentoCaixa.objects.values_list('data', flat=True).get(pk=instance.fechamento_id)
+
+@receiver(post_save, sender=Movimentacao)
+def aplicar_delta_ao_salvar(sender, instance, created, **kwargs):
+    antigo = None if created else instance._estado_original
+    novo = _estado(instance)
+
+    GestorCaixa.aplicar_delta(antigo, novo, datas=_datas_conhecidas(instance))
+    instance._estado_original = novo
+    transaction.on_commit(invalidar_relatorios)
+
+@receiver(post_delete, sender=Movimentacao)
+def aplicar_delta_ao_deletar(sender, instance, **kwargs):
+    GestorCaixa.aplicar_delta(instance._estado_original, None, datas=_datas_conhecidas(instance))
+    transaction.on_commit(invalidar_relatorios)
+
+@receiver(post_init, sender=FechamentoCaixa)
+def guardar_saldo_final_original(sender, instance, **kwargs):
+    instance._saldo_final_original = instance.__dict__.get('saldo_final')
+    instance._data_original = instance.__dict__.get('data')
+
+@receiver(post_save, sender=FechamentoCaixa)
+def propagar_saldo_final(sender, instance, created, **kwargs):
+    # Dia criado no meio da corrente passa a ser o "dia anterior" dos seguintes:
+    # eles herdam o saldo final dele, mesmo que ainda seja 0
+    mudou = created or instance.saldo_final != instance._saldo_final_original
+
+    if mudou:
+        GestorCaixa.propagar_saldo_final(instance.data)
+    instance._saldo_final_original = instance.saldo_final
+    transaction.on_commit(invalidar_relatorios)
+
+@receiver(post_save, sender=FechamentoCaixa)
+def sincronizar_data_das_movimentacoes(sender, instance, created, **kwargs):
+    # Raro (só pelo admin): o dia mudou de data, leva junto a cópia nas movimentações
+    anterior = instance._data_original
+    if not created and anterior is not None and anterior != instance.data:
+        GestorCaixa.mudar_data_do_dia(instance, anterior)
+    instance._data_original = instance.data
+
+@receiver([post_save, post_delete], sender=Categoria)
+def invalidar_cache_categorias(sender, **kwargs):
+    categorias.invalidar()
+    transaction.on_commit(invalidar_relatorios)
+
+@receiver(post_save, sender=Categoria)
+def versionar_dias_da_categoria_alterada(sender, instance, created, **kwargs):
+    # O nome da categoria aparece no JSON dos dias: muda a versão (e o ETag) deles
+    if not created:
+        GestorCaixa.nova_versao_dos_dias(categoria_id=instance.pk)
+
+@receiver(pre_delete, sender=Categoria)
+def versionar_dias_da_categoria_removida(sender, instance, **kwargs):
+    # Depois da exclusão as movimentações ficam sem categoria e não dá mais para achá-las
+    GestorCaixa.nova_versao_dos_dias(categoria_id=instance.pk)
@@ -0,0 +1,236 @@
+from datetime import date, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.db import IntegrityError, transaction
+
+from .models import Categoria, Movimentacao, OperacaoSincronizada
+from .services import GestorCaixa, reconstruir_resumo_mensal
+from .cache import invalidar_relatorios
+
+# ==============================================================================
+# SINCRONIZAÇÃO DAS ESCRITAS FEITAS OFFLINE (/api/sync/)
+# ==============================================================================
+
+# Operações aceitas por lote
+LIMITE_OPERACOES = 200
+
+TIPOS = {codigo for codigo, _ in Movimentacao.TIPO_CHOICES}
+
+# Maior valor que cabe em DecimalField(max_digits=10, decimal_places=2)
+VALOR_MAXIMO = Decimal('99999999.99')
+
+CAMPOS_EDITAVEIS = ['tipo', 'valor', 'categoria', 'descricao']
+
+class ErroOperacao(ValueError):
+    """Operação do lote que não pode ser aplicada (reenviar não resolve)."""
+
+class LoteEmProcessamento(Exception):
+    """O mesmo lote chegou duas vezes ao mesmo tempo e o outro já gravou as chaves."""
+
+class SincronizadorOffline:
+    """
+    Aplica um lote de operações feitas offline, na ordem em que foram feitas:
+        {'chave', 'acao': 'criar', 'data', 'tipo', 'valor', 'categoria', 'descricao'}
+        {'chave', 'acao': 'editar', 'id' ou 'ref', 'tipo', 'valor', 'categoria', 'descricao'}
+        {'chave', 'acao': 'deletar', 'id' ou 'ref'}
+    'ref' é a chave da operação que criou a movimentação (ainda sem id no
+    aparelho). Tudo numa transação e, como no importador, com escritas em
+    lote: cada dia afetado é recalculado uma vez só, no fim.
+    """
+
+    def __init__(self):
+        self.dias = set()  # fechamento_id dos dias tocados pelo lote
+
+    def sincronizar(self, operacoes):
+        """Retorna um resultado por operação: {'chave', 'status', 'id' ou 'erro'}."""
+        with transaction.atomic():
+            resultados = self._aplicar(operacoes)
+        if self.dias:
+            invalidar_relatorios()
+        return resultados
+
+    def _aplicar(self, operacoes):
+        operacoes = [op if isinstance(op, dict) else {} for op in operacoes]
+        refs = {op.get('ref') for op in operacoes if isinstance(op.get('ref'), str)}
+        chaves = {op.get('chave') for op in operacoes if isinstance(op.get('chave'), str)}
+        self._ja_aplicadas = dict(
+            OperacaoSincronizada.objects.filter(chave__in=chaves | refs).values_list('chave', 'movimentacao_id')
+        )
+
+        # Categorias conferidas no banco, dentro da transação: o cache de categorias
+        # pode estar velho, e a trava impede que sejam excluídas até o commit
+        self._categorias = set(
+            Categoria.objects.select_for_update()
+            .filter(id__in=self._ids_de_categoria(operacoes)).values_list('id', flat=True)
+        )
+
+        # Movimentações já gravadas que o lote edita ou exclui, numa consulta
+        ids = {op.get('id') for op in operacoes if isinstance(op.get('id'), int)}
+        ids |= {self._ja_aplicadas[ref] for ref in refs if self._ja_aplicadas.get(ref)}
+        self._existentes = Movimentacao.objects.in_bulk(ids)
+
+        self._novas = {}        # chave da criação -> Movimentacao ainda não gravada
+        self._alteradas = {}    # id -> Movimentacao existente editada
+        self._excluidas = {}    # id -> Movimentacao existente excluída
+        aplicadas = []          # (chave, Movimentacao ou None, resultado)
+        resultados = []
+
+        for op in operacoes:
+            chave = op.get('chave')
+            resultado = {'chave': chave}
+            resultados.append(resultado)
+
+            if not isinstance(chave, str) or not 0 < len(chave) <= 64:
+                resultado.update(status='erro', erro='chave inválida')
+                continue
+            if chave in self._ja_aplicadas:
+                resultado.update(status='duplicada', id=self._ja_aplicadas[chave])
+                continue
+            if any(chave == outra for outra, _, _ in aplicadas):
+                resultado.update(status='duplicada')
+                continue
+
+            try:
+                mov = self._executar(chave, op)
+            except ErroOperacao as erro:
+                resultado.update(status='erro', erro=str(erro))
+                continue
+            resultado['status'] = 'ok'
+            aplicadas.append((chave, mov, resultado))
+
+        self._gravar()
+
+        try:
+            OperacaoSincronizada.objects.bulk_create([
+                OperacaoSincronizada(chave=chave, movimentacao_id=mov.pk if mov is not None else None)
+                for chave, mov, _ in aplicadas
+            ])
+        except IntegrityError:
+            # Chave única repetida: outro envio do mesmo lote chegou antes
+            raise LoteEmProcessamento()
+        for _, mov, resultado in aplicadas:
+            resultado['id'] = mov.pk if mov is not None else None
+        return resultados
+
+    def _executar(self, chave, op):
+        """Aplica a operação em memória; retorna a movimentação resultante (None se excluída)."""
+        acao = op.get('acao')
+        if acao == 'criar':
+            mov = Movimentacao(data=self._ler_data(op.get('data')), **self._ler_campos(op))
+            self._novas[chave] = mov
+            return mov
+
+        if acao not in ('editar', 'deletar'):
+            raise ErroOperacao(f'ação inválida: {acao!r}')
+
+        mov = self._alvo(op)
+        if acao == 'editar':
+            if mov is None:
+                raise ErroOperacao('a movimentação não existe mais')
+            for campo, valor in self._ler_campos(op).items():
+                setattr(mov, campo, valor)
+            if mov.pk is not None:
+                self._alteradas[mov.pk] = mov
+            return mov
+
+        # Excluir o que já não existe não é erro: o resultado é o mesmo
+        if mov is not None and mov.pk is None:
+            # Criada e excluída no mesmo lote: nunca chega ao banco
+            mov.descartada = True
+        elif mov is not None:
+            self._alteradas.pop(mov.pk, None)
+            self._excluidas[mov.pk] = mov
+        return None
+
+    def _alvo(self, op):
+        """Movimentação que a edição/exclusão atinge (None se já não existe)."""
+        ref = op.get('ref')
+        if ref is not None:
+            if not isinstance(ref, str):
+                raise ErroOperacao('ref inválida')
+            if ref in self._novas:
+                mov = self._novas[ref]
+                return None if getattr(mov, 'descartada', False) else mov
+            if ref not in self._ja_aplicadas:
+                raise ErroOperacao(f'ref desconhecida: {ref!r}')
+            pk = self._ja_aplicadas[ref]
+        elif isinstance(op.get('id'), int):
+            pk = op['id']
+        else:
+            raise ErroOperacao('informe id ou ref')
+
+        return None if pk in self._excluidas else self._existentes.get(pk)
+
+    def _gravar(self):
+        novas = [mov for mov in self._novas.values() if not getattr(mov, 'descartada', False)]
+        tocadas = [*novas, *self._alteradas.values(), *self._excluidas.values()]
+        if not tocadas:
+            return
+
+        if novas:
+            dias = GestorCaixa.abrir_dias({mov.data for mov in novas})
+            for mov in novas:
+                mov.fechamento_id = dias[mov.data]
+            Movimentacao.objects.bulk_create(novas)
+        if self._alteradas:
+            Movimentacao.objects.bulk_update(self._alteradas.values(), CAMPOS_EDITAVEIS)
+        if self._excluidas:
+            # delete() do ORM dispara os signals (delta por linha); os totais
+            # ficam certos de qualquer jeito, pois o recálculo abaixo refaz tudo
+            Movimentacao.objects.filter(pk__in=self._excluidas).delete()
+
+        # Uma recalculada por dia e por mês, em vez de um delta por operação
+        self.dias = {mov.fechamento_id for mov in tocadas}
+        GestorCaixa.recalcular_dias(list(self.dias))
+        datas = {mov.data for mov in tocadas}
+        reconstruir_resumo_mensal(min(datas), max(datas))
+
+    def _ler_data(self, valor):
+        try:
+            data = date.fromisoformat(valor)
+        except (TypeError, ValueError):
+            raise ErroOperacao(f'data inválida: {valor!r}')
+        # Domingo não tem caixa: lança no dia seguinte (mesma regra do caderno)
+        if data.weekday() == 6:
+            data += timedelta(days=1)
+        return data
+
+    @staticmethod
+    def _ids_de_categoria(operacoes):
+        ids = set()
+        for op in operacoes:
+            try:
+                ids.add(int(op.get('categoria')))
+            except (TypeError, ValueError):
+                continue
+        return ids
+
+    def _ler_campos(self, op):
+        """Mesmas regras do MovimentacaoForm, com as categorias lidas uma vez para o lote."""
+        tipo = op.get('tipo')
+        if tipo not in TIPOS:
+            raise ErroOperacao(f'tipo inválido: {tipo!r}')
+
+        try:
+            valor = Decimal(str(op.get('valor'))).quantize(Decimal('0.01'))
+            # 'NaN' passa pelo quantize, mas não pode ser comparado
+            valido = valor.is_finite() and 0 < valor <= VALOR_MAXIMO
+        except InvalidOperation:
+            valido = False
+        if not valido:
+            raise ErroOperacao(f"valor inválido: {op.get('valor')!r}")
+
+        categoria = op.get('categoria')
+        try:
+            categoria = int(categoria)
+        except (TypeError, ValueError):
+            raise ErroOperacao('categoria obrigatória')
+        if categoria not in self._categorias:
+            raise ErroOperacao(f'categoria não cadastrada: {categoria}')
+
+        return {
+            'tipo': tipo,
+            'valor': valor,
+            'categoria_id': categoria,
+            'descricao': str(op.get('descricao') or '').strip()[:200] or None,
+        }
@@ -1,3 +1,800 @@
-from django.test import TestCase
+import asyncio
+import json
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.db.models import Sum
+from django.http import HttpResponse
+from django.db.models.functions import TruncMonth
+from django.test import TestCase, RequestFactory, override_settings
+from django.urls import reverse
+
+from .models import FechamentoCaixa, Movimentacao, Categoria, ResumoMensal, OperacaoSincronizada
+from .importacao import ImportadorMovimentacoes
+from .services import GestorCaixa, MOVIMENTACOES_POR_PAGINA, planejar_periodo, resumo_por_categoria
+from .views import api_dados_caixa, api_dados_caixa_async, api_dados_intervalo, api_dados_intervalo_async
+from .cache import CacheCategorias, categorias as cache_categorias, chave_relatorio
+from core.middleware import MedicaoDesempenhoMiddleware, MetricasRequests
+
+from .benchmark import CAMINHOS_SERIALIZACAO, ORCAMENTO_CONSULTAS, cenarios, gerar_dados_sinteticos, medir
+
+
+class ResumoPeriodoTests(TestCase):
+    """FechamentoCaixa.objects.resumo_periodo() x laço dia a dia antigo do relatório."""
+
+    def setUp(self):
+        dias = [
+            # (saldo_inicial, saldo_final, cartao, saida, suprimento)
+            ('100.00', '250.00', '80.00', '30.00', '0.00'),
+            ('250.00', '120.00', '0.00', '10.00', '0.00'),   # dinheiro negativo -> 0
+            ('120.00', '300.00', '15.50', '0.00', '50.00'),
+            ('0.00', '0.00', '0.00', '0.00', '0.00'),
+            ('300.00', '410.35', '999.99', '12.34', '5.01'),
+        ]
+        inicio = date(2026, 3, 2)
+        for i, (inicial, final, cartao, saida, suprimento) in enumerate(dias):
+            FechamentoCaixa.objects.create(
+                data=inicio + timedelta(days=i),
+                saldo_inicial=Decimal(inicial),
+                saldo_final=Decimal(final),
+                cache_total_cartao=Decimal(cartao),
+                cache_total_saida=Decimal(saida),
+                cache_total_suprimento=Decimal(suprimento),
+            )
+
+    def _laco_python(self, fechamentos):
+        total_dinheiro_calc = 0
+        for dia in fechamentos:
+            venda_dia = (dia.cache_total_saida + dia.saldo_final) - (dia.saldo_inicial + dia.cache_total_suprimento)
+            if venda_dia < 0:
+                venda_dia = 0
+            total_dinheiro_calc += venda_dia
+        return total_dinheiro_calc
+
+    def test_equivalente_ao_laco_python(self):
+        for inicio, fim in [(date(2026, 3, 1), date(2026, 3, 31)), (date(2026, 3, 3), date(2026, 3, 4))]:
+            fechamentos = FechamentoCaixa.objects.filter(data__range=[inicio, fim])
+            resumo = fechamentos.resumo_periodo()
+
+            self.assertEqual(resumo['total_dinheiro'], self._laco_python(fechamentos))
+            self.assertEqual(resumo['dias_contados'], fechamentos.count())
+            self.assertEqual(resumo['total_cartao'], sum(f.cache_total_cartao for f in fechamentos))
+            self.assertEqual(resumo['total_saida'], sum(f.cache_total_saida for f in fechamentos))
+            self.assertEqual(resumo['total_suprimento'], sum(f.cache_total_suprimento for f in fechamentos))
+
+    def test_periodo_vazio(self):
+        resumo = FechamentoCaixa.objects.filter(data__year=2000).resumo_periodo()
+
+        self.assertIsNone(resumo['total_dinheiro'])
+        self.assertEqual(resumo['dias_contados'], 0)
+
+
+class GeracaoRelatorioTests(TestCase):
+    """A geração dos relatórios só muda depois que a escrita é confirmada."""
+
+    def test_invalida_no_commit(self):
+        dia = FechamentoCaixa.objects.create(data=date(2026, 3, 2))
+        chave = chave_relatorio(date(2026, 3, 1), date(2026, 3, 31))
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            Movimentacao.objects.create(fechamento=dia, tipo='CARTAO', valor=Decimal('5.00'))
+        self.assertEqual(chave_relatorio(date(2026, 3, 1), date(2026, 3, 31)), chave)
+
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(chave_relatorio(date(2026, 3, 1), date(2026, 3, 31)), chave)
+
+
+class ImportacaoTests(TestCase):
+    """Carga em lote: caches do dia e ResumoMensal iguais aos do caminho normal."""
+
+    def setUp(self):
+        self.ifood = Categoria.objects.create(nome='Ifood', tipo='CARTAO')
+        FechamentoCaixa.objects.create(data=date(2026, 3, 2), saldo_final=Decimal('80.00'))
+
+    def test_csv(self):
+        arquivo = BytesIO(
+            'data;tipo;valor;categoria;descricao\n'
+            '02/03/2026;CARTAO;1.234,56;ifood;repasse\n'
+            '03/03/2026;Saída;10,00;;\n'
+            '03/03/2026;CARTAO;5.50;Ifood;\n'
+            '04/03/2026;XPTO;1,00;;\n'
+            '05/03/2026;CARTAO;2,00;Nova;\n'
+            '05/03/2026;CARTAO;NaN;;\n'.encode('utf-8')
+        )
+        # Dois lotes, mas um único recálculo dos dias e do ResumoMensal, no fim
+        with mock.patch.object(GestorCaixa, 'recalcular_dias', wraps=GestorCaixa.recalcular_dias) as recalcular:
+            resultado = ImportadorMovimentacoes(tamanho_lote=2).importar(arquivo, 'csv')
+        recalcular.assert_called_once()
+
+        self.assertEqual(resultado['importadas'], 3)
+        self.assertEqual([numero for numero, _ in resultado['erros']], [5, 6, 7])
+        self.assertEqual(resultado['erros'][-1][1], "valor inválido: 'NaN'")
+
+        dia_2, dia_3 = FechamentoCaixa.objects.order_by('data')
+        self.assertEqual(dia_2.cache_total_cartao, Decimal('1234.56'))
+        self.assertEqual(dia_3.cache_total_cartao, Decimal('5.50'))
+        self.assertEqual(dia_3.cache_total_saida, Decimal('10.00'))
+        self.assertEqual(dia_3.saldo_inicial, Decimal('80.00'))
+
+        resumo = ResumoMensal.objects.get(mes=date(2026, 3, 1), tipo='CARTAO', categoria=self.ifood)
+        self.assertEqual(resumo.total, Decimal('1240.06'))
+
+    def test_ofx(self):
+        arquivo = BytesIO(
+            b'OFXHEADER:100\n<OFX><BANKTRANLIST>\n'
+            b'<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20260302120000<TRNAMT>150.00<MEMO>Repasse\n</STMTTRN>\n'
+            b'<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20260302<TRNAMT>-3.90<MEMO>Tarifa\n</STMTTRN>\n'
+            b'</BANKTRANLIST></OFX>\n'
+        )
+        resultado = ImportadorMovimentacoes().importar(arquivo, 'ofx')
+
+        self.assertEqual(resultado['importadas'], 2)
+        self.assertEqual(
+            sorted(Movimentacao.objects.values_list('tipo', 'valor')),
+            [('CARTAO', Decimal('150.00')), ('SAIDA', Decimal('3.90'))],
+        )
+
+
+class ExportacaoTests(TestCase):
+    """Exportação em streaming: linhas e totais de um período pequeno."""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('exporta'))
+        ifood = Categoria.objects.create(nome='Ifood', tipo='CARTAO')
+        dia_2 = FechamentoCaixa.objects.create(data=date(2026, 3, 2), saldo_final=Decimal('50.00'))
+        dia_3 = FechamentoCaixa.objects.create(data=date(2026, 3, 3), saldo_inicial=Decimal('50.00'), saldo_final=Decimal('70.00'))
+        self.movs = [
+            Movimentacao.objects.create(fechamento=dia_2, tipo='CARTAO', valor=Decimal('12.50'), categoria=ifood, descricao='repasse'),
+            Movimentacao.objects.create(fechamento=dia_3, tipo='SAIDA', valor=Decimal('4.00')),
+            Movimentacao.objects.create(fechamento=dia_3, tipo='CARTAO', valor=Decimal('1.50')),
+        ]
+        # Cache sujo: a exportação dos dias tem de recalcular antes de ler
+        FechamentoCaixa.objects.filter(pk=dia_3.pk).update(cache_sujo=True, cache_total_cartao=0)
+        FechamentoCaixa.objects.create(data=date(2026, 3, 4))
+
+    def _baixar(self, **params):
+        resposta = self.client.get('/exportar/', params)
+        self.assertEqual(resposta.status_code, 200)
+        return b''.join(resposta.streaming_content).decode('utf-8')
+
+    def test_movimentacoes_csv(self):
+        a, b, c = (mov.id for mov in self.movs)
+        self.assertEqual(self._baixar(de='2026-03-02', ate='2026-03-03').splitlines(), [
+            'id;data;tipo;valor;categoria;descricao',
+            f'{a};2026-03-02;CARTAO;12.50;Ifood;repasse',
+            f'{b};2026-03-03;SAIDA;4.00;;',
+            f'{c};2026-03-03;CARTAO;1.50;;',
+        ])
+
+    def test_fechamentos_jsonl(self):
+        linhas = [json.loads(linha) for linha in self._baixar(conteudo='fechamentos', formato='jsonl', ate='2026-03-03').splitlines()]
+        self.assertEqual(linhas, [
+            {'data': '2026-03-02', 'saldo_inicial': '0.00', 'saldo_final': '50.00',
+             'total_cartao': '12.50', 'total_saida': '0.00', 'total_suprimento': '0.00'},
+            {'data': '2026-03-03', 'saldo_inicial': '50.00', 'saldo_final': '70.00',
+             'total_cartao': '1.50', 'total_saida': '4.00', 'total_suprimento': '0.00'},
+        ])
+        self.assertEqual(self.client.get('/exportar/', {'formato': 'xls'}).status_code, 400)
+
+
+class CacheCategoriasTests(TestCase):
+    """Lista de categorias em memória: invalidada a cada escrita, com acertos e falhas contados."""
+
+    def setUp(self):
+        self.cache = CacheCategorias()
+        self.categoria = Categoria.objects.create(nome='Ifood', tipo='CARTAO')
+        cache.delete('categorias')
+
+    def _nomes(self):
+        return [categoria['nome'] for categoria in self.cache.listar()]
+
+    def test_acertos_e_falhas(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self._nomes(), ['Ifood'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self._nomes(), ['Ifood'])
+        self.assertEqual(self.cache.estatisticas(), {'versao': 0, 'acertos': 1, 'falhas': 1})
+
+    def test_escrita_em_categoria_invalida(self):
+        # Os signals invalidam a instância global; aqui ela é a do teste
+        with mock.patch('financeiro.signals.categorias', self.cache):
+            self._nomes()
+            self.categoria.nome = 'iFood'
+            self.categoria.save()
+            self.assertEqual(self._nomes(), ['iFood'])
+
+            self.categoria.delete()
+            self.assertEqual(self._nomes(), [])
+        self.assertEqual(self.cache.estatisticas(), {'versao': 2, 'acertos': 0, 'falhas': 3})
+
+
+class DeltaTotaisTests(TestCase):
+    """Caches do dia mantidos por delta (signals) e a conferência do reconciliar_caixa."""
+
+    def setUp(self):
+        self.dia = FechamentoCaixa.objects.create(data=date(2026, 3, 2))
+        self.mov = Movimentacao.objects.create(fechamento=self.dia, tipo='CARTAO', valor=Decimal('10.00'))
+
+    def _total_cartao(self):
+        return FechamentoCaixa.objects.get(pk=self.dia.pk).cache_total_cartao
+
+    def test_copias_velhas_da_mesma_movimentacao(self):
+        copia_a = Movimentacao.objects.get(pk=self.mov.pk)
+        copia_b = Movimentacao.objects.get(pk=self.mov.pk)
+        copia_a.valor = Decimal('20.00')
+        copia_a.save()
+        copia_b.valor = Decimal('30.00')
+        copia_b.save()
+        self.assertEqual(self._total_cartao(), Decimal('30.00'))
+
+        # Cópia velha salva depois da exclusão: volta a existir e conta como criação
+        copia_a.delete()
+        copia_b.delete()  # Já excluída: não desconta de novo
+        self.assertEqual(self._total_cartao(), Decimal('0.00'))
+        copia_a.valor = Decimal('5.00')
+        copia_a.save()
+        self.assertEqual(self._total_cartao(), Decimal('5.00'))
+
+    def test_reconciliar_caixa(self):
+        FechamentoCaixa.objects.filter(pk=self.dia.pk).update(cache_total_cartao=Decimal('99.00'))
+        ResumoMensal.objects.update(total=Decimal('1.00'))
+        self.client.force_login(User.objects.create_user('reconcilia'))
+        etag = self.client.get('/api/dados/2026-03-02/')['ETag']
+        chave = chave_relatorio(date(2026, 3, 1), date(2026, 3, 31))
+
+        saida = StringIO()
+        call_command('reconciliar_caixa', stdout=saida)
+        self.assertIn('cache=99.00 recalculado=10.00', saida.getvalue())
+        self.assertEqual(self._total_cartao(), Decimal('99.00'))  # Sem --corrigir não grava
+
+        call_command('reconciliar_caixa', '--corrigir', stdout=StringIO())
+        self.assertEqual(self._total_cartao(), Decimal('10.00'))
+        self.assertEqual(ResumoMensal.objects.get(mes=date(2026, 3, 1)).total, Decimal('10.00'))
+        # A correção é uma escrita: novo ETag (sem 304 nem JSON guardado) e relatórios invalidados
+        resposta = self.client.get('/api/dados/2026-03-02/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertNotEqual(resposta['ETag'], etag)
+        self.assertEqual(resposta.json()['totais']['cartao'], '10.00')
+        self.assertNotEqual(chave_relatorio(date(2026, 3, 1), date(2026, 3, 31)), chave)
+
+        saida = StringIO()
+        call_command('reconciliar_caixa', stdout=saida)
+        self.assertIn('Todos os caches conferem.', saida.getvalue())
+
+
+class ResumoMensalTests(TestCase):
+    """Rollup mensal mantido por delta x agregação direta das movimentações."""
+
+    def _confere_com_agregado(self):
+        agregado = {
+            (linha['mes'], linha['tipo'], linha['categoria_id']): linha['soma']
+            for linha in Movimentacao.objects.annotate(mes=TruncMonth('data'))
+            .values('mes', 'tipo', 'categoria_id').annotate(soma=Sum('valor')).order_by()
+        }
+        rollup = {
+            (r.mes, r.tipo, r.categoria_id): r.total for r in ResumoMensal.objects.exclude(total=0)
+        }
+        self.assertEqual(rollup, agregado)
+
+    def test_criar_editar_mover_excluir(self):
+        ifood = Categoria.objects.create(nome='Ifood', tipo='CARTAO')
+        maquininha = Categoria.objects.create(nome='Maquininha', tipo='CARTAO')
+        marco = FechamentoCaixa.objects.create(data=date(2026, 3, 31))
+        abril = FechamentoCaixa.objects.create(data=date(2026, 4, 1))
+
+        mov = Movimentacao.objects.create(fechamento=marco, tipo='CARTAO', categoria=ifood, valor=Decimal('10.00'))
+        Movimentacao.objects.create(fechamento=marco, tipo='SAIDA', valor=Decimal('3.00'))
+        self._confere_com_agregado()
+
+        mov.valor, mov.categoria = Decimal('25.00'), maquininha
+        mov.save()
+        self._confere_com_agregado()
+
+        mov.fechamento = abril  # Muda de dia e de mês
+        mov.save()
+        self._confere_com_agregado()
+        self.assertEqual(ResumoMensal.objects.get(mes=date(2026, 4, 1)).total, Decimal('25.00'))
+
+        # Duas cópias velhas editadas em sequência: vale a última gravação
+        copia_a, copia_b = Movimentacao.objects.get(pk=mov.pk), Movimentacao.objects.get(pk=mov.pk)
+        copia_a.valor = Decimal('20.00')
+        copia_a.save()
+        copia_b.valor = Decimal('30.00')
+        copia_b.save()
+        self._confere_com_agregado()
+        self.assertEqual(ResumoMensal.objects.get(mes=date(2026, 4, 1)).total, Decimal('30.00'))
+
+        mov.delete()
+        self._confere_com_agregado()
+
+    def test_planejar_periodo(self):
+        # Meses completos no meio, dias avulsos nas pontas
+        self.assertEqual(
+            planejar_periodo(date(2026, 1, 15), date(2026, 4, 10)),
+            ((date(2026, 2, 1), date(2026, 3, 1)), [(date(2026, 1, 15), date(2026, 1, 31)), (date(2026, 4, 1), date(2026, 4, 10))]),
+        )
+        # Período exatamente em meses inteiros: sem pontas
+        self.assertEqual(planejar_periodo(date(2026, 2, 1), date(2026, 3, 31)), ((date(2026, 2, 1), date(2026, 3, 1)), []))
+        # Menos de um mês completo: tudo ao vivo
+        self.assertEqual(planejar_periodo(date(2026, 2, 2), date(2026, 2, 28)), (None, [(date(2026, 2, 2), date(2026, 2, 28))]))
+
+
+class DiaVirtualTests(TestCase):
+    """Ler um dia sem registro não grava nada: o dia só é criado na primeira escrita."""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('leitura'))
+        self.categoria = Categoria.objects.create(nome='Ifood', tipo='CARTAO')
+        FechamentoCaixa.objects.create(data=date(2026, 3, 2), saldo_final=Decimal('100.00'))
+        self.data = date(2026, 3, 4)
+
+    def _existe(self):
+        return FechamentoCaixa.objects.filter(data=self.data).exists()
+
+    def test_leituras_nao_criam_o_dia(self):
+        self.assertEqual(self.client.get('/caixa/2026-03-04/').status_code, 200)
+        self.assertFalse(self._existe())
+
+        resposta = self.client.get('/api/dados/2026-03-04/')
+        self.assertEqual(resposta.json()['saldos']['inicial'], '100.00')
+        self.assertFalse(self._existe())
+
+        self.assertEqual(self.client.get('/movimentacao/salvar/2026-03-04/').status_code, 200)
+        self.assertFalse(self._existe())
+
+        # Form inválido também não abre o dia
+        self.client.post('/movimentacao/salvar/2026-03-04/', {'tipo': 'CARTAO', 'valor': ''})
+        self.assertFalse(self._existe())
+
+    def test_primeira_escrita_cria_o_dia(self):
+        self.client.post('/movimentacao/salvar/2026-03-04/', {
+            'tipo': 'CARTAO', 'valor': '12.00', 'categoria': self.categoria.pk,
+        })
+        dia = FechamentoCaixa.objects.get(data=self.data)
+        self.assertEqual(dia.saldo_inicial, Decimal('100.00'))
+        self.assertEqual(dia.cache_total_cartao, Decimal('12.00'))
+
+
+class CorrenteSaldosTests(TestCase):
+    """Cada dia inicia com o saldo final do dia registrado imediatamente antes."""
+
+    def setUp(self):
+        self.d1 = FechamentoCaixa.objects.create(data=date(2026, 3, 2), saldo_final=Decimal('100.00'))
+        self.d3 = GestorCaixa.abrir_dia(date(2026, 3, 4))
+
+    def _saldo_inicial(self, data):
+        return FechamentoCaixa.objects.get(data=data).saldo_inicial
+
+    def test_propaga_edicao_do_saldo_final(self):
+        self.assertEqual(self.d3.saldo_inicial, Decimal('100.00'))
+        self.d1.saldo_final = Decimal('80.00')
+        self.d1.save()
+        self.assertEqual(self._saldo_inicial(date(2026, 3, 4)), Decimal('80.00'))
+
+    def test_dia_aberto_no_meio_da_corrente(self):
+        d2 = GestorCaixa.abrir_dia(date(2026, 3, 3))
+        self.assertEqual(d2.saldo_inicial, Decimal('100.00'))
+        # D2 ainda não fechou (saldo final 0): D3 passa a herdar dele
+        self.assertEqual(self._saldo_inicial(date(2026, 3, 4)), Decimal('0.00'))
+
+        d2.saldo_final = Decimal('60.00')
+        d2.save()
+        self.assertEqual(self._saldo_inicial(date(2026, 3, 4)), Decimal('60.00'))
+
+    def test_form_de_saldos_nao_grava_o_saldo_inicial(self):
+        self.client.force_login(User.objects.create_user('saldos'))
+        # Saldo inicial velho (ou adulterado) no POST: só o saldo final é gravado
+        self.client.post('/caixa/2026-03-04/', {'btn_saldos': '1', 'saldo_inicial': '5.00', 'saldo_final': '50.00'})
+        d3 = FechamentoCaixa.objects.get(pk=self.d3.pk)
+        self.assertEqual((d3.saldo_inicial, d3.saldo_final), (Decimal('100.00'), Decimal('50.00')))
+
+    def test_abrir_dias_em_lote(self):
+        self.d3.saldo_final = Decimal('40.00')
+        self.d3.save()
+        ids = GestorCaixa.abrir_dias([date(2026, 3, 3), date(2026, 3, 4), date(2026, 3, 5)])
+        self.assertEqual(ids[date(2026, 3, 4)], self.d3.pk)
+        # Mesmos saldos da abertura um a um: D2 herda de D1, D3 de D2 e D5 de D3
+        self.assertEqual(self._saldo_inicial(date(2026, 3, 3)), Decimal('100.00'))
+        self.assertEqual(self._saldo_inicial(date(2026, 3, 4)), Decimal('0.00'))
+        self.assertEqual(self._saldo_inicial(date(2026, 3, 5)), Decimal('40.00'))
+
+
+class MovimentacaoDataTests(TestCase):
+    """Movimentacao.data acompanha a data do dia em todos os caminhos de escrita."""
+
+    def test_acompanha_o_dia(self):
+        segunda = FechamentoCaixa.objects.create(data=date(2026, 3, 2))
+        terca = FechamentoCaixa.objects.create(data=date(2026, 3, 3))
+
+        mov = Movimentacao.objects.create(fechamento=segunda, tipo='CARTAO', valor=Decimal('10.00'))
+        self.assertEqual(mov.data, segunda.data)
+
+        # Troca só o id do dia (sem o objeto carregado)
+        mov = Movimentacao.objects.get(pk=mov.pk)
+        mov.fechamento_id = terca.pk
+        mov.save()
+        self.assertEqual(Movimentacao.objects.get(pk=mov.pk).data, terca.data)
+
+        terca.data = date(2026, 4, 7)
+        terca.save()
+        self.assertEqual(Movimentacao.objects.get(pk=mov.pk).data, date(2026, 4, 7))
+        self.assertEqual(ResumoMensal.objects.get(mes=date(2026, 4, 1)).total, Decimal('10.00'))
+        self.assertFalse(ResumoMensal.objects.filter(mes=date(2026, 3, 1)).exclude(total=0).exists())
+
+
+class ResumoPorCategoriaTests(TestCase):
+    """Tabelas do relatório: uma consulta, meses + pontas somados por id da categoria."""
+
+    def test_agrupa_por_id(self):
+        ifood_a = Categoria.objects.create(nome='Ifood', tipo='CARTAO')
+        ifood_b = Categoria.objects.create(nome='Ifood', tipo='CARTAO')
+        for data, categoria, valor in [
+            (date(2026, 2, 10), ifood_a, '10.00'),   # mês completo (ResumoMensal)
+            (date(2026, 3, 3), ifood_a, '5.00'),     # ponta (ao vivo)
+            (date(2026, 3, 3), ifood_b, '7.00'),
+        ]:
+            Movimentacao.objects.create(
+                fechamento=FechamentoCaixa.objects.get_or_create(data=data)[0],
+                tipo='CARTAO', categoria=categoria, valor=Decimal(valor),
+            )
+
+        with self.assertNumQueries(1):
+            tabelas = resumo_por_categoria(date(2026, 2, 1), date(2026, 3, 5))
+
+        self.assertEqual(
+            [(item['categoria__nome'], item['total']) for item in tabelas['cartao']],
+            [('Ifood', Decimal('15.00')), ('Ifood', Decimal('7.00'))],
+        )
+        self.assertEqual(tabelas['saida'], [])
+
+
+class OrcamentoConsultasTests(TestCase):
+    """Views do caderno, API, relatório e escritas dentro do orçamento de consultas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.periodo = gerar_dados_sinteticos(dias=150, movs_por_dia=12, categorias=9)
+        cls.usuario = User.objects.create_user('benchmark')
+
+    def test_cenarios_dentro_do_orcamento(self):
+        self.client.force_login(self.usuario)
+        for nome, metodo, url, dados in cenarios(*self.periodo):
+            with self.subTest(nome):
+                consultas, _, status = medir(self.client, metodo, url, dados)
+                self.assertLess(status, 400)
+                self.assertLessEqual(consultas, ORCAMENTO_CONSULTAS[nome])
+
+
+class RotasSobDemandaTests(TestCase):
+    """Rotas do admin e do PWA (views do PWA importadas só na primeira requisição)."""
+
+    def test_admin_e_pwa(self):
+        self.assertEqual(reverse('admin:index'), '/admin/')
+        self.assertEqual(reverse('manifest'), '/manifest.json')
+
+        self.assertEqual(self.client.get('/manifest.json').status_code, 200)
+        self.assertEqual(self.client.get('/serviceworker.js').status_code, 200)
+        self.assertRedirects(self.client.get('/admin/'), '/admin/login/?next=/admin/')
+
+
+class ApiAsyncTests(TestCase):
+    """Views async da API (ASGI) devolvem o mesmo JSON das síncronas."""
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('api')
+        categoria = Categoria.objects.create(nome='Ifood', tipo='CARTAO')
+        dia = FechamentoCaixa.objects.create(data=date(2026, 3, 2), saldo_final=Decimal('50.00'))
+        for valor in ('10.00', '4.50'):
+            Movimentacao.objects.create(fechamento=dia, tipo='CARTAO', categoria=categoria, valor=Decimal(valor))
+        # Cache sujo: a versão async também tem de recalcular antes de responder
+        FechamentoCaixa.objects.filter(pk=dia.pk).update(cache_sujo=True, cache_total_cartao=0)
+
+    def _request(self, url, **params):
+        request = RequestFactory().get(url, params)
+        request.user = self.usuario
+
+        async def auser():
+            return self.usuario
+        request.auser = auser
+        return request
+
+    async def test_mesmo_json_da_versao_sincrona(self):
+        async_dia = await api_dados_caixa_async(self._request('/api/dados/2026-03-02/'), '2026-03-02')
+        sync_dia = await sync_to_async(api_dados_caixa)(self._request('/api/dados/2026-03-02/'), '2026-03-02')
+        self.assertEqual(async_dia.content, sync_dia.content)
+        self.assertEqual(async_dia['ETag'], sync_dia['ETag'])
+
+        intervalo = {'de': '2026-02-27', 'ate': '2026-03-03'}
+        async_intervalo = await api_dados_intervalo_async(self._request('/api/dados/', **intervalo))
+        sync_intervalo = await sync_to_async(api_dados_intervalo)(self._request('/api/dados/', **intervalo))
+        self.assertEqual(async_intervalo.content, sync_intervalo.content)
+        self.assertIn(b'"cartao": "14.50"', async_intervalo.content)
+
+
+class ApiIntervaloTests(TestCase):
+    """/api/dados/?de=&ate=: um dia por data útil, caches sujos acertados antes de montar."""
+
+    def test_intervalo_com_dia_sujo(self):
+        self.client.force_login(User.objects.create_user('intervalo'))
+        dia = FechamentoCaixa.objects.create(data=date(2026, 3, 2))
+        Movimentacao.objects.create(fechamento=dia, tipo='CARTAO', valor=Decimal('7.00'))
+        FechamentoCaixa.objects.filter(pk=dia.pk).update(cache_sujo=True, cache_total_cartao=0)
+
+        resposta = self.client.get('/api/dados/?de=2026-02-28&ate=2026-03-03')
+        dias = resposta.json()['dias']
+        # Domingo (01/03) fica de fora; o dia sem registro vem virtual
+        self.assertEqual(list(dias), ['2026-02-28', '2026-03-02', '2026-03-03'])
+        self.assertEqual(dias['2026-03-02']['dados']['totais']['cartao'], '7.00')
+        self.assertFalse(FechamentoCaixa.objects.get(pk=dia.pk).cache_sujo)
+        # O ETag do intervalo é o mesmo da API do dia (revalidação individual)
+        etag = dias['2026-03-02']['etag']
+        self.assertEqual(self.client.get('/api/dados/2026-03-02/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.assertEqual(self.client.get('/api/dados/?de=2026-03-03&ate=2026-03-02').status_code, 400)
+
+
+class EtagDiaTests(TestCase):
+    """GET condicional da API do dia (If-None-Match / 304) e o ETag de um dia recriado."""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('etag'))
+
+    def _criar_dia(self, valor):
+        dia = FechamentoCaixa.objects.create(data=date(2026, 3, 3))
+        Movimentacao.objects.create(fechamento=dia, tipo='CARTAO', valor=Decimal(valor))
+        return dia
+
+    def test_304_e_dia_recriado(self):
+        dia = self._criar_dia('10.00')
+        etag = self.client.get('/api/dados/2026-03-03/')['ETag']
+        self.assertEqual(self.client.get('/api/dados/2026-03-03/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # Mesmo número de versão depois de excluir e recriar o dia, com outro conteúdo
+        dia.delete()
+        self._criar_dia('99.00')
+        resposta = self.client.get('/api/dados/2026-03-03/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.json()['totais']['cartao'], '99.00')
+        self.assertContains(self.client.get('/caixa/2026-03-03/'), 'R$ 99,00')
+
+
+class ApiEscritaTests(TestCase):
+    """Escritas JSON do caderno: devolvem só a linha alterada e os totais novos do dia."""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('caixa'))
+        self.cartao = Categoria.objects.create(nome='Ifood', tipo='CARTAO')
+
+    def test_criar_editar_deletar(self):
+        dados = {'tipo': 'CARTAO', 'valor': '10.00', 'categoria': self.cartao.pk}
+        criada = self.client.post('/api/movimentacao/salvar/2026-03-02/', dados).json()
+        self.assertEqual(criada['data_iso'], '2026-03-02')
+        self.assertEqual((criada['movimentacao']['valor'], criada['totais']['cartao']), ('10.00', '10.00'))
+
+        id = criada['movimentacao']['id']
+        editada = self.client.post(f'/api/movimentacao/editar/{id}/', {**dados, 'valor': '25.00'}).json()
+        self.assertEqual((editada['movimentacao']['id'], editada['totais']['cartao']), (id, '25.00'))
+
+        removida = self.client.post(f'/api/movimentacao/deletar/{id}/').json()
+        self.assertEqual((removida['movimentacao'], removida['removida'], removida['totais']['cartao']), (None, id, '0.00'))
+
+        invalida = self.client.post('/api/movimentacao/salvar/2026-03-02/', {**dados, 'categoria': ''})
+        self.assertEqual(invalida.status_code, 400)
+        self.assertIn('categoria', invalida.json()['erros'])
+
+
+class PaginacaoDiaTests(TestCase):
+    """Lista do dia em páginas por id (?after_id=), com os totais sempre do dia inteiro."""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('evento'))
+        cartao = Categoria.objects.create(nome='Maquininha', tipo='CARTAO')
+        dia = FechamentoCaixa.objects.create(data=date(2026, 3, 2))
+        Movimentacao.objects.bulk_create([
+            Movimentacao(fechamento=dia, data=dia.data, tipo='CARTAO', categoria=cartao, valor=Decimal('1.00'))
+            for _ in range(MOVIMENTACOES_POR_PAGINA * 2 + 5)
+        ])
+        GestorCaixa.recalcular_dias([dia.pk])
+
+    def test_benchmark_compara_a_mesma_pagina(self):
+        dia = FechamentoCaixa.objects.get(data=date(2026, 3, 2))
+        tamanhos = {len(serializar(dia)) for serializar in CAMINHOS_SERIALIZACAO.values()}
+        self.assertEqual(tamanhos, {MOVIMENTACOES_POR_PAGINA + 1})
+
+    def test_paginas_da_api(self):
+        ids, after_id, paginas = [], '', 0
+        while True:
+            dados = self.client.get(f'/api/dados/2026-03-02/?after_id={after_id}').json()
+            paginas += 1
+            self.assertEqual(dados['totais']['cartao'], '205.00')
+            ids += [mov['id'] for mov in dados['movimentacoes']]
+            if dados['proximo_id'] is None:
+                break
+            after_id = dados['proximo_id']
+
+        self.assertEqual(paginas, 3)
+        self.assertEqual(ids, list(Movimentacao.objects.order_by('id').values_list('id', flat=True)))
+        self.assertEqual(self.client.get('/api/dados/2026-03-02/?after_id=x').status_code, 400)
+
+        # Pré-carregamento e caderno também só trazem a primeira página
+        intervalo = self.client.get('/api/dados/?de=2026-03-02&ate=2026-03-03').json()['dias']
+        self.assertEqual(len(intervalo['2026-03-02']['dados']['movimentacoes']), MOVIMENTACOES_POR_PAGINA)
+        caderno = self.client.get('/caixa/2026-03-02/')
+        self.assertEqual(len(caderno.context['pagina'].movimentacoes), MOVIMENTACOES_POR_PAGINA)
+        self.assertEqual(caderno.context['pagina'].proximo_id, ids[MOVIMENTACOES_POR_PAGINA - 1])
+
+
+class FragmentoCadernoTests(TestCase):
+    """Resumo e lista do caderno em cache pela versão do dia."""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('fragmento'))
+        cartao = Categoria.objects.create(nome='Ifood', tipo='CARTAO')
+        dia = FechamentoCaixa.objects.create(data=date(2026, 3, 2))
+        self.mov = Movimentacao.objects.create(fechamento=dia, tipo='CARTAO', categoria=cartao, valor=Decimal('10.00'))
+
+    def test_revisita_sem_consulta_e_escrita_renova(self):
+        primeira = self.client.get('/caixa/2026-03-02/')
+        with self.assertNumQueries(3):  # sessão, usuário e o dia: a lista vem do cache
+            revisita = self.client.get('/caixa/2026-03-02/')
+        self.assertContains(primeira, 'R$ 10,00')
+        self.assertContains(revisita, 'R$ 10,00')
+
+        self.mov.valor = Decimal('42.00')
+        self.mov.save()
+        atualizada = self.client.get('/caixa/2026-03-02/')
+        self.assertContains(atualizada, 'R$ 42,00')
+        self.assertNotContains(atualizada, 'R$ 10,00')
+
+
+class SincronizacaoTests(TestCase):
+    """/api/sync/: lote offline aplicado uma vez, com os dias recalculados e devolvidos."""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('offline'))
+        self.cartao = Categoria.objects.create(nome='Ifood', tipo='CARTAO')
+        self.saida = Categoria.objects.create(nome='Almoço', tipo='SAIDA')
+        dia = FechamentoCaixa.objects.create(data=date(2026, 3, 2))
+        self.existente = Movimentacao.objects.create(
+            fechamento=dia, tipo='SAIDA', categoria=self.saida, valor=Decimal('30.00'),
+        )
+
+    def _enviar(self, operacoes):
+        resposta = self.client.post('/api/sync/', {'operacoes': operacoes}, content_type='application/json')
+        self.assertEqual(resposta.status_code, 200)
+        return resposta.json()
+
+    def test_lote_e_reenvio(self):
+        operacoes = [
+            {'chave': 'a', 'acao': 'criar', 'data': '2026-03-02', 'tipo': 'CARTAO', 'valor': '10.00', 'categoria': self.cartao.pk},
+            {'chave': 'b', 'acao': 'editar', 'ref': 'a', 'tipo': 'CARTAO', 'valor': '12.50', 'categoria': self.cartao.pk},
+            {'chave': 'c', 'acao': 'criar', 'data': '2026-03-08', 'tipo': 'SAIDA', 'valor': '5.00', 'categoria': self.saida.pk},
+            {'chave': 'd', 'acao': 'deletar', 'id': self.existente.pk},
+            {'chave': 'e', 'acao': 'criar', 'data': '2026-03-03', 'tipo': 'CARTAO', 'valor': '-1', 'categoria': self.cartao.pk},
+            {'chave': 'f', 'acao': 'criar', 'data': '2026-03-03', 'tipo': 'CARTAO', 'valor': 'NaN', 'categoria': self.cartao.pk},
+            {'chave': 'g', 'acao': 'criar', 'data': '2026-03-03', 'tipo': 'CARTAO', 'valor': 'Infinity', 'categoria': self.cartao.pk},
+        ]
+        resposta = self._enviar(operacoes)
+
+        self.assertEqual([r['status'] for r in resposta['resultados']], ['ok'] * 4 + ['erro'] * 3)
+        self.assertEqual(resposta['resultados'][5]['erro'], "valor inválido: 'NaN'")
+        # Domingo (08/03) vai para segunda (09/03), como no caderno
+        self.assertEqual(sorted(resposta['dias']), ['2026-03-02', '2026-03-09'])
+        dia = FechamentoCaixa.objects.get(data=date(2026, 3, 2))
+        self.assertEqual((dia.cache_total_cartao, dia.cache_total_saida), (Decimal('12.50'), Decimal('0.00')))
+        self.assertEqual(resposta['dias']['2026-03-02']['dados']['totais']['cartao'], '12.50')
+        self.assertEqual(ResumoMensal.objects.get(mes=date(2026, 3, 1), tipo='SAIDA').total, Decimal('5.00'))
+
+        # Resposta perdida, o aparelho reenvia: nada é aplicado de novo
+        reenvio = self._enviar(operacoes[:4])
+        self.assertEqual([r['status'] for r in reenvio['resultados']], ['duplicada'] * 4)
+        self.assertEqual(reenvio['resultados'][0]['id'], resposta['resultados'][0]['id'])
+        self.assertEqual(Movimentacao.objects.count(), 2)
+        self.assertEqual(OperacaoSincronizada.objects.count(), 4)
+
+    def test_categoria_excluida_com_cache_velho(self):
+        # Outra instância excluiu a categoria: o cache deste processo ainda a lista
+        excluida = self.cartao.pk
+        cache_categorias.invalidar()
+        cache_categorias.listar()
+        with mock.patch.object(cache_categorias, 'invalidar'):
+            self.cartao.delete()
+        self.assertIn(excluida, {categoria['id'] for categoria in cache_categorias.listar()})
+
+        resposta = self._enviar([
+            {'chave': 'a', 'acao': 'criar', 'data': '2026-03-02', 'tipo': 'CARTAO', 'valor': '10.00', 'categoria': excluida},
+        ])
+        self.assertEqual(resposta['resultados'][0]['status'], 'erro')
+        self.assertEqual(resposta['resultados'][0]['erro'], f'categoria não cadastrada: {excluida}')
+        cache_categorias.invalidar()
+
+    def test_lote_concorrente(self):
+        # Só a chave única repetida (outro envio do mesmo lote) vira 409
+        operacao = {'chave': 'a', 'acao': 'deletar', 'id': self.existente.pk}
+        with mock.patch.object(OperacaoSincronizada.objects, 'bulk_create', side_effect=IntegrityError):
+            resposta = self.client.post('/api/sync/', {'operacoes': [operacao]}, content_type='application/json')
+        self.assertEqual(resposta.status_code, 409)
+        self.assertTrue(Movimentacao.objects.filter(pk=self.existente.pk).exists())
+
+
+class MedicaoDesempenhoTests(TestCase):
+    """Middleware de desempenho (core.middleware): Server-Timing, log de lentos, percentis e /api/metricas/."""
+
+    async def test_requests_async_simultaneos(self):
+        # Os dois requests dividem a thread (e a conexão) do sync_to_async:
+        # B faz 3 consultas enquanto A, com 1, ainda está aberto
+        a_consultou, b_consultou = asyncio.Event(), asyncio.Event()
+
+        def consultar(vezes):
+            for _ in range(vezes):
+                list(Categoria.objects.all())
+
+        async def view(request):
+            if request.path == '/a/':
+                await sync_to_async(consultar)(1)
+                a_consultou.set()
+                await b_consultou.wait()
+            else:
+                await a_consultou.wait()
+                await sync_to_async(consultar)(3)
+                b_consultou.set()
+            return HttpResponse()
+
+        middleware = MedicaoDesempenhoMiddleware(view)
+        resposta_a, resposta_b = await asyncio.gather(
+            middleware(RequestFactory().get('/a/')), middleware(RequestFactory().get('/b/')),
+        )
+        self.assertIn('desc="1 consultas"', resposta_a['Server-Timing'])
+        self.assertIn('desc="3 consultas"', resposta_b['Server-Timing'])
+
+    def test_server_timing(self):
+        resposta = self.client.get('/accounts/login/')
+        self.assertRegex(
+            resposta['Server-Timing'],
+            r'^db;dur=\d+\.\d;desc="\d+ consultas", total;dur=\d+\.\d(, conn;desc="(nova|reutilizada)")?$',
+        )
+
+    def test_log_de_request_lento(self):
+        request = RequestFactory().get('/lento/')
+        with override_settings(REQUEST_LENTO_MS=0):
+            middleware = MedicaoDesempenhoMiddleware(lambda request: HttpResponse())
+        with self.assertLogs('core.desempenho', 'WARNING') as logs:
+            middleware(request)
+        self.assertIn('Request lento: GET /lento/', logs.output[0])
+
+        with override_settings(REQUEST_LENTO_MS=60_000):
+            middleware = MedicaoDesempenhoMiddleware(lambda request: HttpResponse())
+        with self.assertNoLogs('core.desempenho', 'WARNING'):
+            middleware(request)
+
+    def test_percentis(self):
+        metricas = MetricasRequests()
+        for valor in range(100, 0, -1):
+            metricas.registrar('dia', valor, 0.5, 3, None)
+        resultado = metricas.percentis()['dia']
+        self.assertEqual(resultado['requests'], 100)
+        self.assertEqual(resultado['total_ms'], {'p50': 51, 'p95': 96, 'p99': 100, 'max': 100})
+        self.assertEqual(resultado['consultas'], {'p50': 3, 'p95': 3, 'p99': 3, 'max': 3})
+        self.assertNotIn('bytes', resultado)  # Só respostas em streaming: tamanho desconhecido
+
+    def test_metricas_so_para_staff(self):
+        usuario = User.objects.create_user('caixa')
+        self.client.force_login(usuario)
+        self.assertEqual(self.client.get('/api/metricas/').status_code, 302)
+
+        usuario.is_staff = True
+        usuario.save()
+        resposta = self.client.get('/api/metricas/')
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.json()['amostras_por_view'], 500)
+        self.assertIn('taxa_reuso', resposta.json()['conexoes'])
+        self.assertEqual(set(resposta.json()['cache_categorias']), {'versao', 'acertos', 'falhas'})
 
-# Create your tests here.
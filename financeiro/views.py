@@ -1,20 +1,34 @@
+import json
 from datetime import timedelta, datetime
+from functools import cached_property
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import logout
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse, HttpResponseBadRequest
 from django.utils import timezone
 from django.utils.formats import date_format
-from django.db.models import Sum
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.db import transaction
+from django.views.decorators.http import require_POST
 
 from .models import FechamentoCaixa, Movimentacao, Categoria
-from .forms import MovimentacaoForm, FechamentoSaldoForm, CategoriaForm, FiltroResumoForm
-from .services import GestorCaixa
+from .forms import MovimentacaoForm, FechamentoSaldoForm, CategoriaForm, FiltroResumoForm, ImportacaoForm
+from .services import GestorCaixa, resumo_por_categoria, paginar, MOVIMENTACOES_POR_PAGINA
+from .cache import categorias as cache_categorias
+from .cache import obter_dados_dia, guardar_dados_dia, chave_relatorio, obter_relatorio, guardar_relatorio
+from .cache import aobter_dados_dia, aguardar_dados_dia
+
+# importacao, exportacao e sincronizacao só são importados dentro das views que os usam:
+# assim não pesam no cold start das páginas do caderno
 
 # ==============================================================================
 # FUNÇÕES AUXILIARES
 # ==============================================================================
 
+# Máximo de dias por chamada da API de intervalo
+LIMITE_DIAS_INTERVALO = 31
+
 def obter_dia_anterior(data):
     """Retorna o dia anterior útil (pula domingo)."""
     anterior = data - timedelta(days=1)
@@ -29,17 +43,129 @@ def obter_proximo_dia(data):
         proximo += timedelta(days=1)
     return proximo
 
-def transportar_saldo_anterior(fechamento_atual):
-    """Busca o saldo final do dia anterior e aplica como inicial do atual."""
-    data_anterior_util = obter_dia_anterior(fechamento_atual.data)
-    fechamento_anterior = FechamentoCaixa.objects.filter(data=data_anterior_util).first()
-    
-    if fechamento_anterior:
-        if fechamento_atual.saldo_inicial != fechamento_anterior.saldo_final:
-            fechamento_atual.saldo_inicial = fechamento_anterior.saldo_final
-            fechamento_atual.save(update_fields=['saldo_inicial'])
-            
-    return fechamento_atual
+def _ler_data_api(data_iso):
+    """Data da URL da API (domingo vira o próximo dia útil), ou None se inválida."""
+    try:
+        data_atual = datetime.strptime(data_iso, '%Y-%m-%d').date()
+    except ValueError:
+        return None
+    if data_atual.weekday() == 6:
+        data_atual = obter_proximo_dia(data_atual)
+    return data_atual
+
+# URLs das ações de cada linha, montadas por concatenação (sem reverse por linha)
+URL_EDITAR = '/movimentacao/editar/'
+URL_DELETAR = '/movimentacao/deletar/'
+
+def _ler_apos_id(request):
+    """?after_id= da API do dia: None na primeira página; ValueError se inválido."""
+    valor = request.GET.get('after_id', '')
+    if not valor:
+        return None
+    apos_id = int(valor)
+    if apos_id < 0:
+        raise ValueError(valor)
+    return apos_id
+
+def _etag_pagina(etag, apos_id):
+    """Cada página do dia tem seu ETag, derivado da versão do dia."""
+    return etag if apos_id is None else f'{etag[:-1]}-a{apos_id}"'
+
+def dinheiro(valor):
+    """Valor monetário no JSON: string decimal exata com 2 casas ("12.50"), nunca float."""
+    return f'{valor:.2f}'
+
+def serializar_linhas(linhas):
+    """
+    JSON das movimentações a partir das tuplas de GestorCaixa.linhas_do_dia()
+    (COLUNAS_LINHA). O valor já vem do banco com 2 casas (DecimalField), então
+    str() é exato e mais barato que formatar.
+    """
+    return [
+        {
+            'id': id,
+            'categoria': categoria or 'Sem Categoria',
+            'descricao': descricao or '',
+            'valor': str(valor),
+            'tipo': tipo,
+            'url_editar': f'{URL_EDITAR}{id}/',
+            'url_deletar': f'{URL_DELETAR}{id}/',
+        }
+        for id, _, tipo, valor, descricao, categoria in linhas
+    ]
+
+def dados_movimentacao(mov):
+    """JSON de uma movimentação já carregada, igual ao de serializar_linhas()."""
+    categoria = mov.categoria.nome if mov.categoria else None
+    return serializar_linhas([(mov.id, mov.fechamento_id, mov.tipo, dinheiro(mov.valor), mov.descricao, categoria)])[0]
+
+def dados_saldos_totais(fechamento):
+    """Saldos e totais do dia, lidos dos caches do fechamento."""
+    resumo = GestorCaixa(fechamento).resumo_cacheado()
+    return {
+        'saldos': {
+            'inicial': dinheiro(fechamento.saldo_inicial), 
+            'final': dinheiro(fechamento.saldo_final)
+        },
+        'totais': {
+            'cartao': dinheiro(resumo['cartao']), 
+            'entradas_esp': dinheiro(resumo['suprimentos']), 
+            'dinheiro_miudo': dinheiro(resumo['dinheiro']), 
+            'retiradas': dinheiro(resumo['saidas']), 
+            'geral': dinheiro(resumo['total_geral'])
+        },
+    }
+
+class PaginaCaderno:
+    """
+    Primeira página da lista do caderno, lida do banco só quando o template
+    precisa dela: com o fragmento do dia em cache, a consulta nem acontece.
+    """
+
+    def __init__(self, fechamento):
+        self.fechamento = fechamento
+
+    @cached_property
+    def _pagina(self):
+        return paginar(GestorCaixa.movimentacoes_do_dia(self.fechamento)[:MOVIMENTACOES_POR_PAGINA + 1])
+
+    @property
+    def movimentacoes(self):
+        return self._pagina[0]
+
+    @property
+    def proximo_id(self):
+        movs, ha_mais = self._pagina
+        return movs[-1].id if ha_mais else None
+
+def montar_dados_dia(fechamento, linhas):
+    """
+    Monta o JSON de um dia (navegação, saldos, totais e uma página das
+    movimentações). Os totais são sempre do dia inteiro; 'proximo_id' é o
+    after_id da página seguinte, ou None se esta for a última.
+    """
+    pagina, ha_mais = paginar(linhas)
+    data_atual = fechamento.data
+    data_iso = data_atual.strftime('%Y-%m-%d')
+
+    # Dados de Navegação
+    dia_anterior_str = obter_dia_anterior(data_atual).strftime('%Y-%m-%d')
+    proximo_dia_str = obter_proximo_dia(data_atual).strftime('%Y-%m-%d')
+
+    data_texto = date_format(data_atual, format='l, d \d\e F', use_l10n=True).capitalize()
+
+    return {
+        'data_formatada': data_texto,
+        'data_iso': data_iso,
+        'nav': {
+            'anterior': dia_anterior_str, 
+            'proximo': proximo_dia_str, 
+            'atual': data_iso
+        },
+        **dados_saldos_totais(fechamento),
+        'movimentacoes': serializar_linhas(pagina),
+        'proximo_id': pagina[-1][0] if ha_mais else None,
+    }
 
 # ==============================================================================
 # VIEWS PRINCIPAIS (CAIXA DIÁRIO)
@@ -63,32 +189,43 @@ def diario_caixa(request, data_iso=None):
         proximo_util = obter_proximo_dia(data_atual)
         return redirect('caixa_dia', data_iso=proximo_util.strftime('%Y-%m-%d'))
 
-    # 2. Garante o Fechamento do dia
-    fechamento, _ = FechamentoCaixa.objects.get_or_create(data=data_atual)
-    transportar_saldo_anterior(fechamento)
+    # 2. Busca o Fechamento do dia (dia sem registro vira "virtual", sem gravar nada)
+    fechamento = GestorCaixa.obter_dia(data_atual)
 
     # 3. Processa Formulário de Saldo (se enviado)
     form_saldo = FechamentoSaldoForm(instance=fechamento)
     
     if request.method == 'POST' and 'btn_saldos' in request.POST:
+        # Primeira escrita do dia: agora sim o fechamento é criado
+        if fechamento.pk is None:
+            fechamento = GestorCaixa.abrir_dia(data_atual)
         form_saldo = FechamentoSaldoForm(request.POST, instance=fechamento)
         if form_saldo.is_valid():
-            form_saldo.save()
+            # Grava só o saldo final (o inicial é da propagação e os caches do
+            # dia, dos signals); o signal o transporta para os dias seguintes
+            with transaction.atomic():
+                form_saldo.save(commit=False).save(update_fields=['saldo_final'])
             return redirect(request.path)
 
     # 4. Prepara dados para exibição
     gestor = GestorCaixa(fechamento)
-    resumo = gestor.calcular_resumo()
+    resumo = gestor.resumo_cacheado()
+
+    # Versão do dia (a mesma do ETag da API): muda a cada escrita no dia e é a
+    # chave do fragmento em cache com o resumo e a lista do caderno
+    versao_dia, _ = gestor.validadores_http()
     
-    # Busca movimentações otimizadas
-    movs = fechamento.movimentacoes.all().select_related('categoria').order_by('id')
+    # Movimentações otimizadas (só a primeira página; o resto vem pela API),
+    # lidas apenas se o fragmento do dia não estiver em cache
+    pagina = PaginaCaderno(fechamento)
     
     # Dados para JS (se necessário)
-    categorias_json = list(Categoria.objects.values('id', 'nome', 'tipo').order_by('nome'))
+    categorias_json = cache_categorias.listar()
 
     return render(request, 'financeiro/caderno.html', {
         'fechamento': fechamento,
-        'movimentacoes': movs,
+        'pagina': pagina,
+        'versao_dia': versao_dia,
         'dia_anterior': obter_dia_anterior(data_atual),
         'proximo_dia': obter_proximo_dia(data_atual),
         'data_atual': data_atual,
@@ -115,20 +252,19 @@ def salvar_movimentacao(request, data_iso):
     except ValueError:
         return redirect('home')
 
-    fechamento, _ = FechamentoCaixa.objects.get_or_create(data=data_atual)
-    
     if request.method == 'POST':
         form = MovimentacaoForm(request.POST)
         if form.is_valid():
             nova_mov = form.save(commit=False)
-            nova_mov.fechamento = fechamento
-            nova_mov.save()
-            GestorCaixa(fechamento).atualizar_cache_do_banco()
+            nova_mov.fechamento = GestorCaixa.abrir_dia(data_atual)
+            # O signal aplica o delta nos totais do dia na mesma transação
+            with transaction.atomic():
+                nova_mov.save()
             return redirect('caixa_dia', data_iso=data_iso)
     else:
         form = MovimentacaoForm()
 
-    categorias_json = list(Categoria.objects.values('id', 'nome', 'tipo').order_by('nome'))
+    categorias_json = cache_categorias.listar()
 
     return render(request, 'financeiro/movimentacoes/form.html', {
         'form': form,
@@ -146,13 +282,13 @@ def editar_movimentacao(request, id):
     if request.method == 'POST':
         form = MovimentacaoForm(request.POST, instance=mov)
         if form.is_valid():
-            form.save()
-            GestorCaixa(mov.fechamento).atualizar_cache_do_banco()
+            with transaction.atomic():
+                form.save()
             return redirect('caixa_dia', data_iso=data_iso)
     else:
         form = MovimentacaoForm(instance=mov)
 
-    categorias_json = list(Categoria.objects.values('id', 'nome', 'tipo').order_by('nome'))
+    categorias_json = cache_categorias.listar()
 
     return render(request, 'financeiro/movimentacoes/form.html', {
         'form': form,
@@ -164,90 +300,308 @@ def editar_movimentacao(request, id):
 
 @login_required
 def deletar_movimentacao(request, id):
-    """Remove uma movimentação e atualiza o cache."""
+    """Remove uma movimentação (o signal desconta o valor dos totais do dia)."""
     mov = get_object_or_404(Movimentacao, id=id)
-    fechamento_pai = mov.fechamento
     
     # Tenta voltar para onde estava, ou para a home
     url_retorno = request.META.get('HTTP_REFERER', '/')
     
-    mov.delete()
-    
-    # Recalcula totais
-    GestorCaixa(fechamento_pai).atualizar_cache_do_banco()
+    with transaction.atomic():
+        mov.delete()
     
     return redirect(url_retorno)
 
+@login_required
+def importar_movimentacoes(request):
+    """Carga em lote de movimentações a partir de um CSV ou extrato OFX."""
+    from .importacao import ImportadorMovimentacoes
+
+    resultado = None
+    if request.method == 'POST':
+        form = ImportacaoForm(request.POST, request.FILES)
+        if form.is_valid():
+            importador = ImportadorMovimentacoes(criar_categorias=form.cleaned_data['criar_categorias'])
+            resultado = importador.importar(form.cleaned_data['arquivo'], form.cleaned_data['formato'])
+            form = ImportacaoForm()
+    else:
+        form = ImportacaoForm()
+
+    return render(request, 'financeiro/movimentacoes/importar.html', {
+        'form': form,
+        'titulo': 'Importar Movimentações',
+        'resultado': resultado,
+    })
+
+@login_required
+def exportar_dados(request):
+    """
+    Download em streaming (?conteudo=movimentacoes|fechamentos&formato=csv|jsonl
+    &de=AAAA-MM-DD&ate=AAAA-MM-DD): o primeiro byte sai antes de o banco
+    terminar de ler o período, e a memória não cresce com o tamanho dele.
+    """
+    from .exportacao import exportar, COLUNAS, FORMATOS
+
+    conteudo = request.GET.get('conteudo', 'movimentacoes')
+    formato = request.GET.get('formato', 'csv')
+    if conteudo not in COLUNAS or formato not in FORMATOS:
+        return HttpResponseBadRequest('Conteúdo ou formato inválido')
+
+    try:
+        data_inicio = datetime.strptime(request.GET['de'], '%Y-%m-%d').date() if request.GET.get('de') else None
+        data_fim = datetime.strptime(request.GET['ate'], '%Y-%m-%d').date() if request.GET.get('ate') else None
+    except ValueError:
+        return HttpResponseBadRequest('Data inválida')
+
+    resposta = StreamingHttpResponse(
+        exportar(conteudo, formato, data_inicio, data_fim),
+        content_type=FORMATOS[formato],
+    )
+    periodo = f"_{data_inicio or 'inicio'}_{data_fim or 'hoje'}" if data_inicio or data_fim else ''
+    resposta['Content-Disposition'] = f'attachment; filename="{conteudo}{periodo}.{formato}"'
+    return resposta
+
 # ==============================================================================
 # API PARA O FRONTEND (AJAX)
 # ==============================================================================
 
 @login_required
 def api_dados_caixa(request, data_iso):
-    """Retorna JSON com todos os dados do dia para atualização dinâmica."""
+    """
+    Retorna JSON com todos os dados do dia para atualização dinâmica.
+    As movimentações vêm em páginas: ?after_id=<proximo_id> traz a seguinte.
+    """
+    data_atual = _ler_data_api(data_iso)
     try:
-        data_atual = datetime.strptime(data_iso, '%Y-%m-%d').date()
+        apos_id = _ler_apos_id(request)
+    except ValueError:
+        data_atual = None
+    if data_atual is None:
+        return JsonResponse({'erro': 'Data ou after_id inválido'}, status=400)
+
+    # Dados Financeiros (resumo vem do cache do dia, sem consulta extra)
+    fechamento = GestorCaixa.obter_dia(data_atual)
+    
+    # Cache sujo é recalculado antes, pois isso gera uma nova versão do dia
+    gestor = GestorCaixa(fechamento)
+    if fechamento.cache_sujo:
+        gestor.atualizar_cache_do_banco()
+
+    # GET condicional: se o navegador já tem esta versão do dia, para por aqui
+    etag, ultima_alteracao = gestor.validadores_http()
+    etag = _etag_pagina(etag, apos_id)
+    nao_modificado = get_conditional_response(request, etag=etag, last_modified=ultima_alteracao)
+    if nao_modificado is not None:
+        return nao_modificado
+
+    # Cache compartilhado por versão do dia: outro usuário/instância já pode ter montado
+    dados = obter_dados_dia(etag)
+    if dados is None:
+        dados = montar_dados_dia(fechamento, GestorCaixa.linhas_do_dia(fechamento, apos_id))
+        guardar_dados_dia(etag, dados)
+
+    resposta = JsonResponse(dados)
+
+    resposta['ETag'] = etag
+    if ultima_alteracao:
+        resposta['Last-Modified'] = http_date(ultima_alteracao)
+    # Sempre revalida com o servidor (a resposta barata é o 304)
+    patch_cache_control(resposta, private=True, no_cache=True)
+    return resposta
+
+@login_required
+def api_dados_intervalo(request):
+    """
+    Dados de vários dias de uma vez (?de=AAAA-MM-DD&ate=AAAA-MM-DD), usado pelo
+    caderno para pré-carregar os dias vizinhos. Cada dia vem com seu ETag,
+    para depois ser revalidado individualmente em /api/dados/<data>/.
+    """
+    try:
+        data_inicio = datetime.strptime(request.GET.get('de', ''), '%Y-%m-%d').date()
+        data_fim = datetime.strptime(request.GET.get('ate', ''), '%Y-%m-%d').date()
     except ValueError:
         return JsonResponse({'erro': 'Data inválida'}, status=400)
 
-    if data_atual.weekday() == 6:
-        data_atual = obter_proximo_dia(data_atual)
-        data_iso = data_atual.strftime('%Y-%m-%d')
+    if data_fim < data_inicio or (data_fim - data_inicio).days >= LIMITE_DIAS_INTERVALO:
+        return JsonResponse({'erro': f'Intervalo deve ter até {LIMITE_DIAS_INTERVALO} dias'}, status=400)
 
-    # Dados de Navegação
-    dia_anterior_str = obter_dia_anterior(data_atual).strftime('%Y-%m-%d')
-    proximo_dia_str = obter_proximo_dia(data_atual).strftime('%Y-%m-%d')
+    # Só dias úteis (o caderno pula domingo)
+    datas = [
+        data_inicio + timedelta(days=i)
+        for i in range((data_fim - data_inicio).days + 1)
+        if (data_inicio + timedelta(days=i)).weekday() != 6
+    ]
 
-    # Dados Financeiros
-    fechamento, _ = FechamentoCaixa.objects.get_or_create(data=data_atual)
-    transportar_saldo_anterior(fechamento)
-    
-    gestor = GestorCaixa(fechamento)
-    resumo = gestor.calcular_resumo()
-    
-    # Lista de Movimentações
-    movs = fechamento.movimentacoes.all().select_related('categoria').order_by('id')
-    lista_movs = []
-    
-    for mov in movs:
-        # Define URLs dinâmicas para o frontend
-        url_editar = f"/movimentacao/editar/{mov.id}/"
-        url_deletar = f"/movimentacao/deletar/{mov.id}/"
-        
-        lista_movs.append({
-            'id': mov.id,
-            'categoria': mov.categoria.nome if mov.categoria else 'Sem Categoria',
-            'descricao': mov.descricao or '',
-            'valor': float(mov.valor),
-            'tipo': mov.tipo,
-            'url_editar': url_editar,  
-            'url_deletar': url_deletar
-        })
+    # Acerta antes os caches sujos: montar_dados_dia() só lê, nunca grava num GET
+    GestorCaixa.recalcular_sujos(FechamentoCaixa.objects.filter(data__in=datas))
 
-    data_texto = date_format(data_atual, format='l, d \d\e F', use_l10n=True).capitalize()
+    dias = {}
+    for fechamento, linhas in GestorCaixa.obter_dias(datas):
+        dados = montar_dados_dia(fechamento, linhas)
+        etag, _ = GestorCaixa(fechamento).validadores_http()
+        dias[dados['data_iso']] = {'etag': etag, 'dados': dados}
+
+    return JsonResponse({'dias': dias})
 
+def _resposta_escrita(fechamento_id, mov=None, removida=None):
+    """
+    Resposta das escritas JSON: só a linha alterada e os novos saldos/totais
+    do dia (o caderno corrige a tela no lugar, sem recarregar a página).
+    """
+    # Os signals somaram o delta direto no banco: relê só o fechamento
+    fechamento = FechamentoCaixa.objects.get(pk=fechamento_id)
     return JsonResponse({
-        'data_formatada': data_texto,
-        'data_iso': data_iso,
-        'nav': {
-            'anterior': dia_anterior_str, 
-            'proximo': proximo_dia_str, 
-            'atual': data_iso
-        },
-        'saldos': {
-            'inicial': float(fechamento.saldo_inicial), 
-            'final': float(fechamento.saldo_final)
-        },
-        'totais': {
-            'cartao': float(resumo['cartao']), 
-            'entradas_esp': float(resumo['suprimentos']), 
-            'dinheiro_miudo': float(resumo['dinheiro']), 
-            'retiradas': float(resumo['saidas']), 
-            'geral': float(resumo['total_geral'])
-        },
-        'movimentacoes': lista_movs
+        'data_iso': fechamento.data.strftime('%Y-%m-%d'),
+        'movimentacao': dados_movimentacao(mov) if mov is not None else None,
+        'removida': removida,
+        **dados_saldos_totais(fechamento),
     })
 
+@login_required
+@require_POST
+def api_salvar_movimentacao(request, data_iso):
+    """Mesma escrita de salvar_movimentacao, respondendo em JSON."""
+    data_atual = _ler_data_api(data_iso)
+    if data_atual is None:
+        return JsonResponse({'erro': 'Data inválida'}, status=400)
+
+    form = MovimentacaoForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'erros': form.errors}, status=400)
+
+    nova_mov = form.save(commit=False)
+    nova_mov.fechamento = GestorCaixa.abrir_dia(data_atual)
+    with transaction.atomic():
+        nova_mov.save()
+    return _resposta_escrita(nova_mov.fechamento_id, mov=nova_mov)
+
+@login_required
+@require_POST
+def api_editar_movimentacao(request, id):
+    """Mesma escrita de editar_movimentacao, respondendo em JSON."""
+    mov = get_object_or_404(Movimentacao, id=id)
+
+    form = MovimentacaoForm(request.POST, instance=mov)
+    if not form.is_valid():
+        return JsonResponse({'erros': form.errors}, status=400)
+
+    with transaction.atomic():
+        form.save()
+    return _resposta_escrita(mov.fechamento_id, mov=mov)
+
+@login_required
+@require_POST
+def api_deletar_movimentacao(request, id):
+    """Mesma exclusão de deletar_movimentacao, respondendo em JSON."""
+    mov = get_object_or_404(Movimentacao, id=id)
+
+    with transaction.atomic():
+        mov.delete()
+    return _resposta_escrita(mov.fechamento_id, removida=id)
+
+@login_required
+@require_POST
+def api_sincronizar(request):
+    """
+    Recebe de uma vez as escritas feitas offline pelo PWA ({"operacoes": [...]},
+    ver financeiro.sincronizacao), aplica tudo numa transação e devolve o
+    resultado de cada operação e os dados atualizados dos dias afetados.
+    """
+    from .sincronizacao import SincronizadorOffline, LoteEmProcessamento, LIMITE_OPERACOES
+
+    try:
+        operacoes = json.loads(request.body)['operacoes']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'erro': 'JSON inválido'}, status=400)
+    if not isinstance(operacoes, list) or len(operacoes) > LIMITE_OPERACOES:
+        return JsonResponse({'erro': f'Envie uma lista de até {LIMITE_OPERACOES} operações'}, status=400)
+
+    sincronizador = SincronizadorOffline()
+    try:
+        resultados = sincronizador.sincronizar(operacoes)
+    except LoteEmProcessamento:
+        # O outro envio já gravou as chaves: ao reenviar, as operações voltam como 'duplicada'
+        return JsonResponse({'erro': 'Lote já em processamento, reenvie'}, status=409)
+
+    dias = {}
+    for fechamento, linhas in GestorCaixa.obter_dias_por_id(sincronizador.dias):
+        dados = montar_dados_dia(fechamento, linhas)
+        etag, _ = GestorCaixa(fechamento).validadores_http()
+        dias[dados['data_iso']] = {'etag': etag, 'dados': dados}
+
+    return JsonResponse({'resultados': resultados, 'dias': dias})
+
+# ==============================================================================
+# API ASSÍNCRONA (ASGI)
+# ==============================================================================
+# Mesmas respostas das views acima, com o ORM async: num deploy ASGI poucos
+# workers atendem muitos celulares consultando o caderno ao mesmo tempo.
+# No WSGI as versões síncronas continuam (core/urls.py escolhe por API_ASYNC).
+
+@login_required
+async def api_dados_caixa_async(request, data_iso):
+    """Versão async de api_dados_caixa()."""
+    data_atual = _ler_data_api(data_iso)
+    try:
+        apos_id = _ler_apos_id(request)
+    except ValueError:
+        data_atual = None
+    if data_atual is None:
+        return JsonResponse({'erro': 'Data ou after_id inválido'}, status=400)
+
+    fechamento = await GestorCaixa.aobter_dia(data_atual)
+    gestor = GestorCaixa(fechamento)
+    if fechamento.cache_sujo:
+        await gestor.aatualizar_cache_do_banco()
+
+    etag, ultima_alteracao = gestor.validadores_http()
+    etag = _etag_pagina(etag, apos_id)
+    nao_modificado = get_conditional_response(request, etag=etag, last_modified=ultima_alteracao)
+    if nao_modificado is not None:
+        return nao_modificado
+
+    dados = await aobter_dados_dia(etag)
+    if dados is None:
+        dados = montar_dados_dia(fechamento, await GestorCaixa.alinhas_do_dia(fechamento, apos_id))
+        await aguardar_dados_dia(etag, dados)
+
+    resposta = JsonResponse(dados)
+
+    resposta['ETag'] = etag
+    if ultima_alteracao:
+        resposta['Last-Modified'] = http_date(ultima_alteracao)
+    patch_cache_control(resposta, private=True, no_cache=True)
+    return resposta
+
+@login_required
+async def api_dados_intervalo_async(request):
+    """Versão async de api_dados_intervalo()."""
+    try:
+        data_inicio = datetime.strptime(request.GET.get('de', ''), '%Y-%m-%d').date()
+        data_fim = datetime.strptime(request.GET.get('ate', ''), '%Y-%m-%d').date()
+    except ValueError:
+        return JsonResponse({'erro': 'Data inválida'}, status=400)
+
+    if data_fim < data_inicio or (data_fim - data_inicio).days >= LIMITE_DIAS_INTERVALO:
+        return JsonResponse({'erro': f'Intervalo deve ter até {LIMITE_DIAS_INTERVALO} dias'}, status=400)
+
+    datas = [
+        data_inicio + timedelta(days=i)
+        for i in range((data_fim - data_inicio).days + 1)
+        if (data_inicio + timedelta(days=i)).weekday() != 6
+    ]
+
+    dias = {}
+    for fechamento, linhas in await GestorCaixa.aobter_dias(datas):
+        gestor = GestorCaixa(fechamento)
+        # montar_dados_dia() lê os caches do dia: os sujos são acertados antes, aqui
+        if fechamento.cache_sujo:
+            await gestor.aatualizar_cache_do_banco()
+        dados = montar_dados_dia(fechamento, linhas)
+        etag, _ = gestor.validadores_http()
+        dias[dados['data_iso']] = {'etag': etag, 'dados': dados}
+
+    return JsonResponse({'dias': dias})
+
 # ==============================================================================
 # RELATÓRIOS E GERENCIAMENTO
 # ==============================================================================
@@ -258,10 +612,13 @@ def resumo_financeiro(request):
     hoje = timezone.now().date()
     inicio_mes = hoje.replace(day=1)
     
-    data_inicio = request.GET.get('data_inicio', inicio_mes.strftime('%Y-%m-%d'))
-    data_fim = request.GET.get('data_fim', hoje.strftime('%Y-%m-%d'))
+    data_inicio = inicio_mes
+    data_fim = hoje
     
-    form = FiltroResumoForm(initial={'data_inicio': data_inicio, 'data_fim': data_fim})
+    form = FiltroResumoForm(initial={
+        'data_inicio': inicio_mes.strftime('%Y-%m-%d'),
+        'data_fim': hoje.strftime('%Y-%m-%d')
+    })
     if request.GET:
         form = FiltroResumoForm(request.GET)
         if form.is_valid():
@@ -270,36 +627,33 @@ def resumo_financeiro(request):
 
     # Busca otimizada usando cache do banco
     fechamentos = FechamentoCaixa.objects.filter(data__range=[data_inicio, data_fim])
+    GestorCaixa.recalcular_sujos(fechamentos)
     
-    somas_cache = fechamentos.aggregate(
-        total_cartao=Sum('cache_total_cartao'),
-        total_saida=Sum('cache_total_saida'),
-        total_suprimento=Sum('cache_total_suprimento')
-    )
+    # Resultado guardado no cache compartilhado até a próxima escrita
+    chave = chave_relatorio(data_inicio, data_fim)
+    resultado = obter_relatorio(chave)
+    if resultado is None:
+        resultado = {
+            # Totais e dinheiro calculado (dia a dia) em uma única agregação
+            'somas': fechamentos.resumo_periodo(),
+            # Tabelas detalhadas por categoria (meses completos vêm do ResumoMensal)
+            'categorias': resumo_por_categoria(data_inicio, data_fim),
+        }
+        guardar_relatorio(chave, resultado)
+    somas_cache = resultado['somas']
 
     total_cartao = somas_cache['total_cartao'] or 0
     total_saida = somas_cache['total_saida'] or 0
     total_suprimento = somas_cache['total_suprimento'] or 0
-    
-    # Cálculo do dinheiro real (Dia a dia)
-    total_dinheiro_calc = 0
-    for dia in fechamentos:
-        suprimentos = dia.cache_total_suprimento
-        retiradas = dia.cache_total_saida
-        venda_dia = (retiradas + dia.saldo_final) - (dia.saldo_inicial + suprimentos)
-        if venda_dia < 0: 
-            venda_dia = 0
-        total_dinheiro_calc += venda_dia
+    total_dinheiro_calc = somas_cache['total_dinheiro'] or 0
 
     receita_total = total_cartao + total_dinheiro_calc
     lucro_operacional = receita_total - total_saida
 
-    # Tabelas detalhadas por categoria
-    movimentacoes = Movimentacao.objects.filter(fechamento__data__range=[data_inicio, data_fim])
-    
-    cats_cartao = movimentacoes.filter(tipo='CARTAO').values('categoria__nome').annotate(total=Sum('valor')).order_by('-total')
-    cats_saida = movimentacoes.filter(tipo__in=['SAIDA', 'REGISTRO']).values('categoria__nome').annotate(total=Sum('valor')).order_by('-total')
-    cats_entrada = movimentacoes.filter(tipo='DINHEIRO').values('categoria__nome').annotate(total=Sum('valor')).order_by('-total')
+    categorias = resultado['categorias']
+    cats_cartao = categorias['cartao']
+    cats_saida = categorias['saida']
+    cats_entrada = categorias['entrada']
 
     return render(request, 'financeiro/resumo.html', {
         'form': form,
@@ -312,7 +666,9 @@ def resumo_financeiro(request):
         'total_dinheiro': total_dinheiro_calc,
         'receita_total': receita_total,
         'lucro_operacional': lucro_operacional,
-        'dias_contados': fechamentos.count()
+        'dias_contados': somas_cache['dias_contados'],
+        'data_inicio': data_inicio,
+        'data_fim': data_fim,
     })
 
 # ==============================================================================
@@ -321,8 +677,7 @@ def resumo_financeiro(request):
 
 @login_required
 def gerenciar_categorias(request):
-    categorias = Categoria.objects.all().order_by('nome')
-    return render(request, 'financeiro/categoria/categorias.html', {'categorias': categorias})
+    return render(request, 'financeiro/categoria/categorias.html', {'categorias': cache_categorias.listar()})
 
 @login_required
 def salvar_categoria(request):
@@ -27,142 +27,384 @@ document.addEventListener("DOMContentLoaded", function() {
         seletorData.addEventListener('change', function(e) {
             carregarDia(this.value);
         });
+
+        // Já deixa os dias vizinhos em memória para a primeira navegação
+        preCarregarVizinhos(seletorData.value);
     }
 });
 
+// Últimas respostas da API por dia: { etag, dados }
+const cacheDias = new Map();
+
+// Fila offline enviada: o service worker devolve os dias já recalculados
+if (navigator.serviceWorker) {
+    navigator.serviceWorker.addEventListener('message', function(event) {
+        if (!event.data || event.data.tipo !== 'sincronizado') return;
+        Object.entries(event.data.dias).forEach(([dia, item]) => {
+            cacheDias.set(dia, { etag: item.etag, dados: item.dados });
+            if (dia === diaSolicitado || dia === document.getElementById('seletor-data')?.value) {
+                renderizarDia(item.dados);
+            }
+        });
+    });
+}
+
+/**
+ * Busca os dados do dia com GET condicional: se o servidor responder
+ * 304 (dia não mudou), reaproveita o JSON guardado em memória.
+ */
+async function buscarDadosDia(dataIso) {
+    const guardado = cacheDias.get(dataIso);
+    const headers = guardado ? { 'If-None-Match': guardado.etag } : {};
+
+    const response = await fetch(`/api/dados/${dataIso}/`, { headers });
+    if (response.status === 304 && guardado) return guardado.dados;
+    if (!response.ok) throw new Error('Erro API');
+
+    const dados = await response.json();
+    const etag = response.headers.get('ETag');
+    if (etag) cacheDias.set(dataIso, { etag, dados });
+    return dados;
+}
+
+// Dia que o usuário pediu por último (respostas de dias antigos são ignoradas)
+let diaSolicitado = null;
+
+// Quantos dias para cada lado são pré-carregados
+const DIAS_PREFETCH = 7;
+
+/**
+ * Soma dias a uma data ISO (AAAA-MM-DD), sem depender do fuso do aparelho.
+ */
+function somarDias(dataIso, dias) {
+    const data = new Date(`${dataIso}T00:00:00Z`);
+    data.setUTCDate(data.getUTCDate() + dias);
+    return data.toISOString().slice(0, 10);
+}
+
+/**
+ * Aquece o cache com a semana anterior e a seguinte em uma única chamada
+ * à API de intervalo, para a navegação entre dias ser instantânea.
+ */
+async function preCarregarVizinhos(dataIso) {
+    const anterior = somarDias(dataIso, -1);
+    const proximo = somarDias(dataIso, 1);
+    if (cacheDias.has(anterior) && cacheDias.has(proximo)) return;
+
+    try {
+        const de = somarDias(dataIso, -DIAS_PREFETCH);
+        const ate = somarDias(dataIso, DIAS_PREFETCH);
+        const response = await fetch(`/api/dados/?de=${de}&ate=${ate}`);
+        if (!response.ok) return;
+
+        const resposta = await response.json();
+        Object.entries(resposta.dias).forEach(([dia, item]) => {
+            cacheDias.set(dia, { etag: item.etag, dados: item.dados });
+        });
+    } catch (error) {
+        // Pré-carregamento é só otimização: falha silenciosa
+    }
+}
+
 // A função carregarDia precisa ser global ou estar acessível
 async function carregarDia(dataIso) {
+    diaSolicitado = dataIso;
+    window.history.pushState({path: dataIso}, '', `/caixa/${dataIso}/`);
+
+    // Se o dia já foi pré-carregado, mostra na hora e só revalida depois
+    const guardado = cacheDias.get(dataIso);
+    if (guardado) renderizarDia(guardado.dados);
+
     try {
         // Efeito visual de carregamento
         const contentArea = document.querySelector('.content-area');
-        if(contentArea) contentArea.style.opacity = '0.5';
+        if(contentArea && !guardado) contentArea.style.opacity = '0.5';
         
-        // Busca dados na API
-        const response = await fetch(`/api/dados/${dataIso}/`);
-        if (!response.ok) throw new Error('Erro API');
-        const dados = await response.json();
+        // Busca dados na API (com revalidação por ETag)
+        const dados = await buscarDadosDia(dataIso);
+        if (diaSolicitado !== dataIso) return;
 
-        // 1. Atualiza Data e URL
-        document.getElementById('display-data').innerHTML = `${dados.data_formatada} <i class="fas fa-caret-down"></i>`;
-        const seletor = document.getElementById('seletor-data');
-        if(seletor) seletor.value = dados.data_iso;
-        
-        window.history.pushState({path: dataIso}, '', `/caixa/${dataIso}/`);
+        if (!guardado || dados !== guardado.dados) renderizarDia(dados);
+        preCarregarVizinhos(dataIso);
 
-        // 2. Atualiza Botões de Navegação
-        const btnAnt = document.getElementById('btn-anterior');
-        const btnProx = document.getElementById('btn-proximo');
+    } catch (error) {
+        console.error("Erro ao carregar dia:", error);
+    } finally {
+        const contentArea = document.querySelector('.content-area');
+        if(contentArea) contentArea.style.opacity = '1';
+    }
+}
+
+/**
+ * Atualiza a tela do caderno com os dados de um dia.
+ */
+function renderizarDia(dados) {
+    // 1. Atualiza Data
+    document.getElementById('display-data').innerHTML = `${dados.data_formatada} <i class="fas fa-caret-down"></i>`;
+    const seletor = document.getElementById('seletor-data');
+    if(seletor) seletor.value = dados.data_iso;
+
+    // 2. Atualiza Botões de Navegação
+    const btnAnt = document.getElementById('btn-anterior');
+    const btnProx = document.getElementById('btn-proximo');
+    
+    if(btnAnt) {
+        btnAnt.dataset.dest = dados.nav.anterior;
+        btnAnt.href = `/caixa/${dados.nav.anterior}/`;
+    }
+    if(btnProx) {
+        btnProx.dataset.dest = dados.nav.proximo;
+        btnProx.href = `/caixa/${dados.nav.proximo}/`;
+    }
+
+    // 3. Atualiza o Botão Flutuante (Centralizado)
+    const fabBtn = document.querySelector('.fab-btn');
+    if (fabBtn) {
+        fabBtn.href = `/movimentacao/salvar/${dados.data_iso}/`;
+    }
+
+    // 4 e 5. Saldos e Card de Resumo
+    renderizarSaldosTotais(dados);
+
+    // 6. Reconstrói a Lista de Movimentações (LAYOUT ACORDEÃO)
+    const listaDiv = document.getElementById('lista-movimentacoes');
+    if(listaDiv) {
+        listaDiv.innerHTML = ''; 
         
-        if(btnAnt) {
-            btnAnt.dataset.dest = dados.nav.anterior;
-            btnAnt.href = `/caixa/${dados.nav.anterior}/`;
-        }
-        if(btnProx) {
-            btnProx.dataset.dest = dados.nav.proximo;
-            btnProx.href = `/caixa/${dados.nav.proximo}/`;
+        if (dados.movimentacoes.length === 0) {
+            listaDiv.innerHTML = `
+                <div class="empty-state">
+                    <i class="fas fa-basket-shopping"></i>
+                    <p>Nenhuma movimentação hoje.</p>
+                </div>`;
         }
 
-        // 3. Atualiza o Botão Flutuante (Centralizado)
-        const fabBtn = document.querySelector('.fab-btn');
-        if (fabBtn) {
-            fabBtn.href = `/movimentacao/salvar/${dados.data_iso}/`;
-        }
+        dados.movimentacoes.forEach(mov => {
+            listaDiv.insertAdjacentHTML('beforeend', htmlMovimentacao(mov));
+        });
+    }
 
-        // 4. Atualiza Saldos (Inputs com IDs Corretos)
-        const inputInicial = document.getElementById('id_saldo_inicial');
-        const inputFinal = document.getElementById('id_saldo_final');
-        
-        // Usa a função global definida em utils.js
-        if(inputInicial) {
-            inputInicial.value = (dados.saldos.inicial * 100).toFixed(0);
-            aplicarMascaraMoeda(inputInicial);
+    // 7. Páginas seguintes do dia (se houver)
+    atualizarCarregarMais(dados.proximo_id);
+}
+
+/**
+ * Saldos (inputs) e card de resumo do dia.
+ */
+function renderizarSaldosTotais(dados) {
+    // 1. Atualiza Saldos (Inputs com IDs Corretos)
+    const inputInicial = document.getElementById('id_saldo_inicial');
+    const inputFinal = document.getElementById('id_saldo_final');
+    
+    // Valores chegam como string decimal ("1250.50"): tira o ponto e a máscara formata
+    if(inputInicial) {
+        inputInicial.value = dados.saldos.inicial.replace('.', '');
+        aplicarMascaraMoeda(inputInicial);
+    }
+    if(inputFinal) {
+        inputFinal.value = dados.saldos.final.replace('.', '');
+        aplicarMascaraMoeda(inputFinal);
+    }
+
+    // 2. Atualiza Card de Resumo (IDs Corretos)
+    // Usa a função global formatarMoedaParaExibicao de utils.js
+    const setTxt = (id, val) => { 
+        const el = document.getElementById(id); 
+        if(el) el.innerText = formatarMoedaParaExibicao(Number(val)); 
+    };
+
+    setTxt('val-cartao', dados.totais.cartao);
+    setTxt('val-entrada-esp', dados.totais.entradas_esp);
+    setTxt('val-dinheiro-calc', dados.totais.dinheiro_miudo);
+    setTxt('val-geral', dados.totais.geral);
+
+    // Fórmula Rodapé
+    const txtFormula = `*Dinheiro = (${dados.totais.retiradas} Saídas + ${dados.saldos.final} Sobrou) - (${dados.saldos.inicial} Início + ${dados.totais.entradas_esp} Suprimentos)`;
+    const elFormula = document.getElementById('txt-formula');
+    if(elFormula) elFormula.innerText = txtFormula;
+}
+
+/**
+ * HTML de uma movimentação da lista (mesmo layout do template).
+ */
+function htmlMovimentacao(mov) {
+    let classeCss = 'tipo-saida';
+    let icone = '<i class="fas fa-arrow-down"></i>';
+    let subtexto = 'Saída/Sangria';
+    let sinal = '-';
+
+    if (mov.tipo === 'CARTAO') { 
+        classeCss = 'tipo-cartao'; icone = '<i class="fas fa-credit-card"></i>'; subtexto = 'Cartão/Pix'; sinal = '+'; 
+    } else if (mov.tipo === 'DINHEIRO') { 
+        classeCss = 'tipo-dinheiro'; icone = '<i class="fas fa-coins"></i>'; subtexto = 'Suprimento'; sinal = '+'; 
+    } else if (mov.tipo === 'REGISTRO') { 
+        classeCss = 'tipo-registro'; icone = '<i class="fas fa-file-alt"></i>'; subtexto = 'Registro'; sinal = '-'; 
+    }
+
+    let descTexto = mov.descricao ? 
+        `<i class="fas fa-quote-left"></i> ${mov.descricao}` : 
+        'Sem descrição';
+
+    // GERA HTML COMPATÍVEL COM O CSS NOVO
+    return `
+        <div class="mov-card" data-id="${mov.id}" onclick="this.classList.toggle('active')">
+            <div class="line-item ${classeCss}">
+                <div class="icon-box">${icone}</div>
+                <div class="info-box">
+                    <div class="item-name">${mov.categoria}</div>
+                    <div class="item-sub">${subtexto}</div>
+                </div>
+                <div class="valor">${sinal} R$ ${mov.valor}</div>
+            </div>
+
+            <div class="mov-details" onclick="event.stopPropagation()">
+                <div class="mov-desc">${descTexto}</div>
+                <div class="mov-actions">
+                    <a href="${mov.url_editar}" class="btn-text-action btn-text-edit">
+                        <i class="fas fa-pen"></i> Editar
+                    </a>
+                    <a href="${mov.url_deletar}" data-api="/api/movimentacao/deletar/${mov.id}/" class="btn-text-action btn-text-delete">
+                        <i class="fas fa-trash"></i> Excluir
+                    </a>
+                </div>
+            </div>
+        </div>`;
+}
+
+/* ============================================================
+   ESCRITAS SEM RECARREGAR (API JSON de movimentações)
+   ============================================================ */
+
+// Resposta de criar/editar pelo form, guardada até o caderno voltar à tela
+const CHAVE_ESCRITA = 'caixa:escrita';
+
+/**
+ * Aplica no caderno a resposta de uma escrita: troca, insere ou remove
+ * só a linha alterada e atualiza saldos e totais. Pode ser aplicada mais
+ * de uma vez sem duplicar a linha.
+ */
+function aplicarEscrita(resposta) {
+    // A versão do dia mudou: a próxima visita busca de novo na API
+    cacheDias.delete(resposta.data_iso);
+
+    const seletor = document.getElementById('seletor-data');
+    const listaDiv = document.getElementById('lista-movimentacoes');
+    if (!listaDiv || !seletor || seletor.value !== resposta.data_iso) return;
+
+    renderizarSaldosTotais(resposta);
+
+    const id = resposta.movimentacao ? resposta.movimentacao.id : resposta.removida;
+    const atual = listaDiv.querySelector(`.mov-card[data-id="${id}"]`);
+    if (resposta.movimentacao) {
+        const html = htmlMovimentacao(resposta.movimentacao);
+        if (atual) {
+            atual.insertAdjacentHTML('afterend', html);
+            atual.remove();
+        } else if (paginaPendente()) {
+            // Linha nova vai para o fim do dia: chega quando a última página for carregada
+        } else {
+            const vazio = listaDiv.querySelector('.empty-state');
+            if (vazio) vazio.remove();
+            listaDiv.insertAdjacentHTML('beforeend', html);
         }
-        if(inputFinal) {
-            inputFinal.value = (dados.saldos.final * 100).toFixed(0);
-            aplicarMascaraMoeda(inputFinal);
+    } else if (atual) {
+        atual.remove();
+        if (!listaDiv.querySelector('.mov-card')) {
+            listaDiv.innerHTML = `
+                <div class="empty-state">
+                    <i class="fas fa-basket-shopping"></i>
+                    <p>Nenhuma movimentação hoje.</p>
+                </div>`;
         }
+    }
+}
+
+// Exclusão direto da lista; sem conexão cai no link normal (fila offline do PWA)
+document.addEventListener('click', async function(e) {
+    const link = e.target.closest('.btn-text-delete[data-api]');
+    if (!link) return;
+    e.preventDefault();
+    if (!confirm('Tem certeza que deseja excluir?')) return;
+
+    try {
+        const response = await fetch(link.dataset.api, {
+            method: 'POST',
+            headers: { 'X-CSRFToken': lerCookie('csrftoken') },
+        });
+        if (!response.ok) throw new Error('Erro API');
+        aplicarEscrita(await response.json());
+    } catch (error) {
+        window.location.href = link.href;
+    }
+});
 
-        // 5. Atualiza Card de Resumo (IDs Corretos)
-        // Usa a função global formatarMoedaParaExibicao de utils.js
-        const setTxt = (id, val) => { 
-            const el = document.getElementById(id); 
-            if(el) el.innerText = formatarMoedaParaExibicao(val); 
-        };
+// Voltando do formulário (inclusive pelo cache de navegação do browser)
+window.addEventListener('pageshow', function() {
+    const guardada = sessionStorage.getItem(CHAVE_ESCRITA);
+    if (!guardada) return;
+    sessionStorage.removeItem(CHAVE_ESCRITA);
+    aplicarEscrita(JSON.parse(guardada));
+});
 
-        setTxt('val-cartao', dados.totais.cartao);
-        setTxt('val-entrada-esp', dados.totais.entradas_esp);
-        setTxt('val-dinheiro-calc', dados.totais.dinheiro_miudo);
-        setTxt('val-geral', dados.totais.geral);
+/* ============================================================
+   PAGINAÇÃO DA LISTA (dias com muitas movimentações)
+   ============================================================ */
 
-        // Fórmula Rodapé
-        const txtFormula = `*Dinheiro = (${dados.totais.retiradas} Saídas + ${dados.saldos.final} Sobrou) - (${dados.saldos.inicial} Início + ${dados.totais.entradas_esp} Suprimentos)`;
-        const elFormula = document.getElementById('txt-formula');
-        if(elFormula) elFormula.innerText = txtFormula;
+// Evita duas buscas da mesma página (clique + rolagem)
+let carregandoPagina = false;
 
-        // 6. Reconstrói a Lista de Movimentações (LAYOUT ACORDEÃO)
-        const listaDiv = document.getElementById('lista-movimentacoes');
-        if(listaDiv) {
-            listaDiv.innerHTML = ''; 
-            
-            if (dados.movimentacoes.length === 0) {
-                listaDiv.innerHTML = `
-                    <div class="empty-state">
-                        <i class="fas fa-basket-shopping"></i>
-                        <p>Nenhuma movimentação hoje.</p>
-                    </div>`;
-            }
+function paginaPendente() {
+    const btn = document.getElementById('btn-carregar-mais');
+    return Boolean(btn && btn.dataset.proximoId);
+}
 
-            dados.movimentacoes.forEach(mov => {
-                let classeCss = 'tipo-saida';
-                let icone = '<i class="fas fa-arrow-down"></i>';
-                let subtexto = 'Saída/Sangria';
-                let sinal = '-';
-
-                if (mov.tipo === 'CARTAO') { 
-                    classeCss = 'tipo-cartao'; icone = '<i class="fas fa-credit-card"></i>'; subtexto = 'Cartão/Pix'; sinal = '+'; 
-                } else if (mov.tipo === 'DINHEIRO') { 
-                    classeCss = 'tipo-dinheiro'; icone = '<i class="fas fa-coins"></i>'; subtexto = 'Suprimento'; sinal = '+'; 
-                } else if (mov.tipo === 'REGISTRO') { 
-                    classeCss = 'tipo-registro'; icone = '<i class="fas fa-file-alt"></i>'; subtexto = 'Registro'; sinal = '-'; 
-                }
-
-                let descTexto = mov.descricao ? 
-                    `<i class="fas fa-quote-left"></i> ${mov.descricao}` : 
-                    'Sem descrição';
-
-                // GERA HTML COMPATÍVEL COM O CSS NOVO
-                const htmlItem = `
-                    <div class="mov-card" onclick="this.classList.toggle('active')">
-                        <div class="line-item ${classeCss}">
-                            <div class="icon-box">${icone}</div>
-                            <div class="info-box">
-                                <div class="item-name">${mov.categoria}</div>
-                                <div class="item-sub">${subtexto}</div>
-                            </div>
-                            <div class="valor">${sinal} R$ ${mov.valor.toFixed(2)}</div>
-                        </div>
-
-                        <div class="mov-details" onclick="event.stopPropagation()">
-                            <div class="mov-desc">${descTexto}</div>
-                            <div class="mov-actions">
-                                <a href="${mov.url_editar}" class="btn-text-action btn-text-edit">
-                                    <i class="fas fa-pen"></i> Editar
-                                </a>
-                                <a href="${mov.url_deletar}" class="btn-text-action btn-text-delete" onclick="return confirm('Tem certeza?')">
-                                    <i class="fas fa-trash"></i> Excluir
-                                </a>
-                            </div>
-                        </div>
-                    </div>`;
-                
-                listaDiv.insertAdjacentHTML('beforeend', htmlItem);
-            });
-        }
+function atualizarCarregarMais(proximoId) {
+    const btn = document.getElementById('btn-carregar-mais');
+    if (!btn) return;
+    btn.dataset.proximoId = proximoId || '';
+    btn.hidden = !proximoId;
+}
+
+/**
+ * Busca a próxima página do dia na API (?after_id=) e acrescenta à lista.
+ * Saldos e totais já estão na tela: são sempre do dia inteiro.
+ */
+async function carregarMais() {
+    const btn = document.getElementById('btn-carregar-mais');
+    const seletor = document.getElementById('seletor-data');
+    if (carregandoPagina || !btn || !btn.dataset.proximoId || !seletor) return;
+
+    const dataIso = seletor.value;
+    carregandoPagina = true;
+    try {
+        const response = await fetch(`/api/dados/${dataIso}/?after_id=${btn.dataset.proximoId}`);
+        if (!response.ok) throw new Error('Erro API');
+        const dados = await response.json();
+        if (seletor.value !== dataIso) return;  // Usuário já mudou de dia
 
+        const listaDiv = document.getElementById('lista-movimentacoes');
+        dados.movimentacoes.forEach(mov => {
+            if (!listaDiv.querySelector(`.mov-card[data-id="${mov.id}"]`)) {
+                listaDiv.insertAdjacentHTML('beforeend', htmlMovimentacao(mov));
+            }
+        });
+        atualizarCarregarMais(dados.proximo_id);
     } catch (error) {
-        console.error("Erro ao carregar dia:", error);
+        console.error("Erro ao carregar mais movimentações:", error);
     } finally {
-        const contentArea = document.querySelector('.content-area');
-        if(contentArea) contentArea.style.opacity = '1';
+        carregandoPagina = false;
+    }
+}
+
+document.addEventListener("DOMContentLoaded", function() {
+    const btn = document.getElementById('btn-carregar-mais');
+    if (!btn) return;
+    btn.addEventListener('click', carregarMais);
+
+    // Carrega sozinho quando o botão aparece na rolagem
+    if ('IntersectionObserver' in window) {
+        new IntersectionObserver(entradas => {
+            if (entradas.some(entrada => entrada.isIntersecting)) carregarMais();
+        }, { rootMargin: '300px' }).observe(btn);
     }
-}
\ No newline at end of file
+});
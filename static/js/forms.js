@@ -85,9 +85,53 @@ document.addEventListener("DOMContentLoaded", function() {
             }
         });
         
+        // Formulário de movimentação: grava pela API JSON e volta ao caderno
+        // sem o redirect que renderizaria o dia inteiro de novo
+        if (form.dataset.api) {
+            enviarPelaApi(form);
+            return;
+        }
         form.submit();
     }
 
+    async function enviarPelaApi(form) {
+        let response;
+        try {
+            response = await fetch(form.dataset.api, { method: 'POST', body: new FormData(form) });
+        } catch (error) {
+            // Sem conexão: o envio normal cai na fila offline do service worker
+            form.submit();
+            return;
+        }
+        if (response.status === 400) {
+            // Erro de validação: o envio normal mostra o form com as mensagens
+            form.submit();
+            return;
+        }
+
+        let escrita;
+        try {
+            if (!response.ok) throw new Error('Erro API');
+            escrita = await response.json();
+        } catch (error) {
+            // A movimentação pode já ter sido gravada: reenviar pelo form a
+            // duplicaria. Avisa e recarrega o dia para o usuário conferir
+            alert('Não foi possível confirmar o lançamento. Confira o caderno antes de lançar de novo.');
+            window.location.href = form.dataset.voltar;
+            return;
+        }
+
+        sessionStorage.setItem('caixa:escrita', JSON.stringify(escrita));
+        // Veio do caderno deste dia: volta pelo histórico (o browser costuma
+        // restaurar a página da memória e o caderno aplica a alteração no lugar)
+        const voltar = form.dataset.voltar;
+        if (document.referrer && new URL(document.referrer).pathname === voltar) {
+            history.back();
+        } else {
+            window.location.href = voltar;
+        }
+    }
+
     // 3. LÓGICA DE CATEGORIAS (SEGURANÇA ATIVADA)
     const selTipo = document.getElementById('select-tipo');
     const selCat = document.getElementById('select-categoria');
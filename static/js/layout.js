@@ -18,4 +18,43 @@ document.addEventListener("DOMContentLoaded", function() {
         closeBtn.addEventListener('click', toggleMenu);
         overlay.addEventListener('click', toggleMenu);
     }
-});
\ No newline at end of file
+});
+
+/* ============================================================
+   SINCRONIZAÇÃO OFFLINE - Pede ao service worker para enviar a fila
+   ============================================================ */
+
+function lerCookie(nome) {
+    const item = document.cookie.split('; ').find(par => par.startsWith(`${nome}=`));
+    return item ? decodeURIComponent(item.split('=')[1]) : null;
+}
+
+function pedirSincronizacao() {
+    if (!navigator.serviceWorker || !navigator.serviceWorker.controller || !navigator.onLine) return;
+    navigator.serviceWorker.controller.postMessage({ tipo: 'sincronizar', csrf: lerCookie('csrftoken') });
+}
+
+// Ao abrir o app e quando a conexão volta (Background Sync não existe em todo navegador)
+window.addEventListener('load', pedirSincronizacao);
+window.addEventListener('online', pedirSincronizacao);
+
+// Lançamentos offline que o servidor recusou continuam no aparelho até serem descartados
+function avisarRecusadas(recusadas) {
+    const linhas = recusadas.map(op => {
+        const alvo = op.data ? op.data : `#${op.id || '?'}`;
+        return `- ${op.acao} ${alvo}${op.valor ? ` (R$ ${op.valor})` : ''}: ${op.erro}`;
+    });
+    const texto = `${recusadas.length} lançamento(s) feito(s) sem internet foram recusados:\n\n`
+        + `${linhas.join('\n')}\n\nEles continuam guardados neste aparelho. Descartar agora?`;
+    if (confirm(texto)) {
+        navigator.serviceWorker.controller?.postMessage({ tipo: 'descartar', chaves: recusadas.map(op => op.chave) });
+    }
+}
+
+if (navigator.serviceWorker) {
+    navigator.serviceWorker.addEventListener('message', function(event) {
+        if (event.data && event.data.tipo === 'sincronizado' && event.data.recusadas?.length) {
+            avisarRecusadas(event.data.recusadas);
+        }
+    });
+}
@@ -1,5 +1,10 @@
 // static/js/serviceworker.js
-var staticCacheName = 'caixa-pwa-v1';
+var staticCacheName = 'caixa-pwa-v2';
+
+// Fila das escritas feitas sem internet (IndexedDB: sobrevive ao fechar o app)
+var BANCO_OFFLINE = 'caixa-offline';
+var FILA = 'fila';
+var TAG_SYNC = 'sincronizar-movimentacoes';
 
 self.addEventListener('install', function(event) {
   event.waitUntil(
@@ -13,17 +18,251 @@ self.addEventListener('install', function(event) {
   );
 });
 
-self.addEventListener('fetch', function(event) {
-  var requestUrl = new URL(event.request.url);
-  if (requestUrl.origin === location.origin) {
-    if ((requestUrl.pathname === '/')) {
-      event.respondWith(caches.match('/'));
-      return;
-    }
-  }
-  event.respondWith(
-    caches.match(event.request).then(function(response) {
-      return response || fetch(event.request);
+self.addEventListener('activate', function(event) {
+  event.waitUntil(
+    caches.keys().then(function(nomes) {
+      return Promise.all(nomes.filter(function(nome) {
+        return nome !== staticCacheName;
+      }).map(function(nome) {
+        return caches.delete(nome);
+      }));
     })
   );
-});
\ No newline at end of file
+});
+
+// ==============================================================================
+// FILA OFFLINE (IndexedDB)
+// ==============================================================================
+
+function abrirBanco() {
+  return new Promise(function(resolve, reject) {
+    var pedido = indexedDB.open(BANCO_OFFLINE, 1);
+    pedido.onupgradeneeded = function() {
+      pedido.result.createObjectStore(FILA, { keyPath: 'chave' });
+    };
+    pedido.onsuccess = function() { resolve(pedido.result); };
+    pedido.onerror = function() { reject(pedido.error); };
+  });
+}
+
+// Executa `acao(store)` numa transação e resolve com o resultado do pedido
+function naFila(modo, acao) {
+  return abrirBanco().then(function(banco) {
+    return new Promise(function(resolve, reject) {
+      var transacao = banco.transaction(FILA, modo);
+      var pedido = acao(transacao.objectStore(FILA));
+      transacao.oncomplete = function() { resolve(pedido && pedido.result); };
+      transacao.onerror = function() { reject(transacao.error); };
+    });
+  });
+}
+
+function enfileirar(operacao) {
+  // A ordem importa (criar antes de editar): 'criada_em' ordena a fila
+  operacao.criada_em = Date.now() + Math.random();
+  return naFila('readwrite', function(store) { return store.put(operacao); });
+}
+
+function lerFila() {
+  return naFila('readonly', function(store) { return store.getAll(); }).then(function(operacoes) {
+    return operacoes.sort(function(a, b) { return a.criada_em - b.criada_em; });
+  });
+}
+
+function removerDaFila(chaves) {
+  return naFila('readwrite', function(store) {
+    chaves.forEach(function(chave) { store.delete(chave); });
+  });
+}
+
+function regravarNaFila(operacoes) {
+  return naFila('readwrite', function(store) {
+    operacoes.forEach(function(operacao) { store.put(operacao); });
+  });
+}
+
+// ==============================================================================
+// ESCRITAS DO CADERNO: TENTA A REDE, SENÃO ENFILEIRA
+// ==============================================================================
+
+var ROTA_SALVAR = /^\/movimentacao\/salvar\/(\d{4}-\d{2}-\d{2})\/$/;
+var ROTA_EDITAR = /^\/movimentacao\/editar\/(\d+)\/$/;
+var ROTA_DELETAR = /^\/movimentacao\/deletar\/(\d+)\/$/;
+
+// Para onde o navegador volta depois da escrita (o mesmo que o Django faria)
+function paginaDeVolta(request, dataIso) {
+  if (dataIso) return '/caixa/' + dataIso + '/';
+  return request.referrer || '/';
+}
+
+function escritaOffline(request, operacaoDoForm) {
+  // O corpo só pode ser lido uma vez: guarda uma cópia antes de ir à rede
+  var copia = request.clone();
+  return fetch(request).catch(function() {
+    var leitura = request.method === 'POST' ? copia.formData() : Promise.resolve(null);
+    return leitura.then(function(form) {
+      var operacao = operacaoDoForm(form);
+      operacao.chave = self.crypto.randomUUID();
+      if (form) operacao.csrf = form.get('csrfmiddlewaretoken');
+      return enfileirar(operacao).then(function() {
+        if (self.registration.sync) self.registration.sync.register(TAG_SYNC).catch(function() {});
+        avisarClientes({ tipo: 'enfileirada', operacao: operacao });
+        return Response.redirect(paginaDeVolta(request, operacao.data), 303);
+      });
+    });
+  });
+}
+
+function camposDoForm(form) {
+  return {
+    tipo: form.get('tipo'),
+    valor: form.get('valor'),
+    categoria: form.get('categoria'),
+    descricao: form.get('descricao') || '',
+  };
+}
+
+function interceptarEscrita(request, caminho) {
+  var rota;
+  if (request.method === 'POST' && (rota = caminho.match(ROTA_SALVAR))) {
+    return escritaOffline(request, function(form) {
+      return Object.assign({ acao: 'criar', data: rota[1] }, camposDoForm(form));
+    });
+  }
+  if (request.method === 'POST' && (rota = caminho.match(ROTA_EDITAR))) {
+    return escritaOffline(request, function(form) {
+      return Object.assign({ acao: 'editar', id: Number(rota[1]) }, camposDoForm(form));
+    });
+  }
+  if (request.method === 'GET' && (rota = caminho.match(ROTA_DELETAR))) {
+    return escritaOffline(request, function() {
+      return { acao: 'deletar', id: Number(rota[1]) };
+    });
+  }
+  return null;
+}
+
+// ==============================================================================
+// SINCRONIZAÇÃO (/api/sync/)
+// ==============================================================================
+
+var sincronizando = null;
+
+function avisarClientes(mensagem) {
+  return self.clients.matchAll({ type: 'window' }).then(function(janelas) {
+    janelas.forEach(function(janela) { janela.postMessage(mensagem); });
+  });
+}
+
+// Recusadas pelo servidor ficam na fila (marcadas com 'erro') até o usuário
+// descartá-las: reenviar não resolve, mas apagar sem avisar perderia o lançamento
+function avisarRecusadas(operacoes, extra) {
+  var recusadas = operacoes.filter(function(operacao) { return operacao.erro; });
+  if (!recusadas.length && !extra) return;
+  return avisarClientes(Object.assign({ tipo: 'sincronizado', resultados: [], dias: {}, recusadas: recusadas }, extra));
+}
+
+// Envia a fila inteira num único POST; o servidor ignora o que já aplicou
+function sincronizar(csrf) {
+  if (sincronizando) return sincronizando;
+  sincronizando = lerFila().then(function(operacoes) {
+    var pendentes = operacoes.filter(function(operacao) { return !operacao.erro; });
+    if (!pendentes.length) return avisarRecusadas(operacoes);
+    var token = csrf || pendentes[pendentes.length - 1].csrf;
+
+    return fetch('/api/sync/', {
+      method: 'POST',
+      credentials: 'same-origin',
+      headers: { 'Content-Type': 'application/json', 'X-CSRFToken': token },
+      body: JSON.stringify({ operacoes: pendentes }),
+    }).then(function(response) {
+      if (!response.ok) throw new Error('Sincronização recusada: ' + response.status);
+      return response.json();
+    }).then(function(resposta) {
+      // Aplicadas e repetidas saem da fila; as recusadas ficam, com o motivo
+      var porChave = {};
+      pendentes.forEach(function(operacao) { porChave[operacao.chave] = operacao; });
+      var resolvidas = [];
+      var recusadas = [];
+      resposta.resultados.forEach(function(resultado) {
+        var operacao = porChave[resultado.chave];
+        if (!operacao) return;
+        if (resultado.status === 'erro') {
+          operacao.erro = resultado.erro;
+          recusadas.push(operacao);
+        } else {
+          resolvidas.push(resultado.chave);
+        }
+      });
+      return removerDaFila(resolvidas).then(function() {
+        return regravarNaFila(recusadas);
+      }).then(function() {
+        return avisarRecusadas(operacoes, { resultados: resposta.resultados, dias: resposta.dias });
+      });
+    });
+  }).finally(function() {
+    sincronizando = null;
+  });
+  return sincronizando;
+}
+
+self.addEventListener('sync', function(event) {
+  if (event.tag === TAG_SYNC) event.waitUntil(sincronizar());
+});
+
+// Navegadores sem Background Sync: a página pede ao voltar a conexão
+self.addEventListener('message', function(event) {
+  if (event.data && event.data.tipo === 'sincronizar') {
+    event.waitUntil(sincronizar(event.data.csrf).catch(function() {}));
+  }
+  // O usuário viu as operações recusadas e decidiu descartá-las
+  if (event.data && event.data.tipo === 'descartar') {
+    event.waitUntil(removerDaFila(event.data.chaves || []));
+  }
+});
+
+// ==============================================================================
+// LEITURAS: PÁGINAS DA REDE (CACHE SE OFFLINE), ESTÁTICOS DO CACHE
+// ==============================================================================
+
+self.addEventListener('fetch', function(event) {
+  var request = event.request;
+  var requestUrl = new URL(request.url);
+  if (requestUrl.origin !== location.origin) return;
+
+  var escrita = interceptarEscrita(request, requestUrl.pathname);
+  if (escrita) {
+    event.respondWith(escrita);
+    return;
+  }
+  if (request.method !== 'GET' || requestUrl.pathname.indexOf('/api/') === 0) return;
+
+  if (requestUrl.pathname.indexOf('/static/') === 0) {
+    event.respondWith(
+      caches.match(request).then(function(response) {
+        return response || fetch(request).then(function(resposta) {
+          var copia = resposta.clone();
+          if (resposta.ok) caches.open(staticCacheName).then(function(cache) { cache.put(request, copia); });
+          return resposta;
+        });
+      })
+    );
+    return;
+  }
+
+  if (request.mode === 'navigate') {
+    event.respondWith(
+      fetch(request).then(function(resposta) {
+        var copia = resposta.clone();
+        if (resposta.ok && !resposta.redirected) {
+          caches.open(staticCacheName).then(function(cache) { cache.put(request, copia); });
+        }
+        return resposta;
+      }).catch(function() {
+        return caches.match(request).then(function(response) {
+          return response || caches.match('/');
+        });
+      })
+    );
+  }
+});